@@ -5,15 +5,28 @@ UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 """
 
 import csv
+import hashlib
+import heapq
+import json
+import os
 import re
+import tempfile
 from pathlib import Path
 from math import log
-from collections import defaultdict
+from collections import Counter
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
 MAX_RESULTS = 3
 
+# Prebuilt indexes, one per CSV and set of search columns. UIUX_INDEX_DIR
+# moves them; "off" keeps them in memory only.
+INDEX_VERSION = 1
+INDEX_DIR = os.environ.get("UIUX_INDEX_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "ui-ux-pro-max",
+)
+
 CSV_CONFIG = {
     "style": {
         "file": "styles.csv",
@@ -98,16 +111,15 @@ AVAILABLE_STACKS = list(STACK_CONFIG.keys())
 
 # ============ BM25 IMPLEMENTATION ============
 class BM25:
-    """BM25 ranking algorithm for text search"""
+    """BM25 ranking algorithm for text search, over an inverted index"""
 
     def __init__(self, k1=1.5, b=0.75):
         self.k1 = k1
         self.b = b
-        self.corpus = []
         self.doc_lengths = []
         self.avgdl = 0
         self.idf = {}
-        self.doc_freqs = defaultdict(int)
+        self.postings = {}  # term -> [[doc index, term frequency], ...]
         self.N = 0
 
     def tokenize(self, text):
@@ -117,47 +129,121 @@ class BM25:
 
     def fit(self, documents):
         """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
+        corpus = [self.tokenize(doc) for doc in documents]
+        self.N = len(corpus)
+        self.postings = {}
         if self.N == 0:
             return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
+        self.doc_lengths = [len(doc) for doc in corpus]
         self.avgdl = sum(self.doc_lengths) / self.N
 
-        for doc in self.corpus:
-            seen = set()
-            for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
+        for idx, doc in enumerate(corpus):
+            for word, tf in Counter(doc).items():
+                self.postings.setdefault(word, []).append([idx, tf])
 
-        for word, freq in self.doc_freqs.items():
+        for word, postings in self.postings.items():
+            freq = len(postings)
             self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
 
-    def score(self, query):
-        """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
-
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
-
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
+    def _accumulate(self, query):
+        """Score of each document holding a query term, from its postings"""
+        acc = {}
+        for token in self.tokenize(query):
+            if token in self.idf:
+                idf = self.idf[token]
+                for idx, tf in self.postings[token]:
+                    doc_len = self.doc_lengths[idx]
                     numerator = tf * (self.k1 + 1)
                     denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
-
-            scores.append((idx, score))
+                    acc[idx] = acc.get(idx, 0) + idf * numerator / denominator
+        return acc
 
+    def score(self, query):
+        """Score all documents against query"""
+        acc = self._accumulate(query)
+        scores = [(idx, acc.get(idx, 0)) for idx in range(self.N)]
         return sorted(scores, key=lambda x: x[1], reverse=True)
 
+    def top(self, query, k):
+        """The k best (index, score) with score > 0, best first; ties by index"""
+        return heapq.nlargest(k, sorted(self._accumulate(query).items()), key=lambda x: x[1])
+
+    def to_dict(self):
+        return {"k1": self.k1, "b": self.b, "N": self.N, "avgdl": self.avgdl,
+                "doc_lengths": self.doc_lengths, "idf": self.idf, "postings": self.postings}
+
+    @classmethod
+    def from_dict(cls, data):
+        bm25 = cls(data["k1"], data["b"])
+        bm25.N = data["N"]
+        bm25.avgdl = data["avgdl"]
+        bm25.doc_lengths = data["doc_lengths"]
+        bm25.idf = data["idf"]
+        bm25.postings = data["postings"]
+        return bm25
+
+
+# ============ INDEX STORE ============
+# Mapping of (CSV path, search columns) -> (mtime, size), BM25, rows.
+_INDEXES = {}
+
+
+def _index_path(filepath, search_cols):
+    key = hashlib.sha1(json.dumps([str(filepath.resolve()), search_cols]).encode()).hexdigest()[:16]
+    return Path(INDEX_DIR) / f"{filepath.stem}-{key}.json"
+
+
+def _read_index(path, stamp):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data["version"] == INDEX_VERSION and data["stamp"] == list(stamp):
+            return BM25.from_dict(data["bm25"]), data["rows"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_index(path, stamp, bm25, rows):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(path.parent), suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "stamp": list(stamp),
+                       "bm25": bm25.to_dict(), "rows": rows}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _get_index(filepath, search_cols):
+    """
+    BM25 index and rows of a CSV: from memory, else from disk, else built
+    and saved. Any copy older than the CSV's mtime or size is rebuilt.
+    """
+    st = filepath.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = (str(filepath), tuple(search_cols))
+    cached = _INDEXES.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1], cached[2]
+
+    path = _index_path(filepath, search_cols) if INDEX_DIR != "off" else None
+    loaded = path and _read_index(path, stamp)
+    if loaded:
+        bm25, rows = loaded
+    else:
+        rows = _load_csv(filepath)
+        # Build documents from search columns
+        documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in rows]
+        bm25 = BM25()
+        bm25.fit(documents)
+        if path:
+            _write_index(path, stamp, bm25, rows)
+
+    _INDEXES[key] = (stamp, bm25, rows)
+    return bm25, rows
+
 
 # ============ SEARCH FUNCTIONS ============
 def _load_csv(filepath):
@@ -171,22 +257,13 @@ def _search_csv(filepath, search_cols, output_cols, query, max_results):
     if not filepath.exists():
         return []
 
-    data = _load_csv(filepath)
-
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
-
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
+    bm25, data = _get_index(filepath, search_cols)
 
-    # Get top results with score > 0
+    # Top results with score > 0, from the postings of the query terms
     results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
+    for idx, score in bm25.top(query, max_results):
+        row = data[idx]
+        results.append({col: row.get(col, "") for col in output_cols if col in row})
 
     return results
 
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Security Scan Benchmark - Antigravity Kit
+=========================================
+
+Checks the anchored matchers of security_scan.py against the one-regex-at-
+a-time loops they replaced, then times both.
+
+Every file the secret and pattern scans would read must give identical
+findings with both; mismatches are listed and the exit status is 1. Then
+the matchers are timed in-process over the files held in memory, and the
+whole scan end to end (cache off) with 1 and --jobs worker processes.
+
+Usage:
+    python .agent/scripts/bench_security_scan.py                # this repo
+    python .agent/scripts/bench_security_scan.py plugins/mitogen --jobs 4
+"""
+
+import argparse
+import io
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / ".agent" / "skills" / "vulnerability-scanner" / "scripts"))
+
+import security_scan
+from scan_engine import read_text, walk_files
+
+
+def naive_secrets(rel_path: str, content: str) -> List[list]:
+    hits = []
+    for pattern, secret_type, severity in security_scan.SECRET_PATTERNS:
+        matches = re.findall(pattern, content, re.IGNORECASE)
+        if matches:
+            hits.append([secret_type, severity, len(matches)])
+    return hits
+
+
+def naive_patterns(rel_path: str, content: str) -> List[dict]:
+    hits = []
+    for line_num, line in enumerate(io.StringIO(content, newline="\n"), 1):
+        for pattern, name, severity, category in security_scan.DANGEROUS_PATTERNS:
+            if re.search(pattern, line, re.IGNORECASE):
+                hits.append({
+                    "line": line_num,
+                    "pattern": name,
+                    "severity": severity,
+                    "category": category,
+                    "snippet": line.strip()[:80]
+                })
+    return hits
+
+
+def load(project: str, match: Callable[[str], bool]) -> List[Tuple[str, str]]:
+    files = []
+    for dirpath, name in walk_files(project, security_scan.SKIP_DIRS):
+        if match(name):
+            path = os.path.join(dirpath, name)
+            files.append((os.path.relpath(path, project),
+                          read_text(path, os.path.getsize(path), "ignore")))
+    return files
+
+
+def check(files, naive, fast) -> int:
+    failed = 0
+    for rel_path, content in files:
+        if naive(rel_path, content) != fast(rel_path, content):
+            failed += 1
+            print(f"  MISMATCH {rel_path}")
+    return failed
+
+
+def best_of(count: int, func: Callable, *args) -> float:
+    best = float("inf")
+    for _ in range(count):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def scan_all(files, func):
+    for rel_path, content in files:
+        func(rel_path, content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("project", nargs="?", default=str(ROOT))
+    parser.add_argument("--count", type=int, default=3, help="Runs per timing, best kept")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    os.environ["AGENT_SCAN_CACHE"] = "off"
+    failed = 0
+    for label, match, naive, fast in (
+        ("secrets", security_scan._match_secrets, naive_secrets, security_scan._file_secrets),
+        ("patterns", security_scan._match_patterns, naive_patterns, security_scan._file_patterns),
+    ):
+        files = load(args.project, match)
+        size = sum(len(content) for _, content in files) / 1048576
+        mismatched = check(files, naive, fast)
+        failed += mismatched
+        t_naive = best_of(args.count, scan_all, files, naive)
+        t_fast = best_of(args.count, scan_all, files, fast)
+        print(f"{label:<9} {len(files):5d} files {size:6.1f} MiB  {mismatched} mismatched  "
+              f"per-pattern {t_naive:6.2f}s  anchored {t_fast:6.2f}s  ({t_naive / t_fast:.1f}x)")
+
+    for jobs in sorted({1, args.jobs}):
+        elapsed = best_of(args.count, security_scan.scan_files, args.project,
+                          ["secrets", "patterns", "config"], jobs)
+        print(f"full scan, {jobs} job(s): {elapsed:.2f}s")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
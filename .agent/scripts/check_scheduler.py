@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Check Scheduler - Antigravity Kit
+=================================
+
+Runs validation scripts concurrently for checklist.py and verify_all.py.
+
+Checks form a small DAG: a check starts once every check named in its
+`after` list has finished and one of `jobs` workers is free. Checks marked
+`exclusive` run alone, so timing-sensitive audits (Lighthouse) are not
+skewed by lint or tests running beside them. Ready checks start in priority
+order, output lines are streamed as they arrive prefixed with the check
+name, and results are returned in priority order whatever order the checks
+finished in.
+
+Usage:
+    from check_scheduler import Check, run_checks
+    results = run_checks(checks, jobs=4, stop_on_fail=True)
+"""
+
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+@dataclass
+class Check:
+    """One validation script and its scheduling constraints"""
+    name: str
+    script: Path
+    cmd: List[str]
+    category: str = ""
+    required: bool = False
+    after: Sequence[str] = ()
+    exclusive: bool = False
+
+
+@dataclass
+class _Run:
+    check: Check
+    start: float = field(default_factory=time.monotonic)
+    proc: Optional[subprocess.Popen] = None
+    cancelled: bool = False
+    timed_out: bool = False
+
+
+def _result(check: Check, **kwargs) -> dict:
+    result = {
+        "name": check.name,
+        "category": check.category,
+        "required": check.required,
+        "passed": False,
+        "skipped": False,
+        "cancelled": False,
+        "output": "",
+        "error": "",
+        "duration": 0.0,
+    }
+    result.update(kwargs)
+    return result
+
+
+def default_output(check: Check, line: str, is_error: bool):
+    print(f"  │ [{check.name}] {line}")
+
+
+def run_checks(
+    checks: List[Check],
+    jobs: int = 1,
+    timeout: float = 600,
+    stop_on_fail: bool = False,
+    on_start: Optional[Callable[[Check], None]] = None,
+    on_output: Optional[Callable[[Check, str, bool], None]] = default_output,
+    on_finish: Optional[Callable[[Check, dict], None]] = None,
+) -> List[dict]:
+    """
+    Run checks, given in priority order, on at most `jobs` workers.
+
+    With `stop_on_fail`, a failed required check cancels every check after it
+    in priority order that is still pending or running; those are reported
+    with `cancelled` set. Checks before it still run and report, as they
+    would have finished first when run one at a time. The callbacks are
+    serialized, so they may print freely.
+
+    Returns:
+        list of result dicts in the order of `checks`, with keys: name,
+        category, required, passed, skipped, cancelled, output, error,
+        duration
+    """
+    jobs = max(1, jobs)
+    names = {check.name for check in checks}
+    priority = {check.name: i for i, check in enumerate(checks)}
+    pending = list(checks)
+    running: Dict[str, _Run] = {}
+    results: Dict[str, dict] = {}
+    cond = threading.Condition()
+    print_lock = threading.Lock()
+    # Priority of the highest-priority failed required check, if any.
+    state = {"stop_after": None}
+
+    def emit(callback, *args):
+        if callback:
+            with print_lock:
+                callback(*args)
+
+    def ready(check: Check) -> bool:
+        return all(dep in results or dep not in names for dep in check.after)
+
+    def finish(run: _Run, result: dict):
+        emit(on_finish, run.check, result)
+        with cond:
+            results[run.check.name] = result
+            del running[run.check.name]
+            if (stop_on_fail and run.check.required and not result["passed"]
+                    and not result["skipped"] and not result["cancelled"]):
+                stop_after = priority[run.check.name]
+                if state["stop_after"] is not None:
+                    stop_after = min(stop_after, state["stop_after"])
+                state["stop_after"] = stop_after
+                for other in running.values():
+                    if priority[other.check.name] < stop_after:
+                        continue
+                    other.cancelled = True
+                    if other.proc and other.proc.poll() is None:
+                        other.proc.kill()
+            cond.notify_all()
+
+    def pump(run: _Run, stream, chunks: List[str], is_error: bool):
+        for line in stream:
+            chunks.append(line)
+            emit(on_output, run.check, line.rstrip("\n"), is_error)
+
+    def work(run: _Run):
+        check = run.check
+        stdout: List[str] = []
+        stderr: List[str] = []
+        try:
+            run.proc = subprocess.Popen(
+                check.cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                errors="replace",
+                env=dict(os.environ, PYTHONUNBUFFERED="1"),
+            )
+            if run.cancelled:
+                run.proc.kill()
+
+            def expire():
+                run.timed_out = True
+                run.proc.kill()
+
+            timer = threading.Timer(timeout, expire)
+            timer.daemon = True
+            timer.start()
+            err_thread = threading.Thread(
+                target=pump, args=(run, run.proc.stderr, stderr, True), daemon=True
+            )
+            err_thread.start()
+            pump(run, run.proc.stdout, stdout, False)
+            err_thread.join()
+            returncode = run.proc.wait()
+            timer.cancel()
+        except Exception as e:
+            finish(run, _result(check, error=str(e),
+                                duration=time.monotonic() - run.start))
+            return
+
+        duration = time.monotonic() - run.start
+        error = "".join(stderr)
+        if run.timed_out:
+            error = f"Timeout (>{timeout:.0f}s)"
+        finish(run, _result(
+            check,
+            passed=returncode == 0 and not run.cancelled and not run.timed_out,
+            cancelled=run.cancelled and not run.timed_out,
+            output="".join(stdout),
+            error=error,
+            duration=duration,
+        ))
+
+    with cond:
+        while pending or running:
+            if state["stop_after"] is not None:
+                for check in list(pending):
+                    if priority[check.name] < state["stop_after"]:
+                        continue
+                    missing = not check.script.is_file()
+                    results[check.name] = _result(
+                        check, passed=missing, skipped=True, cancelled=not missing
+                    )
+                    pending.remove(check)
+            progressed = False
+            for check in list(pending):
+                if len(running) >= jobs:
+                    break
+                if not ready(check):
+                    continue
+                if any(r.check.exclusive for r in running.values()):
+                    break
+                if check.exclusive and running:
+                    # Hold back lower-priority checks too, so the exclusive
+                    # one gets the next free moment rather than starving.
+                    break
+                pending.remove(check)
+                progressed = True
+                if not check.script.is_file():
+                    result = _result(check, passed=True, skipped=True)
+                    results[check.name] = result
+                    emit(on_finish, check, result)
+                    continue
+                run = _Run(check)
+                running[check.name] = run
+                emit(on_start, check)
+                threading.Thread(target=work, args=(run,), daemon=True).start()
+            if running and not progressed:
+                cond.wait()
+            elif pending and not running and not progressed:
+                stuck = ", ".join(check.name for check in pending)
+                raise ValueError(f"Checks wait on each other: {stuck}")
+
+    return [results[check.name] for check in checks]
@@ -9,6 +9,7 @@ Use this for incremental validation during development.
 Usage:
     python scripts/checklist.py .                    # Run core checks
     python scripts/checklist.py . --url <URL>        # Include performance checks
+    python scripts/checklist.py . --jobs 1           # One check at a time
 
 Priority Order:
     P0: Security Scan (vulnerabilities, secrets)
@@ -18,14 +19,20 @@ Priority Order:
     P4: UX Audit (psychology laws, accessibility)
     P5: SEO Check (meta tags, structure)
     P6: Performance (lighthouse - requires URL)
+
+Independent checks run concurrently (--jobs, default 4) and are reported in
+the order above. A failed required check cancels the checks below it; those
+above it still finish and report.
 """
 
+import os
 import sys
-import subprocess
 import argparse
 from pathlib import Path
 from typing import List, Tuple, Optional
 
+from check_scheduler import Check, run_checks
+
 # ANSI colors for terminal output
 class Colors:
     HEADER = '\033[95m'
@@ -69,86 +76,66 @@ PERFORMANCE_CHECKS = [
     ("Playwright E2E", ".agent/skills/webapp-testing/scripts/playwright_runner.py", False),
 ]
 
-def check_script_exists(script_path: Path) -> bool:
-    """Check if script file exists"""
-    return script_path.exists() and script_path.is_file()
-
-def run_script(name: str, script_path: Path, project_path: str, url: Optional[str] = None) -> dict:
-    """
-    Run a validation script and capture results
-
-    Returns:
-        dict with keys: name, passed, output, skipped
-    """
-    if not check_script_exists(script_path):
-        print_warning(f"{name}: Script not found, skipping")
-        return {"name": name, "passed": True, "output": "", "skipped": True}
+# Scheduling constraints, by check name. Lighthouse measures page timings, so
+# it runs alone; Playwright drives the same URL, so it waits for Lighthouse.
+CHECK_AFTER = {
+    "Playwright E2E": ("Lighthouse Audit",),
+}
+EXCLUSIVE_CHECKS = {"Lighthouse Audit"}
 
-    print_step(f"Running: {name}")
-
-    # Build command
+def build_command(script_path: Path, project_path: str, url: Optional[str] = None) -> List[str]:
+    """Build the command line of a validation script"""
     cmd = ["python", str(script_path), project_path]
     if url and ("lighthouse" in script_path.name.lower() or "playwright" in script_path.name.lower()):
         cmd.append(url)
-
-    # Run script
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
-
-        passed = result.returncode == 0
-
-        if passed:
-            print_success(f"{name}: PASSED")
-        else:
-            print_error(f"{name}: FAILED")
-            if result.stderr:
-                print(f"  Error: {result.stderr[:200]}")
-
-        return {
-            "name": name,
-            "passed": passed,
-            "output": result.stdout,
-            "error": result.stderr,
-            "skipped": False
-        }
-
-    except subprocess.TimeoutExpired:
-        print_error(f"{name}: TIMEOUT (>5 minutes)")
-        return {"name": name, "passed": False, "output": "", "error": "Timeout", "skipped": False}
-
-    except Exception as e:
-        print_error(f"{name}: ERROR - {str(e)}")
-        return {"name": name, "passed": False, "output": "", "error": str(e), "skipped": False}
+    return cmd
+
+def on_start(check: Check):
+    print_step(f"Running: {check.name}")
+
+def on_finish(check: Check, result: dict):
+    """Report a check as soon as it completes"""
+    if result["cancelled"]:
+        print_warning(f"{check.name}: CANCELLED")
+    elif result["skipped"]:
+        print_warning(f"{check.name}: Script not found, skipping")
+    elif result["passed"]:
+        print_success(f"{check.name}: PASSED ({result['duration']:.1f}s)")
+    elif result["error"].startswith("Timeout"):
+        print_error(f"{check.name}: TIMEOUT (>5 minutes)")
+    else:
+        print_error(f"{check.name}: FAILED ({result['duration']:.1f}s)")
 
 def print_summary(results: List[dict]):
     """Print final summary report"""
     print_header("📊 CHECKLIST SUMMARY")
 
     passed_count = sum(1 for r in results if r["passed"] and not r.get("skipped"))
-    failed_count = sum(1 for r in results if not r["passed"] and not r.get("skipped"))
-    skipped_count = sum(1 for r in results if r.get("skipped"))
+    failed_count = sum(1 for r in results if not r["passed"] and not r.get("skipped") and not r.get("cancelled"))
+    skipped_count = sum(1 for r in results if r.get("skipped") and not r.get("cancelled"))
+    cancelled_count = sum(1 for r in results if r.get("cancelled"))
 
     print(f"Total Checks: {len(results)}")
     print(f"{Colors.GREEN}✅ Passed: {passed_count}{Colors.ENDC}")
     print(f"{Colors.RED}❌ Failed: {failed_count}{Colors.ENDC}")
     print(f"{Colors.YELLOW}⏭️  Skipped: {skipped_count}{Colors.ENDC}")
+    if cancelled_count:
+        print(f"{Colors.YELLOW}⏹️  Cancelled: {cancelled_count}{Colors.ENDC}")
     print()
 
-    # Detailed results
+    # Detailed results, in priority order, with each check's wall time
     for r in results:
-        if r.get("skipped"):
+        if r.get("cancelled"):
+            status = f"{Colors.YELLOW}⏹️ {Colors.ENDC}"
+        elif r.get("skipped"):
             status = f"{Colors.YELLOW}⏭️ {Colors.ENDC}"
         elif r["passed"]:
             status = f"{Colors.GREEN}✅{Colors.ENDC}"
         else:
             status = f"{Colors.RED}❌{Colors.ENDC}"
 
-        print(f"{status} {r['name']}")
+        duration_str = f" ({r['duration']:.1f}s)" if not r.get("skipped") else ""
+        print(f"{status} {r['name']}{duration_str}")
 
     print()
 
@@ -172,6 +159,8 @@ Examples:
     parser.add_argument("project", help="Project path to validate")
     parser.add_argument("--url", help="URL for performance checks (lighthouse, playwright)")
     parser.add_argument("--skip-performance", action="store_true", help="Skip performance checks even if URL provided")
+    parser.add_argument("-j", "--jobs", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Checks to run at once (default: %(default)s)")
 
     args = parser.parse_args()
 
@@ -185,28 +174,41 @@ Examples:
     print(f"Project: {project_path}")
     print(f"URL: {args.url if args.url else 'Not provided (performance checks skipped)'}")
 
-    results = []
-
-    # Run core checks
-    print_header("📋 CORE CHECKS")
-    for name, script_path, required in CORE_CHECKS:
-        script = project_path / script_path
-        result = run_script(name, script, str(project_path))
-        results.append(result)
-
-        # If required check fails, stop
-        if required and not result["passed"] and not result.get("skipped"):
-            print_error(f"CRITICAL: {name} failed. Stopping checklist.")
-            print_summary(results)
-            sys.exit(1)
+    checks = [
+        Check(name=name, script=project_path / script_path,
+              cmd=build_command(project_path / script_path, str(project_path)),
+              category="Core", required=required,
+              after=CHECK_AFTER.get(name, ()), exclusive=name in EXCLUSIVE_CHECKS)
+        for name, script_path, required in CORE_CHECKS
+    ]
 
-    # Run performance checks if URL provided
+    # Add performance checks if URL provided
     if args.url and not args.skip_performance:
-        print_header("⚡ PERFORMANCE CHECKS")
-        for name, script_path, required in PERFORMANCE_CHECKS:
-            script = project_path / script_path
-            result = run_script(name, script, str(project_path), args.url)
-            results.append(result)
+        checks += [
+            Check(name=name, script=project_path / script_path,
+                  cmd=build_command(project_path / script_path, str(project_path), args.url),
+                  category="Performance", required=required,
+                  after=CHECK_AFTER.get(name, ()), exclusive=name in EXCLUSIVE_CHECKS)
+            for name, script_path, required in PERFORMANCE_CHECKS
+        ]
+
+    # Run independent checks concurrently; if a required check fails, stop
+    print_header(f"📋 RUNNING {len(checks)} CHECKS, {args.jobs} AT A TIME")
+    results = run_checks(
+        checks,
+        jobs=args.jobs,
+        timeout=300,  # 5 minute timeout
+        stop_on_fail=True,
+        on_start=on_start,
+        on_finish=on_finish,
+    )
+
+    if any(r["cancelled"] for r in results):
+        failed = next(r["name"] for r in results
+                      if r["required"] and not r["passed"] and not r["skipped"] and not r["cancelled"])
+        print_error(f"CRITICAL: {failed} failed. Stopping checklist.")
+        print_summary(results)
+        sys.exit(1)
 
     # Print summary
     all_passed = print_summary(results)
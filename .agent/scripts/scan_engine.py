@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Scan Engine - Antigravity Kit
+=============================
+
+Shared single-pass file walker for the audit scripts.
+
+An audit registers one or more rule sets: a predicate choosing the files it
+wants and a function turning a file's text into a JSON-serializable result.
+The engine walks the tree once, pruning SKIP_DIRS, reads each wanted file
+once (through mmap when it is large) however many rule sets want it, and
+hands the text to each of them. With jobs > 1, files are read and scanned
+in a process pool once there are enough of them.
+
+Per-file results are cached by mtime and size, one cache file per project
+and rule set, so a repeat run only reads files that changed. A rule set's
+cache is dropped whenever the source of the module defining its scan
+function changes.
+
+Usage:
+    from scan_engine import RuleSet, ScanEngine
+    engine = ScanEngine(project_path, jobs=os.cpu_count())
+    engine.register(RuleSet("secrets", match, scan))
+    results = engine.run()   # {"secrets": [(rel_path, result), ...]}
+
+Environment:
+    AGENT_SCAN_CACHE    cache directory (default ~/.cache/antigravity-scan);
+                        "off" disables caching
+"""
+
+import hashlib
+import inspect
+import json
+import mmap
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+SKIP_DIRS = {'node_modules', '.git', 'dist', 'build', '__pycache__', '.venv', 'venv', '.next'}
+
+# Cache misses needed before a scan is spread over worker processes; below
+# this, starting the pool costs more than it saves.
+MIN_PARALLEL_FILES = 64
+
+# Unreadable files, left out of the results.
+_UNREADABLE = object()
+
+# Files at least this large are decoded straight from an mmap, skipping the
+# intermediate bytes copy of read().
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def default_cache_dir() -> Optional[Path]:
+    env = os.environ.get("AGENT_SCAN_CACHE")
+    if env == "off":
+        return None
+    if env:
+        return Path(env)
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "antigravity-scan"
+
+
+def walk_files(root: str, skip_dirs: Set[str] = SKIP_DIRS) -> Iterator[Tuple[str, str]]:
+    """Yield (dirpath, filename) in os.walk order, pruning skip_dirs"""
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in skip_dirs]
+        for name in files:
+            yield dirpath, name
+
+
+def read_text(path: str, size: int, errors: str = "replace") -> str:
+    """Read a file as UTF-8 with universal newlines, like open(path, 'r')"""
+    with open(path, "rb") as f:
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = str(mm, "utf-8", errors)
+        else:
+            text = f.read().decode("utf-8", errors)
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+@dataclass
+class RuleSet:
+    """
+    A named set of rules run over every file `match` accepts.
+
+    `match` gets the file name, `scan` the path relative to the project
+    and the file's text. Past `max_files` files, matches are still listed
+    but with a None result, and are not read.
+    """
+    name: str
+    match: Callable[[str], bool]
+    scan: Callable[[str, str], Any]
+    errors: str = "replace"
+    max_files: Optional[int] = None
+
+    def fingerprint(self) -> str:
+        h = hashlib.sha1(self.name.encode())
+        try:
+            h.update(Path(inspect.getsourcefile(self.scan)).read_bytes())
+        except (OSError, TypeError):
+            h.update(repr(self.scan).encode())
+        return h.hexdigest()
+
+
+class _Cache:
+    """Per-file results of one rule set, keyed by relative path"""
+
+    def __init__(self, path: Optional[Path], fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.old: Dict[str, list] = {}
+        self.new: Dict[str, list] = {}
+        if path is None:
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("fingerprint") == fingerprint:
+                self.old = data["files"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    def get(self, rel: str, stamp: list):
+        entry = self.old.get(rel)
+        if entry is not None and entry[:2] == stamp:
+            self.new[rel] = entry
+            return True, entry[2]
+        return False, None
+
+    def put(self, rel: str, stamp: list, result):
+        self.new[rel] = stamp + [result]
+
+    def save(self):
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": self.fingerprint, "files": self.new}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+def _scan_file(path: str, rel: str, size: int, rules: list) -> Optional[list]:
+    """
+    Results of each (errors, scan) in rules for one file, or None if it
+    cannot be read. Runs in worker processes, so rules hold only picklable
+    module-level functions.
+    """
+    texts: Dict[str, str] = {}
+    results = []
+    for errors, scan in rules:
+        if errors not in texts:
+            try:
+                texts[errors] = read_text(path, size, errors)
+            except (OSError, ValueError):
+                return None
+        # Round-trip fresh results so they match cached ones.
+        results.append(json.loads(json.dumps(scan(rel, texts[errors]))))
+    return results
+
+
+class ScanEngine:
+    """Walk a project once and dispatch file contents to rule sets"""
+
+    def __init__(self, root: str, skip_dirs: Set[str] = SKIP_DIRS,
+                 cache_dir: Optional[Path] = None, use_cache: bool = True,
+                 jobs: int = 1):
+        self.root = root
+        self.skip_dirs = skip_dirs
+        self.jobs = jobs
+        self.cache_dir = (cache_dir or default_cache_dir()) if use_cache else None
+        self.rulesets: List[RuleSet] = []
+        self.stats = {"files": 0, "read": 0, "cached": 0, "errors": 0}
+
+    def register(self, ruleset: RuleSet) -> "ScanEngine":
+        self.rulesets.append(ruleset)
+        return self
+
+    def _cache_path(self, ruleset: RuleSet) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        key = hashlib.sha1(os.path.abspath(self.root).encode()).hexdigest()[:16]
+        return self.cache_dir / f"{key}-{ruleset.name}.json"
+
+    def run(self) -> Dict[str, List[Tuple[str, Any]]]:
+        """
+        Scan every wanted file once.
+
+        Returns:
+            {ruleset name: [(relative path, result), ...]} in walk order;
+            unreadable files are left out, files past max_files have None
+        """
+        caches = [_Cache(self._cache_path(rs), rs.fingerprint()) for rs in self.rulesets]
+        slots: Dict[str, List[list]] = {rs.name: [] for rs in self.rulesets}
+        misses = []
+
+        # Walk, taking what the caches already know
+        for dirpath, name in walk_files(self.root, self.skip_dirs):
+            wanted = [i for i, rs in enumerate(self.rulesets) if rs.match(name)]
+            if not wanted:
+                continue
+
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, self.root)
+            over = [i for i in wanted if self.rulesets[i].max_files is not None
+                    and len(slots[self.rulesets[i].name]) >= self.rulesets[i].max_files]
+            for i in over:
+                slots[self.rulesets[i].name].append([rel, None])
+            wanted = [i for i in wanted if i not in over]
+            if not wanted:
+                continue
+
+            self.stats["files"] += 1
+            try:
+                st = os.stat(path)
+            except OSError:
+                self.stats["errors"] += 1
+                continue
+            stamp = [st.st_mtime_ns, st.st_size]
+
+            pending = []
+            for i in wanted:
+                hit, result = caches[i].get(rel, stamp)
+                slot = [rel, result if hit else _UNREADABLE]
+                slots[self.rulesets[i].name].append(slot)
+                if hit:
+                    self.stats["cached"] += 1
+                else:
+                    pending.append((i, slot))
+            if pending:
+                misses.append((path, rel, st.st_size, stamp, pending))
+
+        # Read and scan the rest, in worker processes when there are many
+        tasks = [
+            (path, rel, size, [(self.rulesets[i].errors, self.rulesets[i].scan) for i, _ in pending])
+            for path, rel, size, _, pending in misses
+        ]
+        for (_, rel, _, stamp, pending), scanned in zip(misses, self._scan_all(tasks)):
+            if scanned is None:
+                self.stats["errors"] += 1
+                continue
+            self.stats["read"] += 1
+            for (i, slot), result in zip(pending, scanned):
+                slot[1] = result
+                caches[i].put(rel, stamp, result)
+
+        for cache in caches:
+            cache.save()
+        return {
+            name: [(rel, result) for rel, result in entries if result is not _UNREADABLE]
+            for name, entries in slots.items()
+        }
+
+    def _scan_all(self, tasks: list) -> Iterator[Optional[list]]:
+        if self.jobs > 1 and len(tasks) >= MIN_PARALLEL_FILES:
+            chunksize = max(1, len(tasks) // (self.jobs * 4))
+            try:
+                with ProcessPoolExecutor(self.jobs) as pool:
+                    return list(pool.map(_scan_file, *zip(*tasks), chunksize=chunksize))
+            except (OSError, BrokenProcessPool):
+                pass  # No usable worker processes here; scan in-process
+        return map(_scan_file, *zip(*tasks)) if tasks else iter(())
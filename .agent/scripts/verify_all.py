@@ -8,6 +8,11 @@ Use this before deployment or major releases.
 
 Usage:
     python scripts/verify_all.py . --url <URL>
+    python scripts/verify_all.py . --url <URL> --jobs 8
+
+Independent checks run concurrently (--jobs, default 4). Output is streamed
+as it arrives, prefixed with the check name; the final report keeps priority
+order and shows each check's wall time.
 
 Includes ALL checks:
     ✅ Security Scan (OWASP, secrets, dependencies)
@@ -22,13 +27,15 @@ Includes ALL checks:
     ✅ Mobile Audit (if applicable)
 """
 
+import os
 import sys
-import subprocess
 import argparse
 from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime
 
+from check_scheduler import Check, run_checks
+
 # ANSI colors
 class Colors:
     HEADER = '\033[95m'
@@ -147,57 +154,36 @@ VERIFICATION_SUITE = [
     },
 ]
 
-def run_script(name: str, script_path: Path, project_path: str, url: Optional[str] = None) -> dict:
-    """Run validation script"""
-    if not script_path.exists():
-        print_warning(f"{name}: Script not found, skipping")
-        return {"name": name, "passed": True, "skipped": True, "duration": 0}
+# Scheduling constraints, by check name. Lighthouse measures page timings, so
+# it runs alone; Playwright drives the same URL, so it waits for Lighthouse.
+CHECK_AFTER = {
+    "Playwright E2E": ("Lighthouse Audit",),
+}
+EXCLUSIVE_CHECKS = {"Lighthouse Audit"}
 
-    print_step(f"Running: {name}")
-    start_time = datetime.now()
-
-    # Build command
+def build_command(script_path: Path, project_path: str, url: Optional[str] = None) -> List[str]:
+    """Build the command line of a validation script"""
     cmd = ["python", str(script_path), project_path]
     if url and ("lighthouse" in script_path.name.lower() or "playwright" in script_path.name.lower()):
         cmd.append(url)
+    return cmd
 
-    # Run
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 minute timeout for slow checks
-        )
-
-        duration = (datetime.now() - start_time).total_seconds()
-        passed = result.returncode == 0
+def on_start(check: Check):
+    print_step(f"Running: {check.name} [{check.category}]")
 
-        if passed:
-            print_success(f"{name}: PASSED ({duration:.1f}s)")
-        else:
-            print_error(f"{name}: FAILED ({duration:.1f}s)")
-            if result.stderr:
-                print(f"  {result.stderr[:300]}")
-
-        return {
-            "name": name,
-            "passed": passed,
-            "output": result.stdout,
-            "error": result.stderr,
-            "skipped": False,
-            "duration": duration
-        }
-
-    except subprocess.TimeoutExpired:
-        duration = (datetime.now() - start_time).total_seconds()
-        print_error(f"{name}: TIMEOUT (>{duration:.0f}s)")
-        return {"name": name, "passed": False, "skipped": False, "duration": duration, "error": "Timeout"}
-
-    except Exception as e:
-        duration = (datetime.now() - start_time).total_seconds()
-        print_error(f"{name}: ERROR - {str(e)}")
-        return {"name": name, "passed": False, "skipped": False, "duration": duration, "error": str(e)}
+def on_finish(check: Check, result: dict):
+    """Report a check as soon as it completes"""
+    name, duration = check.name, result["duration"]
+    if result["cancelled"]:
+        print_warning(f"{name}: CANCELLED ({duration:.1f}s)")
+    elif result["skipped"]:
+        print_warning(f"{name}: Script not found, skipping")
+    elif result["passed"]:
+        print_success(f"{name}: PASSED ({duration:.1f}s)")
+    elif result["error"].startswith("Timeout"):
+        print_error(f"{name}: TIMEOUT ({duration:.0f}s)")
+    else:
+        print_error(f"{name}: FAILED ({duration:.1f}s)")
 
 def print_final_report(results: List[dict], start_time: datetime):
     """Print comprehensive final report"""
@@ -208,14 +194,18 @@ def print_final_report(results: List[dict], start_time: datetime):
     # Statistics
     total = len(results)
     passed = sum(1 for r in results if r["passed"] and not r.get("skipped"))
-    failed = sum(1 for r in results if not r["passed"] and not r.get("skipped"))
-    skipped = sum(1 for r in results if r.get("skipped"))
+    failed = sum(1 for r in results if not r["passed"] and not r.get("skipped") and not r.get("cancelled"))
+    skipped = sum(1 for r in results if r.get("skipped") and not r.get("cancelled"))
+    cancelled = sum(1 for r in results if r.get("cancelled"))
+    check_time = sum(r.get("duration", 0) for r in results)
 
-    print(f"Total Duration: {total_duration:.1f}s")
+    print(f"Total Duration: {total_duration:.1f}s (checks took {check_time:.1f}s)")
     print(f"Total Checks: {total}")
     print(f"{Colors.GREEN}✅ Passed: {passed}{Colors.ENDC}")
     print(f"{Colors.RED}❌ Failed: {failed}{Colors.ENDC}")
     print(f"{Colors.YELLOW}⏭️  Skipped: {skipped}{Colors.ENDC}")
+    if cancelled:
+        print(f"{Colors.YELLOW}⏹️  Cancelled: {cancelled}{Colors.ENDC}")
     print()
 
     # Category breakdown
@@ -228,14 +218,16 @@ def print_final_report(results: List[dict], start_time: datetime):
             print(f"\n{Colors.BOLD}{Colors.CYAN}{current_category}:{Colors.ENDC}")
 
         # Print result
-        if r.get("skipped"):
+        if r.get("cancelled"):
+            status = f"{Colors.YELLOW}⏹️ {Colors.ENDC}"
+        elif r.get("skipped"):
             status = f"{Colors.YELLOW}⏭️ {Colors.ENDC}"
         elif r["passed"]:
             status = f"{Colors.GREEN}✅{Colors.ENDC}"
         else:
             status = f"{Colors.RED}❌{Colors.ENDC}"
 
-        duration_str = f"({r.get('duration', 0):.1f}s)" if not r.get("skipped") else ""
+        duration_str = f"({r.get('duration', 0):.1f}s wall)" if not r.get("skipped") else ""
         print(f"  {status} {r['name']} {duration_str}")
 
     print()
@@ -244,7 +236,7 @@ def print_final_report(results: List[dict], start_time: datetime):
     if failed > 0:
         print(f"{Colors.BOLD}{Colors.RED}❌ FAILED CHECKS:{Colors.ENDC}")
         for r in results:
-            if not r["passed"] and not r.get("skipped"):
+            if not r["passed"] and not r.get("skipped") and not r.get("cancelled"):
                 print(f"\n{Colors.RED}✗ {r['name']}{Colors.ENDC}")
                 if r.get("error"):
                     error_preview = r["error"][:200]
@@ -268,12 +260,15 @@ def main():
 Examples:
   python scripts/verify_all.py . --url http://localhost:3000
   python scripts/verify_all.py . --url https://staging.example.com --no-e2e
+  python scripts/verify_all.py . --url http://localhost:3000 --jobs 8 --stop-on-fail
         """
     )
     parser.add_argument("project", help="Project path to validate")
     parser.add_argument("--url", required=True, help="URL for performance & E2E checks")
     parser.add_argument("--no-e2e", action="store_true", help="Skip E2E tests")
-    parser.add_argument("--stop-on-fail", action="store_true", help="Stop on first failure")
+    parser.add_argument("--stop-on-fail", action="store_true", help="Stop on first critical failure")
+    parser.add_argument("-j", "--jobs", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Checks to run at once (default: %(default)s; 1 runs them one by one)")
 
     args = parser.parse_args()
 
@@ -289,9 +284,9 @@ Examples:
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
     start_time = datetime.now()
-    results = []
+    checks = []
 
-    # Run all verification categories
+    # Collect all verification categories, in priority order
     for suite in VERIFICATION_SUITE:
         category = suite["category"]
         requires_url = suite.get("requires_url", False)
@@ -304,19 +299,35 @@ Examples:
         if args.no_e2e and category == "E2E Testing":
             continue
 
-        print_header(f"📋 {category.upper()}")
-
         for name, script_path, required in suite["checks"]:
             script = project_path / script_path
-            result = run_script(name, script, str(project_path), args.url)
-            result["category"] = category
-            results.append(result)
-
-            # Stop on critical failure if flag set
-            if args.stop_on_fail and required and not result["passed"] and not result.get("skipped"):
-                print_error(f"CRITICAL: {name} failed. Stopping verification.")
-                print_final_report(results, start_time)
-                sys.exit(1)
+            checks.append(Check(
+                name=name,
+                script=script,
+                cmd=build_command(script, str(project_path), args.url),
+                category=category,
+                required=required,
+                after=CHECK_AFTER.get(name, ()),
+                exclusive=name in EXCLUSIVE_CHECKS,
+            ))
+
+    # Run independent checks concurrently; results come back in suite order
+    print_header(f"📋 RUNNING {len(checks)} CHECKS, {args.jobs} AT A TIME")
+    results = run_checks(
+        checks,
+        jobs=args.jobs,
+        timeout=600,  # 10 minute timeout for slow checks
+        stop_on_fail=args.stop_on_fail,
+        on_start=on_start,
+        on_finish=on_finish,
+    )
+
+    if any(r["cancelled"] for r in results):
+        failed = next(r["name"] for r in results
+                      if r["required"] and not r["passed"] and not r["skipped"] and not r["cancelled"])
+        print_error(f"CRITICAL: {failed} failed. Stopping verification.")
+        print_final_report(results, start_time)
+        sys.exit(1)
 
     # Print final report
     all_passed = print_final_report(results, start_time)
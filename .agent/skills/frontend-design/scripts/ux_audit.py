@@ -95,6 +95,9 @@ import re
 import json
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "scripts"))
+from scan_engine import RuleSet, ScanEngine
+
 class UXAuditor:
     def __init__(self):
         self.issues = []
@@ -107,7 +110,9 @@ class UXAuditor:
             with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
                 content = f.read()
         except: return
+        self.audit_content(filepath, content)
 
+    def audit_content(self, filepath: str, content: str) -> None:
         self.files_checked += 1
         filename = os.path.basename(filepath)
 
@@ -673,11 +678,13 @@ class UXAuditor:
 
     def audit_directory(self, directory: str) -> None:
         extensions = {'.tsx', '.jsx', '.html', '.vue', '.svelte', '.css'}
-        for root, dirs, files in os.walk(directory):
-            dirs[:] = [d for d in dirs if d not in {'node_modules', '.git', 'dist', 'build', '.next'}]
-            for file in files:
-                if Path(file).suffix in extensions:
-                    self.audit_file(os.path.join(root, file))
+        engine = ScanEngine(directory, {'node_modules', '.git', 'dist', 'build', '.next'})
+        engine.register(RuleSet("ux-audit", lambda name: Path(name).suffix in extensions, _audit_one))
+        for _, report in engine.run()["ux-audit"]:
+            self.files_checked += report["files_checked"]
+            self.issues.extend(report["issues"])
+            self.warnings.extend(report["warnings"])
+            self.passed_count += report["passed_checks"]
 
     def get_report(self):
         return {
@@ -688,6 +695,12 @@ class UXAuditor:
             "compliant": len(self.issues) == 0
         }
 
+def _audit_one(rel_path: str, content: str) -> dict:
+    """Audit one file for the scan engine, which caches the report"""
+    auditor = UXAuditor()
+    auditor.audit_content(rel_path, content)
+    return auditor.get_report()
+
 def main():
     if len(sys.argv) < 2: sys.exit(1)
 
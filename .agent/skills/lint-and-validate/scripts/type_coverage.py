@@ -8,6 +8,9 @@ import re
 import subprocess
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "scripts"))
+from scan_engine import RuleSet, ScanEngine
+
 # Fix Windows console encoding for Unicode output
 try:
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
@@ -15,40 +18,70 @@ try:
 except AttributeError:
     pass  # Python < 3.7
 
-def check_typescript_coverage(project_path: Path) -> dict:
+SKIP_DIRS = {'node_modules', '.git', '__pycache__', 'venv', '.venv'}
+MAX_FILES = 30  # Files analyzed per language
+
+def _ts_file_stats(rel_path: str, content: str) -> list:
+    """[any count, untyped functions, typed functions] of one file"""
+    # Count 'any' usage
+    any_matches = re.findall(r':\s*any\b', content)
+
+    # Find functions without return types
+    # function name(params) { - no return type
+    untyped = re.findall(r'function\s+\w+\s*\([^)]*\)\s*{', content)
+    # Arrow functions without types: const fn = (x) => or (x) =>
+    untyped += re.findall(r'=\s*\([^:)]*\)\s*=>', content)
+
+    # Count typed functions
+    typed = re.findall(r'function\s+\w+\s*\([^)]*\)\s*:\s*\w+', content)
+    typed += re.findall(r':\s*\([^)]*\)\s*=>\s*\w+', content)
+    return [len(any_matches), len(untyped), len(typed)]
+
+def _py_file_stats(rel_path: str, content: str) -> list:
+    """[Any count, typed functions, all functions] of one file"""
+    # Count Any usage
+    any_matches = re.findall(r':\s*Any\b', content)
+
+    # Find functions with type hints
+    typed_funcs = re.findall(r'def\s+\w+\s*\([^)]*:[^)]+\)', content)
+    typed_funcs += re.findall(r'def\s+\w+\s*\([^)]*\)\s*->', content)
+
+    # Find all functions
+    all_funcs = re.findall(r'def\s+\w+\s*\(', content)
+    return [len(any_matches), len(typed_funcs), len(all_funcs)]
+
+TS_RULES = RuleSet("type-coverage-ts", lambda name: name.endswith(('.ts', '.tsx')) and not name.endswith('.d.ts'),
+                   _ts_file_stats, errors="ignore", max_files=MAX_FILES)
+PY_RULES = RuleSet("type-coverage-py", lambda name: name.endswith('.py'),
+                   _py_file_stats, errors="ignore", max_files=MAX_FILES)
+
+def scan_project(project_path: Path) -> dict:
+    """Collect per-file stats for both languages in one walk of the tree."""
+    engine = ScanEngine(str(project_path), SKIP_DIRS)
+    engine.register(TS_RULES).register(PY_RULES)
+    return engine.run()
+
+def check_typescript_coverage(project_path: Path, files: list = None) -> dict:
     """Check TypeScript type coverage."""
     issues = []
     passed = []
     stats = {'any_count': 0, 'untyped_functions': 0, 'total_functions': 0}
 
-    ts_files = list(project_path.rglob("*.ts")) + list(project_path.rglob("*.tsx"))
-    ts_files = [f for f in ts_files if 'node_modules' not in str(f) and '.d.ts' not in str(f)]
+    if files is None:
+        files = scan_project(project_path)[TS_RULES.name]
+    ts_files = [rel_path for rel_path, _ in files]
 
     if not ts_files:
         return {'type': 'typescript', 'files': 0, 'passed': [], 'issues': ["[!] No TypeScript files found"], 'stats': stats}
 
-    for file_path in ts_files[:30]:  # Limit
-        try:
-            content = file_path.read_text(encoding='utf-8', errors='ignore')
-
-            # Count 'any' usage
-            any_matches = re.findall(r':\s*any\b', content)
-            stats['any_count'] += len(any_matches)
-
-            # Find functions without return types
-            # function name(params) { - no return type
-            untyped = re.findall(r'function\s+\w+\s*\([^)]*\)\s*{', content)
-            # Arrow functions without types: const fn = (x) => or (x) =>
-            untyped += re.findall(r'=\s*\([^:)]*\)\s*=>', content)
-            stats['untyped_functions'] += len(untyped)
-
-            # Count typed functions
-            typed = re.findall(r'function\s+\w+\s*\([^)]*\)\s*:\s*\w+', content)
-            typed += re.findall(r':\s*\([^)]*\)\s*=>\s*\w+', content)
-            stats['total_functions'] += len(typed) + len(untyped)
-
-        except Exception:
+    # Only the first MAX_FILES files carry stats
+    for _, file_stats in files:
+        if file_stats is None:
             continue
+        any_count, untyped, typed = file_stats
+        stats['any_count'] += any_count
+        stats['untyped_functions'] += untyped
+        stats['total_functions'] += typed + untyped
 
     # Analyze results
     if stats['any_count'] == 0:
@@ -71,37 +104,27 @@ def check_typescript_coverage(project_path: Path) -> dict:
 
     return {'type': 'typescript', 'files': len(ts_files), 'passed': passed, 'issues': issues, 'stats': stats}
 
-def check_python_coverage(project_path: Path) -> dict:
+def check_python_coverage(project_path: Path, files: list = None) -> dict:
     """Check Python type hints coverage."""
     issues = []
     passed = []
     stats = {'untyped_functions': 0, 'typed_functions': 0, 'any_count': 0}
 
-    py_files = list(project_path.rglob("*.py"))
-    py_files = [f for f in py_files if not any(x in str(f) for x in ['venv', '__pycache__', '.git', 'node_modules'])]
+    if files is None:
+        files = scan_project(project_path)[PY_RULES.name]
+    py_files = [rel_path for rel_path, _ in files]
 
     if not py_files:
         return {'type': 'python', 'files': 0, 'passed': [], 'issues': ["[!] No Python files found"], 'stats': stats}
 
-    for file_path in py_files[:30]:  # Limit
-        try:
-            content = file_path.read_text(encoding='utf-8', errors='ignore')
-
-            # Count Any usage
-            any_matches = re.findall(r':\s*Any\b', content)
-            stats['any_count'] += len(any_matches)
-
-            # Find functions with type hints
-            typed_funcs = re.findall(r'def\s+\w+\s*\([^)]*:[^)]+\)', content)
-            typed_funcs += re.findall(r'def\s+\w+\s*\([^)]*\)\s*->', content)
-            stats['typed_functions'] += len(typed_funcs)
-
-            # Find functions without type hints
-            all_funcs = re.findall(r'def\s+\w+\s*\(', content)
-            stats['untyped_functions'] += len(all_funcs) - len(typed_funcs)
-
-        except Exception:
+    # Only the first MAX_FILES files carry stats
+    for _, file_stats in files:
+        if file_stats is None:
             continue
+        any_count, typed, all_funcs = file_stats
+        stats['any_count'] += any_count
+        stats['typed_functions'] += typed
+        stats['untyped_functions'] += all_funcs - typed
 
     total = stats['typed_functions'] + stats['untyped_functions']
 
@@ -134,14 +157,15 @@ def main():
     print("=" * 60 + "\n")
 
     results = []
+    files = scan_project(project_path)
 
     # Check TypeScript
-    ts_result = check_typescript_coverage(project_path)
+    ts_result = check_typescript_coverage(project_path, files[TS_RULES.name])
     if ts_result['files'] > 0:
         results.append(ts_result)
 
     # Check Python
-    py_result = check_python_coverage(project_path)
+    py_result = check_python_coverage(project_path, files[PY_RULES.name])
     if py_result['files'] > 0:
         results.append(py_result)
 
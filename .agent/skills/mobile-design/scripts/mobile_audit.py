@@ -71,6 +71,9 @@ import re
 import json
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "scripts"))
+from scan_engine import RuleSet, ScanEngine
+
 class MobileAuditor:
     def __init__(self):
         self.issues = []
@@ -84,7 +87,9 @@ class MobileAuditor:
                 content = f.read()
         except:
             return
+        self.audit_content(filepath, content)
 
+    def audit_content(self, filepath: str, content: str) -> None:
         self.files_checked += 1
         filename = os.path.basename(filepath)
 
@@ -612,11 +617,13 @@ class MobileAuditor:
 
     def audit_directory(self, directory: str) -> None:
         extensions = {'.tsx', '.ts', '.jsx', '.js', '.dart'}
-        for root, dirs, files in os.walk(directory):
-            dirs[:] = [d for d in dirs if d not in {'node_modules', '.git', 'dist', 'build', '.next', 'ios', 'android', 'build', '.idea'}]
-            for file in files:
-                if Path(file).suffix in extensions:
-                    self.audit_file(os.path.join(root, file))
+        engine = ScanEngine(directory, {'node_modules', '.git', 'dist', 'build', '.next', 'ios', 'android', 'build', '.idea'})
+        engine.register(RuleSet("mobile-audit", lambda name: Path(name).suffix in extensions, _audit_one))
+        for _, report in engine.run()["mobile-audit"]:
+            self.files_checked += report["files_checked"]
+            self.issues.extend(report["issues"])
+            self.warnings.extend(report["warnings"])
+            self.passed_count += report["passed_checks"]
 
     def get_report(self):
         return {
@@ -628,6 +635,13 @@ class MobileAuditor:
         }
 
 
+def _audit_one(rel_path: str, content: str) -> dict:
+    """Audit one file for the scan engine, which caches the report"""
+    auditor = MobileAuditor()
+    auditor.audit_content(rel_path, content)
+    return auditor.get_report()
+
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python mobile_audit.py <directory>")
@@ -3,7 +3,7 @@
 Skill: vulnerability-scanner
 Script: security_scan.py
 Purpose: Validate that security principles from SKILL.md are applied correctly
-Usage: python security_scan.py <project_path> [--scan-type all|deps|secrets|patterns|config]
+Usage: python security_scan.py <project_path> [--scan-type all|deps|secrets|patterns|config] [--jobs N]
 Output: JSON with validation findings
 
 This script verifies:
@@ -13,15 +13,19 @@ This script verifies:
 4. Configuration - Security settings validated (OWASP A02)
 """
 import subprocess
+import io
 import json
 import os
 import sys
 import re
 import argparse
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "scripts"))
+from scan_engine import RuleSet, ScanEngine
+
 # Fix Windows console encoding for Unicode output
 try:
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
@@ -85,9 +89,168 @@ DANGEROUS_PATTERNS = [
     (r'yaml\.load\s*\([^)]*\)(?!\s*,\s*Loader)', "Unsafe YAML load", "high", "Deserialization risk"),
 ]
 
+CONFIG_ISSUES = [
+    (r'"DEBUG"\s*:\s*true', "Debug mode enabled", "high"),
+    (r'debug\s*=\s*True', "Debug mode enabled", "high"),
+    (r'NODE_ENV.*development', "Development mode in config", "medium"),
+    (r'"CORS_ALLOW_ALL".*true', "CORS allow all origins", "high"),
+    (r'"Access-Control-Allow-Origin".*\*', "CORS wildcard", "high"),
+    (r'allowCredentials.*true.*origin.*\*', "Dangerous CORS combo", "critical"),
+]
+
 SKIP_DIRS = {'node_modules', '.git', 'dist', 'build', '__pycache__', '.venv', 'venv', '.next'}
 CODE_EXTENSIONS = {'.js', '.ts', '.jsx', '.tsx', '.py', '.go', '.java', '.rb', '.php'}
 CONFIG_EXTENSIONS = {'.json', '.yaml', '.yml', '.toml', '.env', '.env.local', '.env.development'}
+CONFIG_FILES = {'next.config.js', 'webpack.config.js', '.eslintrc.js'}
+
+
+# ============================================================================
+#  PER-FILE RULES
+# ============================================================================
+# Each returns a JSON-serializable result for one file. The scan engine reads
+# every file once for all of them and caches results by mtime and size.
+
+def _match_secrets(name: str) -> bool:
+    ext = Path(name).suffix.lower()
+    return ext in CODE_EXTENSIONS or ext in CONFIG_EXTENSIONS
+
+
+def _match_patterns(name: str) -> bool:
+    return Path(name).suffix.lower() in CODE_EXTENSIONS
+
+
+def _match_config(name: str) -> bool:
+    return Path(name).suffix.lower() in CONFIG_EXTENSIONS or name in CONFIG_FILES
+
+
+# ----------------------------------------------------------------------------
+#  Literal anchors
+# ----------------------------------------------------------------------------
+# Every match of a pattern contains one of its anchors, compared after
+# _fold(). A pattern only runs where one of its anchors occurs, so a file
+# with none of them costs one substring search per anchor instead of a
+# regex pass per pattern; counts and lines found are unchanged. Patterns
+# left out here always run.
+
+PATTERN_ANCHORS = {
+    # SECRET_PATTERNS
+    r'api[_-]?key\s*[=:]\s*["\'][^"\']{10,}["\']': ("api",),
+    r'token\s*[=:]\s*["\'][^"\']{10,}["\']': ("token",),
+    r'bearer\s+[a-zA-Z0-9\-_.]+': ("bearer",),
+    r'AKIA[0-9A-Z]{16}': ("akia",),
+    r'aws[_-]?secret[_-]?access[_-]?key\s*[=:]\s*["\'][^"\']+["\']': ("aws",),
+    r'AZURE[_-]?[A-Z_]+\s*[=:]\s*["\'][^"\']+["\']': ("azure",),
+    r'GOOGLE[_-]?[A-Z_]+\s*[=:]\s*["\'][^"\']+["\']': ("google",),
+    r'password\s*[=:]\s*["\'][^"\']{4,}["\']': ("password",),
+    r'(mongodb|postgres|mysql|redis):\/\/[^\s"\']+': ("://",),
+    r'-----BEGIN\s+(RSA|PRIVATE|EC)\s+KEY-----': ("-----begin",),
+    r'ssh-rsa\s+[A-Za-z0-9+/]+': ("ssh-rsa",),
+    r'eyJ[A-Za-z0-9-_]+\.eyJ[A-Za-z0-9-_]+\.[A-Za-z0-9-_]+': ("eyj",),
+
+    # DANGEROUS_PATTERNS
+    r'eval\s*\(': ("eval",),
+    r'exec\s*\(': ("exec",),
+    r'new\s+Function\s*\(': ("function",),
+    r'child_process\.exec\s*\(': ("child_process.exec",),
+    r'subprocess\.call\s*\([^)]*shell\s*=\s*True': ("subprocess.call",),
+    r'dangerouslySetInnerHTML': ("dangerouslysetinnerhtml",),
+    r'\.innerHTML\s*=': (".innerhtml",),
+    r'document\.write\s*\(': ("document.write",),
+    r'["\'][^"\']*\+\s*[a-zA-Z_]+\s*\+\s*["\'].*(?:SELECT|INSERT|UPDATE|DELETE)': ("select", "insert", "update", "delete"),
+    r'f"[^"]*(?:SELECT|INSERT|UPDATE|DELETE)[^"]*\{': ('f"',),
+    r'verify\s*=\s*False': ("verify",),
+    r'--insecure': ("--insecure",),
+    r'disable[_-]?ssl': ("disable",),
+    r'pickle\.loads?\s*\(': ("pickle.",),
+    r'yaml\.load\s*\([^)]*\)(?!\s*,\s*Loader)': ("yaml.load",),
+}
+
+# Besides ASCII letters, re.IGNORECASE matches these to ASCII letters. After
+# mapping them and lower(), text contains an anchor wherever the pattern's
+# case-insensitive match of it could be.
+_FOLD = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+
+
+def _fold(text: str) -> str:
+    return text.translate(_FOLD).lower()
+
+
+def _compile(patterns: list) -> list:
+    """[(compiled regex, anchors or None, rest of the entry), ...]"""
+    return [
+        (re.compile(entry[0], re.IGNORECASE), PATTERN_ANCHORS.get(entry[0]), entry[1:])
+        for entry in patterns
+    ]
+
+
+_SECRET_MATCHERS = _compile(SECRET_PATTERNS)
+_DANGEROUS_MATCHERS = _compile(DANGEROUS_PATTERNS)
+
+
+def _present(text: str, anchors) -> bool:
+    return anchors is None or any(a in text for a in anchors)
+
+
+def _file_secrets(rel_path: str, content: str) -> List[list]:
+    """[type, severity, count] for each secret pattern found"""
+    hits = []
+    folded = _fold(content)
+    for regex, anchors, (secret_type, severity) in _SECRET_MATCHERS:
+        if not _present(folded, anchors):
+            continue
+        matches = regex.findall(content)
+        if matches:
+            hits.append([secret_type, severity, len(matches)])
+    return hits
+
+
+def _file_patterns(rel_path: str, content: str) -> List[dict]:
+    """A finding for each dangerous pattern on each line"""
+    hits = []
+    folded = _fold(content)
+    candidates = [m for m in _DANGEROUS_MATCHERS if _present(folded, m[1])]
+    if not candidates:
+        return hits
+
+    # _fold() never adds or removes newlines, so the lines stay aligned
+    lines = io.StringIO(content, newline="\n")
+    folded_lines = io.StringIO(folded, newline="\n")
+    for line_num, (line, folded_line) in enumerate(zip(lines, folded_lines), 1):
+        for regex, anchors, (name, severity, category) in candidates:
+            if _present(folded_line, anchors) and regex.search(line):
+                hits.append({
+                    "line": line_num,
+                    "pattern": name,
+                    "severity": severity,
+                    "category": category,
+                    "snippet": line.strip()[:80]
+                })
+    return hits
+
+
+def _file_config(rel_path: str, content: str) -> List[list]:
+    """[issue, severity] for each configuration issue found"""
+    return [
+        [issue, severity]
+        for pattern, issue, severity in CONFIG_ISSUES
+        if re.search(pattern, content, re.IGNORECASE)
+    ]
+
+
+FILE_RULESETS = {
+    "secrets": RuleSet("security-secrets", _match_secrets, _file_secrets, errors="ignore"),
+    "patterns": RuleSet("security-patterns", _match_patterns, _file_patterns, errors="ignore"),
+    "config": RuleSet("security-config", _match_config, _file_config, errors="ignore"),
+}
+
+
+def scan_files(project_path: str, keys: List[str], jobs: int = 1) -> Dict[str, List[Tuple[str, Any]]]:
+    """Run the FILE_RULESETS named by keys over the project in one walk."""
+    engine = ScanEngine(project_path, SKIP_DIRS, jobs=jobs)
+    for key in keys:
+        engine.register(FILE_RULESETS[key])
+    by_name = engine.run()
+    return {key: by_name[FILE_RULESETS[key].name] for key in keys}
 
 
 # ============================================================================
@@ -178,7 +341,7 @@ def scan_dependencies(project_path: str) -> Dict[str, Any]:
     return results
 
 
-def scan_secrets(project_path: str) -> Dict[str, Any]:
+def scan_secrets(project_path: str, files: Optional[List[Tuple[str, Any]]] = None) -> Dict[str, Any]:
     """
     Validate no hardcoded secrets (OWASP A04).
     Checks: API keys, tokens, passwords, cloud credentials.
@@ -191,34 +354,20 @@ def scan_secrets(project_path: str) -> Dict[str, Any]:
         "by_severity": {"critical": 0, "high": 0, "medium": 0}
     }
 
-    for root, dirs, files in os.walk(project_path):
-        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+    if files is None:
+        files = scan_files(project_path, ["secrets"])["secrets"]
 
-        for file in files:
-            ext = Path(file).suffix.lower()
-            if ext not in CODE_EXTENSIONS and ext not in CONFIG_EXTENSIONS:
-                continue
+    for rel_path, hits in files:
+        results["scanned_files"] += 1
 
-            filepath = Path(root) / file
-            results["scanned_files"] += 1
-
-            try:
-                with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-
-                    for pattern, secret_type, severity in SECRET_PATTERNS:
-                        matches = re.findall(pattern, content, re.IGNORECASE)
-                        if matches:
-                            results["findings"].append({
-                                "file": str(filepath.relative_to(project_path)),
-                                "type": secret_type,
-                                "severity": severity,
-                                "count": len(matches)
-                            })
-                            results["by_severity"][severity] += len(matches)
-
-            except Exception:
-                pass
+        for secret_type, severity, count in hits:
+            results["findings"].append({
+                "file": rel_path,
+                "type": secret_type,
+                "severity": severity,
+                "count": count
+            })
+            results["by_severity"][severity] += count
 
     if results["by_severity"]["critical"] > 0:
         results["status"] = "[!!] CRITICAL: Secrets exposed!"
@@ -233,7 +382,7 @@ def scan_secrets(project_path: str) -> Dict[str, Any]:
     return results
 
 
-def scan_code_patterns(project_path: str) -> Dict[str, Any]:
+def scan_code_patterns(project_path: str, files: Optional[List[Tuple[str, Any]]] = None) -> Dict[str, Any]:
     """
     Validate dangerous code patterns (OWASP A05).
     Checks: Injection risks, XSS, unsafe deserialization.
@@ -246,36 +395,16 @@ def scan_code_patterns(project_path: str) -> Dict[str, Any]:
         "by_category": {}
     }
 
-    for root, dirs, files in os.walk(project_path):
-        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
-
-        for file in files:
-            ext = Path(file).suffix.lower()
-            if ext not in CODE_EXTENSIONS:
-                continue
+    if files is None:
+        files = scan_files(project_path, ["patterns"])["patterns"]
 
-            filepath = Path(root) / file
-            results["scanned_files"] += 1
+    for rel_path, hits in files:
+        results["scanned_files"] += 1
 
-            try:
-                with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                    lines = f.readlines()
-
-                    for line_num, line in enumerate(lines, 1):
-                        for pattern, name, severity, category in DANGEROUS_PATTERNS:
-                            if re.search(pattern, line, re.IGNORECASE):
-                                results["findings"].append({
-                                    "file": str(filepath.relative_to(project_path)),
-                                    "line": line_num,
-                                    "pattern": name,
-                                    "severity": severity,
-                                    "category": category,
-                                    "snippet": line.strip()[:80]
-                                })
-                                results["by_category"][category] = results["by_category"].get(category, 0) + 1
-
-            except Exception:
-                pass
+        for hit in hits:
+            results["findings"].append({"file": rel_path, **hit})
+            category = hit["category"]
+            results["by_category"][category] = results["by_category"].get(category, 0) + 1
 
     critical_count = sum(1 for f in results["findings"] if f["severity"] == "critical")
     high_count = sum(1 for f in results["findings"] if f["severity"] == "high")
@@ -293,7 +422,7 @@ def scan_code_patterns(project_path: str) -> Dict[str, Any]:
     return results
 
 
-def scan_configuration(project_path: str) -> Dict[str, Any]:
+def scan_configuration(project_path: str, files: Optional[List[Tuple[str, Any]]] = None) -> Dict[str, Any]:
     """
     Validate security configuration (OWASP A02).
     Checks: Security headers, CORS, debug modes.
@@ -306,39 +435,16 @@ def scan_configuration(project_path: str) -> Dict[str, Any]:
     }
 
     # Check common config files for issues
-    config_issues = [
-        (r'"DEBUG"\s*:\s*true', "Debug mode enabled", "high"),
-        (r'debug\s*=\s*True', "Debug mode enabled", "high"),
-        (r'NODE_ENV.*development', "Development mode in config", "medium"),
-        (r'"CORS_ALLOW_ALL".*true', "CORS allow all origins", "high"),
-        (r'"Access-Control-Allow-Origin".*\*', "CORS wildcard", "high"),
-        (r'allowCredentials.*true.*origin.*\*', "Dangerous CORS combo", "critical"),
-    ]
-
-    for root, dirs, files in os.walk(project_path):
-        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
-
-        for file in files:
-            ext = Path(file).suffix.lower()
-            if ext not in CONFIG_EXTENSIONS and file not in ['next.config.js', 'webpack.config.js', '.eslintrc.js']:
-                continue
-
-            filepath = Path(root) / file
+    if files is None:
+        files = scan_files(project_path, ["config"])["config"]
 
-            try:
-                with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-
-                    for pattern, issue, severity in config_issues:
-                        if re.search(pattern, content, re.IGNORECASE):
-                            results["findings"].append({
-                                "file": str(filepath.relative_to(project_path)),
-                                "issue": issue,
-                                "severity": severity
-                            })
-
-            except Exception:
-                pass
+    for rel_path, hits in files:
+        for issue, severity in hits:
+            results["findings"].append({
+                "file": rel_path,
+                "issue": issue,
+                "severity": severity
+            })
 
     # Check for security header configurations
     header_files = ["next.config.js", "next.config.mjs", "middleware.ts", "nginx.conf"]
@@ -369,7 +475,7 @@ def scan_configuration(project_path: str) -> Dict[str, Any]:
 #  MAIN
 # ============================================================================
 
-def run_full_scan(project_path: str, scan_type: str = "all") -> Dict[str, Any]:
+def run_full_scan(project_path: str, scan_type: str = "all", jobs: int = 1) -> Dict[str, Any]:
     """Execute security validation scans."""
 
     report = {
@@ -392,9 +498,18 @@ def run_full_scan(project_path: str, scan_type: str = "all") -> Dict[str, Any]:
         "config": ("configuration", scan_configuration),
     }
 
+    # Walk the tree once for every file-based scan selected
+    file_scans = scan_files(project_path, [
+        key for key in FILE_RULESETS
+        if scan_type == "all" or scan_type == key
+    ], jobs)
+
     for key, (name, scanner) in scanners.items():
         if scan_type == "all" or scan_type == key:
-            result = scanner(project_path)
+            if key in file_scans:
+                result = scanner(project_path, file_scans[key])
+            else:
+                result = scanner(project_path)
             report["scans"][name] = result
 
             findings_count = len(result.get("findings", []))
@@ -427,6 +542,8 @@ def main():
                         default="all", help="Type of scan to run")
     parser.add_argument("--output", choices=["json", "summary"], default="json",
                         help="Output format")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for file scans (default: CPU count)")
 
     args = parser.parse_args()
 
@@ -434,7 +551,7 @@ def main():
         print(json.dumps({"error": f"Directory not found: {args.project_path}"}))
         sys.exit(1)
 
-    result = run_full_scan(args.project_path, args.scan_type)
+    result = run_full_scan(args.project_path, args.scan_type, args.jobs)
 
     if args.output == "summary":
         print(f"\n{'='*60}")
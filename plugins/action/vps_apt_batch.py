@@ -0,0 +1,318 @@
+# pylint: disable=C0103,R0903,W0212,E0401
+"""
+Ansible Action Plugin: vps_apt_batch
+Installs the apt packages of every enabled role in a single transaction.
+
+Each ``ansible.builtin.apt`` task takes the dpkg lock, checks the cache and
+runs the resolver on its own. This action collects the package sets declared
+by the roles of the play, works out which are missing from the target's dpkg
+database, and installs them with one apt call. Per-role attribution is kept:
+each role reports its own ``changed``/``failed`` state, and role tasks skip
+their own apt call when their role is listed in ``satisfied``.
+
+The plan only decides what to pass to apt. Whether a role changed is taken
+from the dpkg database after the transaction: a role changed when one of its
+packages was installed or changed version. Entries carrying ``tags`` are
+skipped unless the run selects one of them, so ``--tags`` runs only install
+the packages of the roles they run.
+
+The planner is pure Python and can be run offline against a dpkg status file:
+
+    python3 plugins/action/vps_apt_batch.py --status fake-status roles.yml
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import fnmatch
+import json
+import re
+import sys
+from collections import OrderedDict
+
+try:
+    from ansible.errors import AnsibleActionFail
+    from ansible.module_utils.parsing.convert_bool import boolean
+    from ansible.plugins.action import ActionBase
+except ImportError:
+    # Allow the planner to be used offline without Ansible installed.
+    ActionBase = object
+
+
+DOCUMENTATION = """
+    name: vps_apt_batch
+    short_description: Install the apt packages of enabled roles in one transaction
+    description:
+        - Collects the package sets of enabled roles and installs the missing
+          packages with a single apt transaction per host.
+        - Refreshes the apt cache at most once, and only when it is older than
+          I(cache_valid_time).
+        - In check mode, reports the per-role plan without changing anything.
+    options:
+        roles:
+            description:
+                - List of dicts with C(role), C(packages) and optional
+                  C(enabled) and C(tags).
+                - An entry with C(tags) is skipped unless the run selects one
+                  of them, as the role itself would be.
+            required: true
+        cache_valid_time:
+            description: Seconds an existing apt cache is considered fresh.
+            default: 3600
+    version_added: "3.0.0"
+"""
+
+#: dpkg-query format producing the same stanzas as /var/lib/dpkg/status.
+DPKG_QUERY = (
+    "dpkg-query -W -f='Package: ${Package}\\nStatus: ${Status}\\n"
+    "Version: ${Version}\\n\\n'"
+)
+
+#: Separators of version pins, architectures and target releases.
+QUALIFIER_RE = re.compile(r"[=:<>/]")
+
+
+def parse_dpkg_status(text):
+    """Return a dict of installed package name -> version in a dpkg status file"""
+    installed = {}
+    for stanza in text.split("\n\n"):
+        fields = {}
+        for line in stanza.splitlines():
+            if line[:1].isspace() or ":" not in line:
+                continue
+            key, _, value = line.partition(":")
+            fields[key.strip()] = value.strip()
+        status = fields.get("Status", "").split()
+        if fields.get("Package") and status[-1:] == ["installed"]:
+            installed[fields["Package"]] = fields.get("Version", "")
+    return installed
+
+
+def is_plain_name(package):
+    """True if `package` is a bare name the planner can check against dpkg"""
+    return not any(c in package for c in "=:*?[<>/")
+
+
+def tags_selected(tags, run_tags=("all",), skip_tags=()):
+    """True if a role tagged `tags` runs with --tags `run_tags`/--skip-tags `skip_tags`"""
+    tags = set(tags)
+    if tags & set(skip_tags):
+        return False
+    return "all" in run_tags or bool(tags & set(run_tags))
+
+
+def build_plan(roles, installed, run_tags=("all",), skip_tags=()):
+    """
+    Return an OrderedDict of role -> plan for the enabled entries of `roles`.
+
+    Each plan holds the role's ``packages`` and the ``missing`` subset not in
+    `installed`. Entries that are not plain package names (pinned versions,
+    architectures, globs) are always treated as missing and left to apt.
+    Disabled entries, and tagged entries not selected by `run_tags` and
+    `skip_tags`, are marked ``skipped``.
+    """
+    plan = OrderedDict()
+    for entry in roles:
+        name = entry["role"]
+        packages = [str(p) for p in entry.get("packages") or []]
+        tags = entry.get("tags")
+        if not entry.get("enabled", True) or (
+            tags and not tags_selected(tags, run_tags, skip_tags)
+        ):
+            plan[name] = {"packages": packages, "missing": [], "skipped": True}
+            continue
+        missing = [
+            p for p in packages if not is_plain_name(p) or p not in installed
+        ]
+        plan[name] = {"packages": packages, "missing": missing, "skipped": False}
+    return plan
+
+
+def changed_packages(before, after):
+    """Return the names installed or changed in version between two dpkg states"""
+    return set(n for n, version in after.items() if before.get(n) != version)
+
+
+def attribute_changes(plan, changed):
+    """
+    Set ``changed`` on each role plan whose missing packages are in `changed`.
+
+    Pinned and arch-qualified entries match on their bare name, and globs match
+    with fnmatch. Names that match nothing, such as virtual packages, are
+    credited with any change no other role accounts for.
+    """
+    claimed = set()
+    unmatched = []
+    for role_plan in plan.values():
+        role_plan["changed"] = False
+        for package in role_plan["missing"]:
+            hits = fnmatch.filter(changed, QUALIFIER_RE.split(package, 1)[0])
+            if hits:
+                role_plan["changed"] = True
+                claimed.update(hits)
+            else:
+                unmatched.append(role_plan)
+    if changed - claimed:
+        for role_plan in unmatched:
+            role_plan["changed"] = True
+
+
+def union_missing(plan):
+    """Return the missing packages of all roles, without duplicates"""
+    seen = OrderedDict()
+    for role_plan in plan.values():
+        for package in role_plan["missing"]:
+            seen[package] = True
+    return list(seen)
+
+
+class ActionModule(ActionBase):
+    """Install the packages of all enabled roles in a single apt transaction"""
+
+    TRANSFERS_FILES = False
+    _VALID_ARGS = frozenset(("roles", "cache_valid_time"))
+
+    def _apt(self, packages, task_vars, update_cache, cache_valid_time):
+        args = {"name": packages, "state": "present"}
+        if update_cache:
+            args.update(update_cache=True, cache_valid_time=cache_valid_time)
+        return self._execute_module(
+            module_name="ansible.legacy.apt",
+            module_args=args,
+            task_vars=task_vars,
+        )
+
+    def _get_installed(self):
+        res = self._low_level_execute_command(DPKG_QUERY)
+        if res["rc"] != 0:
+            raise AnsibleActionFail(
+                "dpkg-query failed: %s" % (res.get("stderr") or res.get("stdout"))
+            )
+        return parse_dpkg_status(res["stdout"])
+
+    def _normalize(self, roles):
+        if not isinstance(roles, list):
+            raise AnsibleActionFail("roles must be a list")
+        entries = []
+        for entry in roles:
+            if not isinstance(entry, dict) or "role" not in entry:
+                raise AnsibleActionFail("each roles entry needs a 'role' key")
+            entry = dict(entry)
+            entry["enabled"] = boolean(entry.get("enabled", True), strict=False)
+            entries.append(entry)
+        return entries
+
+    def run(self, tmp=None, task_vars=None):
+        result = super().run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        task_vars = task_vars or {}
+        roles = self._normalize(self._task.args.get("roles") or [])
+        cache_valid_time = int(self._task.args.get("cache_valid_time", 3600))
+
+        installed = self._get_installed()
+        plan = build_plan(
+            roles,
+            installed,
+            task_vars.get("ansible_run_tags") or ["all"],
+            task_vars.get("ansible_skip_tags") or [],
+        )
+        missing = union_missing(plan)
+        result.update(
+            roles=plan,
+            packages=missing,
+            transactions=0,
+            changed=False,
+        )
+
+        if missing and not self._play_context.check_mode:
+            apt_result = self._apt(missing, task_vars, True, cache_valid_time)
+            result["transactions"] = 1
+            result["cache_updated"] = bool(apt_result.get("cache_updated"))
+            if apt_result.get("failed"):
+                # The combined transaction failed: retry role by role so that
+                # the failure is attributed to the role that caused it.
+                self._run_per_role(plan, task_vars, result)
+            else:
+                for role_plan in plan.values():
+                    role_plan["changed"] = role_plan["failed"] = False
+                if apt_result.get("changed"):
+                    attribute_changes(
+                        plan, changed_packages(installed, self._get_installed())
+                    )
+            result["changed"] = bool(apt_result.get("changed")) or any(
+                p["changed"] for p in plan.values()
+            )
+        else:
+            # Nothing to install, or check mode: report what apt would be
+            # asked to do.
+            for role_plan in plan.values():
+                role_plan["changed"] = bool(role_plan["missing"])
+                role_plan["failed"] = False
+            result["changed"] = bool(missing)
+
+        failed = [n for n, p in plan.items() if p["failed"]]
+        result["satisfied"] = [
+            n for n, p in plan.items() if not (p["skipped"] or p["failed"])
+        ]
+        if failed:
+            result["failed"] = True
+            result["msg"] = "apt batch failed for roles: %s" % (", ".join(failed),)
+        return result
+
+    def _run_per_role(self, plan, task_vars, result):
+        for role_plan in plan.values():
+            role_plan["changed"] = role_plan["failed"] = False
+            if not role_plan["missing"]:
+                continue
+            res = self._apt(role_plan["missing"], task_vars, False, 0)
+            result["transactions"] += 1
+            role_plan["changed"] = bool(res.get("changed"))
+            role_plan["failed"] = bool(res.get("failed"))
+            if role_plan["failed"]:
+                role_plan["msg"] = res.get("msg", "")
+
+
+def main(argv=None):
+    """Print the plan for a roles file against a dpkg status file"""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "roles", help="YAML/JSON list of {role, packages, enabled, tags}"
+    )
+    parser.add_argument(
+        "--tags", default="all", help="comma-separated tags selected by the run"
+    )
+    parser.add_argument(
+        "--skip-tags", default="", help="comma-separated tags skipped by the run"
+    )
+    parser.add_argument(
+        "--status", default="/var/lib/dpkg/status", help="dpkg status file"
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.status, encoding="utf-8") as fp:
+        installed = parse_dpkg_status(fp.read())
+    with open(args.roles, encoding="utf-8") as fp:
+        roles = yaml.safe_load(fp)
+
+    plan = build_plan(
+        roles,
+        installed,
+        [t for t in args.tags.split(",") if t],
+        [t for t in args.skip_tags.split(",") if t],
+    )
+    json.dump(
+        {"roles": plan, "packages": union_missing(plan)},
+        sys.stdout,
+        indent=2,
+    )
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
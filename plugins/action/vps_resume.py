@@ -0,0 +1,254 @@
+# pylint: disable=C0103,R0903,W0212,E0401
+"""
+Ansible Action Plugin: vps_resume
+Plans which roles of the play a resumed run can skip.
+
+Every role of the play gets two fingerprints: ``files``, a hash of everything
+under the role directory, and ``vars``, a hash of the role's own vars and of
+the raw values of the ``vps_*`` variables its files refer to (followed through
+variables that refer to other variables). The ``vps_progress`` callback stores
+them in the host's progress file as each role finishes; on a resumed run, a
+role is listed in ``skip_roles`` when the progress file says it completed with
+the same fingerprints. Roles guard themselves with:
+
+    when: role_name not in (vps_resume_plan.skip_roles | default([]))
+
+The progress file is per host and lives on the controller, which is where the
+callback writes it. The task fails when it cannot be written, rather than let
+the run go unrecorded. Fingerprints can be printed offline for a roles
+directory:
+
+    python3 plugins/action/vps_resume.py roles/
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
+
+try:
+    from ansible.errors import AnsibleActionFail
+    from ansible.module_utils.parsing.convert_bool import boolean
+    from ansible.plugins.action import ActionBase
+except ImportError:
+    # Allow fingerprints to be computed offline without Ansible installed.
+    ActionBase = object
+
+
+DOCUMENTATION = """
+    name: vps_resume
+    short_description: Plan which roles a resumed run can skip
+    description:
+        - Fingerprints the files and variables of every role in the play.
+        - With I(resume), lists in C(skip_roles) the roles the progress file
+          records as completed on this host with unchanged fingerprints.
+        - Never changes anything; the vps_progress callback records progress.
+    options:
+        path:
+            description:
+                - Controller-side progress file of this host, written by the
+                  vps_progress callback. Its directory is created if needed.
+            required: true
+        resume:
+            description: Skip completed, unchanged roles.
+            default: false
+        exclude_vars:
+            description:
+                - Variables left out of the vars fingerprint, such as values
+                  regenerated on every run.
+            default: []
+    version_added: "3.0.0"
+"""
+
+#: Directories under a role that are never inputs to it.
+SKIP_DIRS = frozenset(("__pycache__", ".git"))
+
+VAR_RE = re.compile(r"\bvps_[A-Za-z0-9_]+")
+
+
+def scan_role(role_path):
+    """
+    Return (files hash, vps_* variable names mentioned) for a role: the hash
+    covers the relative path and contents of every file under `role_path`.
+    """
+    digest = hashlib.sha256()
+    names = set()
+    for dirpath, dirs, files in os.walk(role_path):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(files):
+            path = os.path.join(dirpath, name)
+            digest.update(os.path.relpath(path, role_path).encode("utf-8") + b"\0")
+            try:
+                with open(path, "rb") as fp:
+                    data = fp.read()
+            except OSError:
+                digest.update(b"unreadable")
+                continue
+            digest.update(hashlib.sha256(data).digest())
+            names.update(VAR_RE.findall(data.decode("utf-8", "ignore")))
+    return digest.hexdigest(), names
+
+
+def _dump(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def hash_role_vars(names, role_vars, host_vars, exclude=()):
+    """
+    Return a hash of `role_vars` and of the raw values in `host_vars` of
+    `names`, plus any vps_* variables those values refer to in turn.
+    """
+    exclude = set(exclude)
+    values = {}
+    pending = sorted(set(names) | set(role_vars))
+    while pending:
+        name = pending.pop()
+        if name in values or name in exclude:
+            continue
+        if name in role_vars:
+            value = role_vars[name]
+        elif name in host_vars:
+            value = host_vars[name]
+        else:
+            continue
+        values[name] = _dump(value)
+        pending.extend(set(VAR_RE.findall(values[name])) - set(values))
+    return hashlib.sha256(_dump(values).encode("utf-8")).hexdigest()
+
+
+def load_progress(path):
+    """Return the progress file at `path` as a dict, or {} if unusable"""
+    try:
+        with open(path, encoding="utf-8") as fp:
+            data = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def check_writable(path):
+    """
+    Create the directory of `path` if needed and return an error message if
+    the progress file cannot be written there, else None.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as e:
+        return "cannot create %s: %s" % (directory, e.strerror)
+    if not os.access(directory, os.W_OK | os.X_OK):
+        return "%s is not writable" % (directory,)
+    if os.path.exists(path) and not os.access(path, os.W_OK):
+        return "%s is not writable" % (path,)
+    return None
+
+
+def build_plan(fingerprints, recorded, resume):
+    """
+    Return an OrderedDict of role -> plan from the current `fingerprints`
+    and the `recorded` role entries of this host.
+
+    Each plan holds the ``files`` and ``vars`` fingerprints, ``skip`` and the
+    ``reason`` the role runs or is skipped.
+    """
+    plan = OrderedDict()
+    for name, current in fingerprints.items():
+        entry = recorded.get(name)
+        if not isinstance(entry, dict):
+            entry = {}
+        if not entry:
+            reason = "no record"
+        elif entry.get("status") != "completed":
+            reason = "last run %s" % (entry.get("status") or "incomplete",)
+        elif entry.get("files") != current["files"]:
+            reason = "role files changed"
+        elif entry.get("vars") != current["vars"]:
+            reason = "variables changed"
+        else:
+            reason = "unchanged"
+        plan[name] = dict(current, skip=resume and reason == "unchanged", reason=reason)
+    return plan
+
+
+class ActionModule(ActionBase):
+    """Fingerprint the roles of the play and plan which a resume skips"""
+
+    TRANSFERS_FILES = False
+    _VALID_ARGS = frozenset(("path", "resume", "exclude_vars"))
+
+    def _play_roles(self):
+        parent = self._task._parent
+        while parent is not None and getattr(parent, "_play", None) is None:
+            parent = getattr(parent, "_parent", None)
+        if parent is None:
+            raise AnsibleActionFail("vps_resume must run as a task of a play")
+        roles = OrderedDict()
+        for role in parent._play.get_roles():
+            roles.setdefault(role.get_name(include_role_fqcn=False), role)
+        return roles
+
+    def run(self, tmp=None, task_vars=None):
+        self._supports_check_mode = True
+        result = super().run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+        task_vars = task_vars or {}
+
+        path = self._task.args.get("path")
+        if not path:
+            raise AnsibleActionFail("path is required")
+        path = os.path.expanduser(path)
+        error = check_writable(path)
+        if error:
+            raise AnsibleActionFail("Cannot record progress for resume: %s" % (error,))
+        resume = boolean(self._task.args.get("resume", False), strict=False)
+        exclude = self._task.args.get("exclude_vars") or []
+        if not isinstance(exclude, list):
+            raise AnsibleActionFail("exclude_vars must be a list")
+
+        fingerprints = OrderedDict()
+        for name, role in self._play_roles().items():
+            files, names = scan_role(role.get_role_path())
+            fingerprints[name] = {
+                "files": files,
+                "vars": hash_role_vars(names, role.get_vars(), task_vars, exclude),
+            }
+
+        recorded = load_progress(path).get("roles")
+        plan = build_plan(fingerprints, recorded if isinstance(recorded, dict) else {}, resume)
+
+        result.update(
+            changed=False,
+            path=path,
+            resume=resume,
+            roles=plan,
+            skip_roles=[n for n, p in plan.items() if p["skip"]],
+        )
+        return result
+
+
+def main(argv=None):
+    """Print the file fingerprint and referenced variables of each role"""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("roles_dir", help="directory holding the roles")
+    args = parser.parse_args(argv)
+
+    report = OrderedDict()
+    for name in sorted(os.listdir(args.roles_dir)):
+        role_path = os.path.join(args.roles_dir, name)
+        if os.path.isdir(role_path):
+            files, names = scan_role(role_path)
+            report[name] = {"files": files, "vars": sorted(names)}
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
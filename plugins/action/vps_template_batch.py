@@ -0,0 +1,470 @@
+# pylint: disable=C0103,R0903,W0212,E0401
+"""
+Ansible Action Plugin: vps_template_batch
+Deploys a role's templates, rendering only those whose output may differ.
+
+``ansible.builtin.template`` renders every template on the controller and
+ships it to the target on every run, only to find ``changed: false``. This
+action takes a list of templates and, for each, fingerprints on the
+controller everything its output depends on: the template source and any
+templates it includes, the raw values of the variables it references
+(followed through variables that refer to other variables), and the
+destination arguments. One remote call then hashes and stats every
+destination. A template is skipped without being rendered when the local
+cache says the same fingerprint last rendered to exactly the checksum now at
+the destination, with matching owner, group and mode. The others go through
+the stock template action, which renders them and transfers those whose
+output differs.
+
+Templates calling lookups, ``now()`` or random filters, or using
+``ansible_managed``/``template_*`` variables, are always rendered. The cache
+holds one entry per destination, per host, under
+``$XDG_CACHE_HOME/vps-setup/templates``.
+
+Fingerprints can be inspected offline for a template:
+
+    python3 plugins/action/vps_template_batch.py roles/xrdp/templates/xrdp.ini.j2
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import hashlib
+import json
+import os
+import shlex
+import sys
+import tempfile
+from collections import OrderedDict
+
+from jinja2 import Environment, meta, nodes
+from jinja2.exceptions import TemplateSyntaxError
+
+try:
+    from ansible.errors import AnsibleActionFail, AnsibleError
+    from ansible.module_utils.parsing.convert_bool import boolean
+    from ansible.plugins.action import ActionBase
+except ImportError:
+    # Allow fingerprints to be inspected offline without Ansible installed.
+    ActionBase = object
+
+
+DOCUMENTATION = """
+    name: vps_template_batch
+    short_description: Deploy templates, skipping those whose output is unchanged
+    description:
+        - Fingerprints each template's source, referenced variables and
+          destination arguments, and hashes all destinations with one remote
+          call.
+        - Templates whose fingerprint last rendered to the checksum found at
+          the destination, with matching owner, group and mode, are skipped
+          without rendering; the rest are deployed by the template action.
+        - Reports C(rendered), C(skipped) and C(transferred) counts for the role
+          under C(counts).
+    options:
+        templates:
+            description:
+                - List of dicts with C(src), C(dest) and optional C(enabled),
+                  C(owner), C(group), C(mode) and other template options.
+            required: true
+        owner:
+            description: Default owner of the destinations.
+        group:
+            description: Default group of the destinations.
+        mode:
+            description: Default mode of the destinations.
+        cache_dir:
+            description: Controller directory holding the rendered checksums.
+            default: $XDG_CACHE_HOME/vps-setup/templates
+    version_added: "3.0.0"
+"""
+
+#: Entry keys that are not template options.
+ENTRY_KEYS = frozenset(("src", "dest", "enabled"))
+
+#: Template options that change the Jinja2 syntax; such templates cannot be
+#: parsed here and are always rendered.
+SYNTAX_OPTIONS = frozenset((
+    "variable_start_string", "variable_end_string", "block_start_string",
+    "block_end_string", "comment_start_string", "comment_end_string",
+))
+
+#: Calls and filters whose result is not a function of the variables.
+IMPURE_CALLS = frozenset(("lookup", "query", "q", "now"))
+IMPURE_FILTERS = frozenset(("random", "shuffle", "password_hash"))
+
+#: Variables the template action sets per run or per controller.
+IMPURE_VARS = frozenset((
+    "ansible_managed", "template_host", "template_path", "template_fullpath",
+    "template_destpath", "template_mtime", "template_uid", "template_run_date",
+))
+
+#: Hashes and stats the destinations named in argv[1]; paths that are
+#: missing, unreadable, directories or symlinks are left out.
+STAT_SCRIPT = r"""
+import grp, hashlib, json, os, pwd, stat, sys
+out = {}
+for path in json.loads(sys.argv[1]):
+    try:
+        st = os.lstat(path)
+        if not stat.S_ISREG(st.st_mode):
+            continue
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+    except OSError:
+        continue
+    try:
+        owner = pwd.getpwuid(st.st_uid).pw_name
+    except KeyError:
+        owner = str(st.st_uid)
+    try:
+        group = grp.getgrgid(st.st_gid).gr_name
+    except KeyError:
+        group = str(st.st_gid)
+    out[path] = {"checksum": digest.hexdigest(), "owner": owner,
+                 "group": group, "mode": "%04o" % stat.S_IMODE(st.st_mode)}
+print(json.dumps(out))
+"""
+
+_ENV = Environment(extensions=["jinja2.ext.do", "jinja2.ext.loopcontrols"])
+
+
+class Uncacheable(Exception):
+    """The output of a template cannot be predicted from its inputs"""
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "vps-setup", "templates")
+
+
+def _dump(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def inspect_template(text):
+    """
+    Return (variable names, referenced template names) of Jinja2 `text`.
+
+    Raises:
+        Uncacheable: the text does not parse, or calls lookups, now() or a
+        random filter
+    """
+    try:
+        ast = _ENV.parse(text)
+    except TemplateSyntaxError as e:
+        raise Uncacheable("does not parse: %s" % (e,))
+    for call in ast.find_all(nodes.Call):
+        if isinstance(call.node, nodes.Name) and call.node.name in IMPURE_CALLS:
+            raise Uncacheable("calls %s()" % (call.node.name,))
+    for node in ast.find_all(nodes.Filter):
+        if node.name in IMPURE_FILTERS:
+            raise Uncacheable("uses the %s filter" % (node.name,))
+    names = meta.find_undeclared_variables(ast)
+    impure = names & IMPURE_VARS
+    if impure:
+        raise Uncacheable("uses %s" % (", ".join(sorted(impure)),))
+    return names, list(meta.find_referenced_templates(ast))
+
+
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from _strings(key)
+            yield from _strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings(item)
+
+
+def hash_vars(names, task_vars):
+    """
+    Return a hash of the raw values of `names` in `task_vars`, and of the
+    variables their templated strings refer to in turn.
+    """
+    values = {}
+    pending = sorted(names)
+    while pending:
+        name = pending.pop()
+        if name in values:
+            continue
+        if name not in task_vars:
+            values[name] = None
+            continue
+        value = task_vars[name]
+        values[name] = _dump(value)
+        for text in _strings(value):
+            if "{{" in text or "{%" in text:
+                pending.extend(inspect_template(text)[0] - set(values))
+    return hashlib.sha256(_dump(values).encode("utf-8")).hexdigest()
+
+
+def fingerprint(source, args, task_vars, search_dirs):
+    """
+    Return the fingerprint of rendering `source` with `args` and `task_vars`:
+    a hash of the source and included templates, the variables they
+    reference and the destination arguments.
+
+    Raises:
+        Uncacheable: the output cannot be predicted without rendering
+    """
+    if SYNTAX_OPTIONS & set(args):
+        raise Uncacheable("custom Jinja2 delimiters")
+    digest = hashlib.sha256(_dump(args).encode("utf-8"))
+    names = set()
+    pending, seen = [source], set()
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path, "rb") as fp:
+            data = fp.read()
+        digest.update(hashlib.sha256(data).digest())
+        found, refs = inspect_template(data.decode("utf-8", "surrogateescape"))
+        names |= found
+        for ref in refs:
+            if ref is None:
+                raise Uncacheable("includes a computed template name")
+            candidates = [os.path.join(d, ref) for d in [os.path.dirname(path)] + search_dirs]
+            for candidate in candidates:
+                if os.path.isfile(candidate):
+                    pending.append(candidate)
+                    break
+            else:
+                raise Uncacheable("cannot find included %s" % (ref,))
+    digest.update(hash_vars(names, task_vars).encode("ascii"))
+    return digest.hexdigest()
+
+
+def normalize_mode(mode):
+    """Return `mode` as a 4-digit octal string, or None if not numeric"""
+    if isinstance(mode, int):
+        return "%04o" % mode
+    try:
+        return "%04o" % int(str(mode), 8)
+    except ValueError:
+        return None
+
+
+def metadata_matches(args, remote):
+    """True if the owner, group and mode in `args` are those of `remote`"""
+    for key in ("owner", "group"):
+        if args.get(key) is not None and str(args[key]) != remote[key]:
+            return False
+    if args.get("mode") is not None:
+        return normalize_mode(args["mode"]) == remote["mode"]
+    return True
+
+
+class TemplateCache:
+    """Fingerprint and rendered checksum of each destination of one host"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(path, encoding="utf-8") as fp:
+                data = json.load(fp)
+            if isinstance(data, dict):
+                self.entries = data
+        except (OSError, ValueError):
+            pass
+
+    def get(self, dest, fp):
+        entry = self.entries.get(dest)
+        if isinstance(entry, list) and len(entry) == 2 and entry[0] == fp:
+            return entry[1]
+        return None
+
+    def put(self, dest, fp, checksum):
+        if self.entries.get(dest) != [fp, checksum]:
+            self.entries[dest] = [fp, checksum]
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        directory = os.path.dirname(self.path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                json.dump(self.entries, fp)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+class ActionModule(ActionBase):
+    """Deploy templates, rendering only those whose output may differ"""
+
+    TRANSFERS_FILES = True
+    _VALID_ARGS = frozenset(("templates", "owner", "group", "mode", "cache_dir"))
+
+    def _normalize(self, templates):
+        if not isinstance(templates, list):
+            raise AnsibleActionFail("templates must be a list")
+        defaults = dict(
+            (key, self._task.args[key])
+            for key in ("owner", "group", "mode")
+            if self._task.args.get(key) is not None
+        )
+        entries = []
+        for entry in templates:
+            if not isinstance(entry, dict) or "src" not in entry or "dest" not in entry:
+                raise AnsibleActionFail("each templates entry needs 'src' and 'dest' keys")
+            if not boolean(entry.get("enabled", True), strict=False):
+                continue
+            args = dict(defaults)
+            args.update((k, v) for k, v in entry.items() if k not in ENTRY_KEYS)
+            entries.append((str(entry["src"]), str(entry["dest"]), args))
+        return entries
+
+    def _remote_stat(self, paths, task_vars):
+        """Return {dest: {checksum, owner, group, mode}} from one remote call"""
+        if not paths:
+            return {}
+        python = (
+            task_vars.get("ansible_python_interpreter")
+            or task_vars.get("ansible_facts", {}).get("discovered_interpreter_python")
+            or "/usr/bin/python3"
+        )
+        cmd = "%s -c %s %s" % (
+            python, shlex.quote(STAT_SCRIPT), shlex.quote(json.dumps(paths))
+        )
+        res = self._low_level_execute_command(cmd)
+        if res["rc"] != 0:
+            self._display.vvv("vps_template_batch: remote stat failed: %s" % (res.get("stderr"),))
+            return {}
+        try:
+            return json.loads(res["stdout"])
+        except ValueError:
+            return {}
+
+    def _template(self, src, dest, args, task_vars):
+        new_task = self._task.copy()
+        new_task.args = dict(args, src=src, dest=dest)
+        template_action = self._shared_loader_obj.action_loader.get(
+            "ansible.legacy.template",
+            task=new_task,
+            connection=self._connection,
+            play_context=self._play_context,
+            loader=self._loader,
+            templar=self._templar,
+            shared_loader_obj=self._shared_loader_obj,
+        )
+        return template_action.run(task_vars=task_vars)
+
+    def run(self, tmp=None, task_vars=None):
+        self._supports_check_mode = True
+        result = super().run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+        task_vars = task_vars or {}
+
+        entries = self._normalize(self._task.args.get("templates") or [])
+        cache_dir = self._task.args.get("cache_dir") or default_cache_dir()
+        cache = TemplateCache(os.path.join(cache_dir, "%s.json" % (task_vars.get("inventory_hostname"),)))
+        role = self._task._role
+        search_dirs = [os.path.join(role.get_role_path(), "templates")] if role else []
+
+        # Fingerprint every template locally, then hash all destinations at once
+        fingerprints = {}
+        for src, dest, args in entries:
+            try:
+                source = self._find_needle("templates", src)
+            except AnsibleError as e:
+                raise AnsibleActionFail(str(e))
+            try:
+                fingerprints[dest] = fingerprint(source, args, task_vars, search_dirs)
+            except Uncacheable as e:
+                self._display.vvv("vps_template_batch: rendering %s: %s" % (src, e))
+            except OSError as e:
+                raise AnsibleActionFail("cannot read %s: %s" % (source, e))
+        remote = self._remote_stat([dest for _, dest, _ in entries], task_vars)
+
+        counts = OrderedDict((("rendered", 0), ("skipped", 0), ("transferred", 0)))
+        templates = OrderedDict()
+        diffs = []
+        failed = []
+        for src, dest, args in entries:
+            fp = fingerprints.get(dest)
+            current = remote.get(dest)
+            if (fp is not None and current is not None
+                    and cache.get(dest, fp) == current["checksum"]
+                    and metadata_matches(args, current)):
+                counts["skipped"] += 1
+                templates[dest] = {"src": src, "status": "skipped", "changed": False}
+                continue
+
+            try:
+                res = self._template(src, dest, args, task_vars)
+            except AnsibleError as e:
+                res = {"failed": True, "msg": str(e)}
+            counts["rendered"] += 1
+            checksum = res.get("checksum")
+            sent = bool(res.get("changed")) and (current is None or checksum != current["checksum"])
+            if sent:
+                counts["transferred"] += 1
+            templates[dest] = {
+                "src": src,
+                "status": "failed" if res.get("failed") else ("transferred" if sent else "rendered"),
+                "changed": bool(res.get("changed")),
+            }
+            if res.get("diff"):
+                diffs.extend(res["diff"] if isinstance(res["diff"], list) else [res["diff"]])
+            if res.get("failed"):
+                failed.append(dest)
+                templates[dest]["msg"] = res.get("msg", "")
+            elif fp is not None and checksum and not self._play_context.check_mode:
+                cache.put(dest, fp, checksum)
+        cache.save()
+
+        role_name = role.get_name(include_role_fqcn=False) if role else None
+        result.update(
+            role=role_name,
+            counts=counts,
+            templates=templates,
+            changed=any(t["changed"] for t in templates.values()),
+            msg="%s: %d templates, %d rendered, %d skipped, %d transferred" % (
+                role_name or "play", len(entries), counts["rendered"],
+                counts["skipped"], counts["transferred"],
+            ),
+        )
+        if diffs:
+            result["diff"] = diffs
+        if failed:
+            result["failed"] = True
+            result["msg"] = "; ".join(
+                "%s: %s" % (dest, templates[dest]["msg"]) for dest in failed
+            )
+        return result
+
+
+def main(argv=None):
+    """Print the variables and included templates a template fingerprints"""
+    import argparse  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("template", help="Jinja2 template file")
+    args = parser.parse_args(argv)
+
+    with open(args.template, encoding="utf-8") as fp:
+        text = fp.read()
+    try:
+        names, refs = inspect_template(text)
+        report = {"cacheable": True, "vars": sorted(names), "includes": refs}
+    except Uncacheable as e:
+        report = {"cacheable": False, "reason": str(e)}
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
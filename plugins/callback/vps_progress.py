@@ -0,0 +1,294 @@
+# pylint: disable=C0103,R0903,R0902,W0212,E0401
+"""
+Ansible Callback Plugin: VPS Progress
+Records per-role completion in the progress file as the run proceeds.
+
+The ``vps_resume`` task at the start of the play reports, for its host, the
+controller-side progress file and the fingerprints of every role. From then on,
+each time the play moves past a role, this callback stores whether the role
+completed or failed on the host, with the fingerprints it ran with, and
+rewrites the host's progress file atomically. A later ``setup.sh --resume``
+skips the roles recorded as completed whose fingerprints still match, so it
+restarts at the role that failed.
+
+A progress file that cannot be written is reported as an error, and recording
+stops for that host, so a later --resume reruns its roles instead of skipping
+them on stale records.
+
+The rendered, skipped and transferred counts of the role's
+``vps_template_batch`` tasks are stored with it.
+
+A role only counts as completed on a host when at least one of its tasks ran
+there: roles switched off by their ``when:`` keep their previous record.
+Roles that notify handlers end with ``meta: flush_handlers``, so their
+handlers run, and can fail the role, before the play moves past it.
+Check mode and runs limited by --tags/--skip-tags record nothing.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+try:
+    from ansible import context
+    from ansible.plugins.callback import CallbackBase
+except ImportError:
+    # pylint: disable=too-few-public-methods
+    class CallbackBase:
+        """Mock class for pylint when ansible is not installed"""
+
+        CALLBACK_VERSION = 2.0
+        CALLBACK_TYPE = "notification"
+        CALLBACK_NAME = "vps_progress"
+
+    context = None
+
+
+DOCUMENTATION = """
+    name: vps_progress
+    type: notification
+    short_description: Record per-role completion and fingerprints
+    description:
+        - Writes the status and input fingerprints of each role to the
+          controller-side progress file of each host, reported by the
+          vps_resume action.
+        - Lets setup.sh --resume restart at the role that failed.
+    requirements:
+      - enable in ansible.cfg (callbacks_enabled)
+    version_added: "3.0.0"
+"""
+
+RESUME_ACTIONS = frozenset(("vps_resume", "ansible.legacy.vps_resume"))
+
+TEMPLATE_ACTIONS = frozenset(("vps_template_batch", "ansible.legacy.vps_template_batch"))
+
+TEMPLATE_COUNTS = ("rendered", "skipped", "transferred")
+
+VERSION = "3.0.0"
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def load_progress(path):
+    """Return the progress file at `path` as a dict, or {} if unusable"""
+    try:
+        with open(path, encoding="utf-8") as fp:
+            data = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_progress(path, data):
+    """Replace the progress file at `path` without exposing a partial write"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            json.dump(data, fp, indent=2)
+            fp.write("\n")
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except OSError:
+        os.unlink(tmp)
+        raise
+
+
+class CallbackModule(CallbackBase):
+    """
+    Record per-role progress and fingerprints for resumable runs
+    """
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "notification"
+    CALLBACK_NAME = "vps_progress"
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self):
+        super().__init__()
+        #: host -> {"path": progress file, "data": its contents}.
+        self.files = {}
+        #: host -> role -> fingerprints, from the vps_resume result.
+        self.fingerprints = {}
+        #: Role whose tasks are running, and when it started.
+        self.current_role = None
+        self.role_started = None
+        #: host -> {"ran": count, "failed": bool, "templates": counts} for
+        #: the current role.
+        self.role_hosts = {}
+        #: Roles seen this run, in order.
+        self.roles_seen = []
+        self.enabled = True
+
+    def _role_name(self, task):
+        role = getattr(task, "_role", None)
+        return role.get_name(include_role_fqcn=False) if role else None
+
+    def _save(self):
+        for host, record in list(self.files.items()):
+            data = record["data"]
+            data["updated_at"] = _now()
+            data["current_role"] = self.current_role
+            statuses = [data["roles"].get(name, {}).get("status") for name in self.roles_seen]
+            data["completed_roles"] = [
+                n for n, status in zip(self.roles_seen, statuses) if status == "completed"
+            ]
+            data["failed_roles"] = [
+                n for n, status in zip(self.roles_seen, statuses) if status == "failed"
+            ]
+            try:
+                save_progress(record["path"], data)
+            except OSError as e:
+                self._display.error(
+                    "Cannot write progress file %s for %s: %s. Progress of this run "
+                    "is not recorded; --resume will rerun its roles."
+                    % (record["path"], host, e)
+                )
+                del self.files[host]
+
+    def _start_recording(self, host, path):
+        old = load_progress(path)
+        roles = old.get("roles")
+        self.files[host] = {
+            "path": path,
+            "data": {
+                "version": VERSION,
+                "host": host,
+                "started_at": _now(),
+                "updated_at": None,
+                "status": "in_progress",
+                "completed_roles": [],
+                "current_role": None,
+                "failed_roles": [],
+                "roles": roles if isinstance(roles, dict) else {},
+            },
+        }
+
+    def _finish_role(self):
+        """Record the outcome of the current role on each host it ran on"""
+        name = self.current_role
+        if name is None:
+            return
+        duration = round(time.monotonic() - self.role_started, 1)
+        for host, state in self.role_hosts.items():
+            fingerprint = self.fingerprints.get(host, {}).get(name)
+            if fingerprint is None or host not in self.files:
+                continue
+            if state["failed"]:
+                status = "failed"
+            elif state["ran"]:
+                status = "completed"
+            else:
+                continue
+            entry = {
+                "status": status,
+                "files": fingerprint["files"],
+                "vars": fingerprint["vars"],
+                "finished_at": _now(),
+                "duration": duration,
+            }
+            if state.get("templates"):
+                entry["templates"] = state["templates"]
+            self.files[host]["data"]["roles"][name] = entry
+        self.current_role = None
+        self.role_hosts = {}
+
+    def _host_state(self, result):
+        return self.role_hosts.setdefault(
+            result._host.get_name(), {"ran": 0, "failed": False}
+        )
+
+    def _fail(self, result):
+        name = self._role_name(result._task)
+        host = result._host.get_name()
+        if name is None or host not in self.files:
+            return
+        if name == self.current_role:
+            self._host_state(result)["failed"] = True
+            return
+        # A handler of a role recorded earlier in this run.
+        entry = self.files[host]["data"]["roles"].get(name)
+        if entry is not None:
+            entry["status"] = "failed"
+            self._save()
+
+    def v2_playbook_on_start(self, playbook):  # pylint: disable=unused-argument
+        """Disable recording for check mode and partial runs"""
+        if context is None:
+            return
+        args = context.CLIARGS
+        tags = set(args.get("tags") or ("all",))
+        if args.get("check") or tags != {"all"} or args.get("skip_tags"):
+            self.enabled = False
+
+    def v2_playbook_on_task_start(self, task, is_conditional):  # pylint: disable=unused-argument
+        """Close the previous role when the play moves on to another"""
+        if not self.files:
+            return
+        name = self._role_name(task)
+        if name == self.current_role:
+            return
+        self._finish_role()
+        if name is not None:
+            self.current_role = name
+            self.role_started = time.monotonic()
+            if name not in self.roles_seen:
+                self.roles_seen.append(name)
+        self._save()
+
+    def v2_playbook_on_handler_task_start(self, task):
+        """Handlers of earlier roles close the current one without reopening theirs"""
+        if not self.files or self._role_name(task) == self.current_role:
+            return
+        self._finish_role()
+        self._save()
+
+    def v2_runner_on_ok(self, result):
+        """Count ran tasks and pick up the vps_resume plan"""
+        if not self.enabled:
+            return
+        if result._task.action in RESUME_ACTIONS:
+            host = result._host.get_name()
+            if host not in self.files:
+                self._start_recording(host, result._result["path"])
+            self.fingerprints[host] = result._result.get("roles", {})
+            self._save()
+        elif self.current_role is not None:
+            state = self._host_state(result)
+            state["ran"] += 1
+            if result._task.action in TEMPLATE_ACTIONS:
+                counts = state.setdefault("templates", dict.fromkeys(TEMPLATE_COUNTS, 0))
+                for key in TEMPLATE_COUNTS:
+                    counts[key] += result._result.get("counts", {}).get(key, 0)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        """Mark the role failed on the host unless errors are ignored"""
+        if self.enabled and not ignore_errors:
+            self._fail(result)
+
+    def v2_runner_on_unreachable(self, result):
+        """An unreachable host did not complete the role"""
+        if self.enabled:
+            self._fail(result)
+
+    def v2_playbook_on_stats(self, stats):
+        """Close the last role and record how the run ended on each host"""
+        if not self.files:
+            return
+        self._finish_role()
+        for host, record in self.files.items():
+            summary = stats.summarize(host)
+            failed = summary["failures"] or summary["unreachable"]
+            record["data"]["status"] = "failed" if failed else "completed"
+            if not failed:
+                record["data"]["completed_at"] = _now()
+        self._save()
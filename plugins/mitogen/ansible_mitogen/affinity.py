@@ -77,6 +77,7 @@ from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
 import ctypes
+import glob
 import logging
 import mmap
 import multiprocessing
@@ -158,6 +159,12 @@ class Policy(object):
         Assign the WorkerProcess policy to this process.
         """
 
+    def assign_worker_mux(self, index):
+        """
+        Called once a WorkerProcess has chosen MuxProcess `index`, allowing it
+        to be moved nearer to that process.
+        """
+
     def assign_subprocess(self):
         """
         Assign the helper subprocess policy to this process.
@@ -281,7 +288,218 @@ class LinuxPolicy(FixedPolicy):
             _sched_setaffinity(tid, len(s), s)
 
 
-if _sched_setaffinity is not None:
-    policy = LinuxPolicy()
-else:
-    policy = Policy()
+def parse_cpu_list(s):
+    """
+    Parse a kernel CPU list like ``0-3,8,10-11`` into a sorted list of ints.
+    """
+    cpus = set()
+    for part in s.strip().split(','):
+        if not part:
+            continue
+        lo, sep, hi = part.partition('-')
+        if sep:
+            cpus.update(range(int(lo), int(hi) + 1))
+        else:
+            cpus.add(int(lo))
+    return sorted(cpus)
+
+
+def get_allowed_cpus(proc_root='/proc'):
+    """
+    Return the sorted list of CPUs this process may run on, which reflects any
+    cgroup cpuset restriction, falling back to ``0..cpu_count``.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    try:
+        fp = open(os.path.join(proc_root, 'self/status'))
+        try:
+            for line in fp:
+                if line.startswith('Cpus_allowed_list:'):
+                    return parse_cpu_list(line.split(':', 1)[1])
+        finally:
+            fp.close()
+    except (IOError, OSError, ValueError):
+        pass
+    return list(range(multiprocessing.cpu_count()))
+
+
+def _read_int(path):
+    fp = open(path)
+    try:
+        return int(fp.read().strip())
+    finally:
+        fp.close()
+
+
+class CpuTopology(object):
+    """
+    Physical cores and NUMA nodes of a set of CPUs, as described by sysfs.
+
+    :param list cpus:
+        CPUs to describe, usually :func:`get_allowed_cpus`. Those the kernel
+        lists as offline are left out.
+    :param str root:
+        Directory containing the ``cpu`` and ``node`` sysfs trees. For tests.
+    :raises EnvironmentError:
+        Topology is not available for some CPU in `cpus`.
+    """
+    def __init__(self, cpus, root='/sys/devices/system'):
+        allowed = set(cpus)
+        online = os.path.join(root, 'cpu/online')
+        if os.path.exists(online):
+            fp = open(online)
+            try:
+                allowed.intersection_update(parse_cpu_list(fp.read()))
+            finally:
+                fp.close()
+        self.cpus = sorted(allowed)
+
+        #: Mapping of CPU -> NUMA node. CPUs absent from any node's list,
+        #: as on kernels without NUMA support, belong to node 0.
+        self.node_by_cpu = dict((cpu, 0) for cpu in self.cpus)
+        for path in glob.glob(os.path.join(root, 'node/node[0-9]*')):
+            node = int(os.path.basename(path)[4:])
+            fp = open(os.path.join(path, 'cpulist'))
+            try:
+                for cpu in parse_cpu_list(fp.read()):
+                    if cpu in allowed:
+                        self.node_by_cpu[cpu] = node
+            finally:
+                fp.close()
+
+        siblings_by_core = {}
+        for cpu in self.cpus:
+            topology = os.path.join(root, 'cpu/cpu%d/topology' % (cpu,))
+            core = (
+                _read_int(os.path.join(topology, 'physical_package_id')),
+                _read_int(os.path.join(topology, 'core_id')),
+            )
+            siblings_by_core.setdefault(core, []).append(cpu)
+
+        # Lists of allowed hyperthreads sharing a physical core, by node.
+        by_node = {}
+        for siblings in sorted(siblings_by_core.values()):
+            node = self.node_by_cpu[siblings[0]]
+            by_node.setdefault(node, []).append(siblings)
+
+        #: Lists of allowed hyperthreads sharing a physical core, taken
+        #: alternately from each node, so any prefix is spread as evenly as
+        #: possible across nodes.
+        self.cores = []
+        columns = [by_node[node] for node in sorted(by_node)]
+        for i in range(max(len(column) for column in columns)):
+            for column in columns:
+                if i < len(column):
+                    self.cores.append(column[i])
+
+    def __repr__(self):
+        return 'CpuTopology(cpus=%d, cores=%d, nodes=%d)' % (
+            len(self.cpus),
+            len(self.cores),
+            len(set(self.node_by_cpu.values())),
+        )
+
+
+class TopologyPolicy(LinuxPolicy):
+    """
+    :class:`LinuxPolicy` using the physical core and NUMA layout of the CPUs
+    this process may run on, which need not be numbered ``0..cpu_count``, for
+    example when restricted by a cgroup cpuset.
+
+    - MuxProcess N is pinned to the first hyperthread of core N, with cores
+      taken alternately from each NUMA node, wrapping around. Multiplexers
+      therefore share a physical core only once every core has one.
+    - On 2 or more cores the core of MuxProcess 0 is reserved, and on 4 or
+      more, another is reserved for the Ansible top-level.
+    - WorkerProcesses are pinned sequentially to the first hyperthread of each
+      unreserved core, then to the remaining hyperthreads.
+    - Once a WorkerProcess chooses a MuxProcess on another NUMA node, it is
+      moved to a worker CPU on that node, if one exists.
+    - Children such as SSH may be scheduled on any unreserved CPU.
+    """
+    def __init__(self, topology):
+        super(TopologyPolicy, self).__init__(cpu_count=len(topology.cpus))
+        self.topology = topology
+        cores = topology.cores
+        if len(cores) < 2:
+            reserved = 0
+        elif len(cores) < 4:
+            reserved = 1
+        else:
+            reserved = 2
+
+        self._mux_cpus = [siblings[0] for siblings in cores]
+        free = cores[reserved:] or cores
+        #: Worker CPUs: first hyperthreads, then the rest.
+        self._worker_cpus = [siblings[0] for siblings in free] + [
+            cpu
+            for siblings in free
+            for cpu in siblings[1:]
+        ]
+        self._clear_mask = self._cpus_to_mask(
+            cpu for siblings in free for cpu in siblings
+        )
+        #: CPU this process was pinned to by :meth:`_balance`.
+        self._worker_cpu = None
+
+    def _cpus_to_mask(self, cpus):
+        mask = 0
+        for cpu in cpus:
+            mask |= 1 << cpu
+        return mask
+
+    def _next(self):
+        self.state.lock.acquire()
+        try:
+            n = self.state.counter
+            self.state.counter += 1
+        finally:
+            self.state.lock.release()
+        return n
+
+    def _balance(self, descr, cpus=None):
+        cpus = cpus or self._worker_cpus
+        self._worker_cpu = cpus[self._next() % len(cpus)]
+        self._set_cpu(descr, self._worker_cpu)
+
+    def _set_cpu(self, descr, cpu):
+        self._set_affinity(descr, 1 << cpu)
+
+    def _clear(self):
+        self._set_affinity(None, self._clear_mask)
+
+    def assign_controller(self):
+        if len(self.topology.cores) >= 4:
+            self._set_cpu('Ansible top-level process', self._mux_cpus[1])
+        else:
+            self._balance('Ansible top-level process')
+
+    def assign_muxprocess(self, index):
+        self._set_cpu('MuxProcess %d' % (index,),
+                      self._mux_cpus[index % len(self._mux_cpus)])
+
+    def assign_worker_mux(self, index):
+        if self._worker_cpu is None:
+            return
+        node_by_cpu = self.topology.node_by_cpu
+        node = node_by_cpu[self._mux_cpus[index % len(self._mux_cpus)]]
+        if node_by_cpu[self._worker_cpu] == node:
+            return
+        cpus = [cpu for cpu in self._worker_cpus if node_by_cpu[cpu] == node]
+        if cpus:
+            self._balance('WorkerProcess near MuxProcess %d' % (index,), cpus)
+
+
+def _get_policy():
+    if _sched_setaffinity is None:
+        return Policy()
+    if os.getenv('MITOGEN_CPU_TOPOLOGY', '1') != '0':
+        try:
+            return TopologyPolicy(CpuTopology(get_allowed_cpus()))
+        except (EnvironmentError, ValueError):
+            LOG.debug('CPU topology unavailable, using fixed placement')
+    return LinuxPolicy()
+
+
+policy = _get_policy()
@@ -0,0 +1,385 @@
+# !mitogen: minify_safe
+
+"""
+Controller-side cache of downloaded artifacts, such as release tarballs, and
+the service that relays them to targets.
+
+An artifact is fetched once into a content-addressed cache by the connection
+multiplexer, then streamed hop-by-hop down the connection tree. Every context
+along a ``via=`` chain keeps a copy, so targets sharing an intermediate context
+cause one transfer over the upstream link, rather than one per target.
+"""
+
+from __future__ import absolute_import, division, print_function
+from __future__ import unicode_literals
+__metaclass__ = type
+
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import mitogen.core
+import mitogen.service
+
+import ansible_mitogen.target
+
+
+LOG = logging.getLogger(__name__)
+
+#: Size of reads during download and digest computation.
+READ_SIZE = 1048576
+
+
+def file_digest(path, algorithm='sha256'):
+    """
+    Return the hex digest of the file at `path` using `algorithm`.
+    """
+    h = hashlib.new(algorithm)
+    fp = open(path, 'rb')
+    try:
+        for chunk in iter(lambda: fp.read(READ_SIZE), b''):
+            h.update(chunk)
+    finally:
+        fp.close()
+    return h.hexdigest()
+
+
+def parse_checksum(checksum):
+    """
+    Split a :ans:mod:`get_url` style checksum like ``sha256:abcd..`` into an
+    `(algorithm, hexdigest)` tuple.
+
+    :raises ValueError:
+        The checksum is malformed or names an unsupported algorithm.
+    """
+    algorithm, sep, hexdigest = checksum.partition(':')
+    algorithm = algorithm.lower()
+    if not (sep and hexdigest):
+        raise ValueError('checksum must be formatted as <algorithm>:<digest>')
+    if algorithm not in hashlib.algorithms_guaranteed:
+        raise ValueError('unsupported checksum algorithm: %s' % (algorithm,))
+    return algorithm, hexdigest.strip().lower()
+
+
+class Error(Exception):
+    pass
+
+
+class ArtifactService(mitogen.service.FileService):
+    """
+    Fetch URLs into a content-addressed cache, and relay cached artifacts to
+    descendant contexts.
+
+    In the connection multiplexer the service is constructed with `cache_dir`,
+    and :meth:`download` stores artifacts below it as ``sha256/<digest>``. In
+    every other context the service is activated on demand by :meth:`relay`,
+    and keeps received artifacts in a temporary directory deleted on shutdown.
+
+    Artifacts are moved between adjacent contexts using the streaming transfer
+    inherited from :class:`mitogen.service.FileService`.
+
+    :param str cache_dir:
+        Directory of the persistent controller-side cache, or :data:`None` in
+        contexts that only relay artifacts.
+    :param int ttl:
+        Seconds a download made without a checksum is reused for before the URL
+        is fetched again.
+    """
+    def __init__(self, router, cache_dir=None, ttl=86400):
+        super(ArtifactService, self).__init__(router)
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        #: Mapping of SHA-256 digest -> local path of present artifacts.
+        self._path_by_digest = {}
+        #: Mapping of SHA-256 digest -> list of `(context, msg)` for relay
+        #: requests waiting on the artifact to arrive from the parent.
+        self._waiters = {}
+        self._tmp_dir = None
+
+    def _get_dir(self):
+        if self.cache_dir:
+            path = os.path.join(self.cache_dir, 'sha256')
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            return path
+
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.mkdtemp(
+                prefix='ansible_mitogen_artifacts',
+                dir=ansible_mitogen.target.good_temp_dir,
+            )
+        return self._tmp_dir
+
+    def on_shutdown(self):
+        super(ArtifactService, self).on_shutdown()
+        if self._tmp_dir is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def _add(self, digest, path):
+        self._path_by_digest[digest] = path
+        self._paths.add(path)
+
+    def _index_path(self, key):
+        h = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, 'index', h)
+
+    def _lookup(self, index_path, has_checksum):
+        try:
+            st = os.lstat(index_path)
+            target = os.readlink(index_path)
+        except OSError:
+            return None
+
+        if not (has_checksum or mitogen.core.now() - st.st_mtime < self.ttl):
+            return None
+
+        path = os.path.join(os.path.dirname(index_path), target)
+        if not os.path.exists(path):
+            return None
+        return os.path.basename(path)
+
+    def _link(self, index_path, digest):
+        tmp_path = '%s.%d.tmp' % (index_path, os.getpid())
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        os.symlink(os.path.join('..', 'sha256', digest), tmp_path)
+        os.rename(tmp_path, index_path)
+
+    def _fetch_url(self, url, checksum, timeout, validate_certs):
+        # Imported on demand to avoid the dependency scanner forwarding the
+        # module to every context that relays artifacts.
+        urls = mitogen.core.import_module('ansible.module_utils.urls')
+
+        algorithm = None
+        if checksum:
+            algorithm, expected = parse_checksum(checksum)
+
+        sha256 = hashlib.sha256()
+        other = algorithm and hashlib.new(algorithm)
+        fd, tmp_path = tempfile.mkstemp(dir=self._get_dir(), prefix='.tmp')
+        try:
+            fp = os.fdopen(fd, 'wb')
+            try:
+                resp = urls.open_url(url, timeout=timeout,
+                                     validate_certs=validate_certs)
+                for chunk in iter(lambda: resp.read(READ_SIZE), b''):
+                    sha256.update(chunk)
+                    if other:
+                        other.update(chunk)
+                    fp.write(chunk)
+            finally:
+                fp.close()
+
+            if other and other.hexdigest() != expected:
+                raise Error('%s checksum mismatch for %s: expected %s, got %s'
+                            % (algorithm, url, expected, other.hexdigest()))
+
+            digest = sha256.hexdigest()
+            os.rename(tmp_path, os.path.join(self._get_dir(), digest))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return digest
+
+    @mitogen.service.expose(policy=mitogen.service.AllowParents())
+    @mitogen.service.arg_spec({
+        'url': mitogen.core.UnicodeType,
+    })
+    def download(self, url, checksum=None, timeout=10, validate_certs=True):
+        """
+        Ensure the artifact at `url` is present in the controller-side cache,
+        downloading it if necessary. Concurrent requests for the same artifact,
+        including those from sibling multiplexer processes, are serialized
+        using a lock file so that only the first downloads it.
+
+        :param str url:
+            URL to fetch.
+        :param str checksum:
+            Optional ``<algorithm>:<digest>`` the artifact must match. When
+            present, the artifact is cached indefinitely and shared by every URL
+            naming the same checksum, otherwise it is reused for :attr:`ttl`
+            seconds.
+        :returns:
+            Dict containing:
+
+            * ``digest``: SHA-256 of the artifact, used to address it.
+            * ``path``: Location of the artifact in the cache.
+            * ``size``: Size in bytes.
+            * ``downloaded``: :data:`True` if this call fetched the URL.
+        """
+        if not self.cache_dir:
+            raise Error('artifact cache is not configured in this context')
+
+        if checksum:
+            algorithm, hexdigest = parse_checksum(checksum)
+            key = '%s:%s' % (algorithm, hexdigest)
+        else:
+            key = url
+
+        index_path = self._index_path(key)
+        lock_dir = os.path.dirname(index_path)
+        if not os.path.isdir(lock_dir):
+            os.makedirs(lock_dir)
+
+        downloaded = False
+        lock_fp = open(index_path + '.lock', 'w')
+        try:
+            fcntl.flock(lock_fp.fileno(), fcntl.LOCK_EX)
+            digest = self._lookup(index_path, bool(checksum))
+            if digest is None:
+                LOG.debug('%r: downloading %s', self, url)
+                digest = self._fetch_url(url, checksum, timeout,
+                                         validate_certs)
+                self._link(index_path, digest)
+                downloaded = True
+        finally:
+            lock_fp.close()
+
+        path = os.path.join(self._get_dir(), digest)
+        self._lock.acquire()
+        try:
+            self._add(digest, path)
+        finally:
+            self._lock.release()
+
+        return {
+            'digest': digest,
+            'path': path,
+            'size': os.path.getsize(path),
+            'downloaded': downloaded,
+        }
+
+    def _pull(self, digest, path, upstream):
+        """
+        Stream the artifact from `upstream`, which holds it as `path`, into
+        this context's store, verifying its digest on arrival.
+        """
+        out_path = os.path.join(self._get_dir(), digest)
+        fd, tmp_path = tempfile.mkstemp(dir=self._get_dir(), prefix='.tmp')
+        fp = os.fdopen(fd, 'wb', mitogen.core.CHUNK_SIZE)
+        try:
+            try:
+                ok, metadata = self.get(context=upstream, path=path,
+                                        out_fp=fp)
+            finally:
+                fp.close()
+            if not ok:
+                raise IOError('transfer of %r was interrupted.' % (digest,))
+            if file_digest(tmp_path) != digest:
+                raise IOError('artifact %r was corrupted in transfer.'
+                              % (digest,))
+            os.rename(tmp_path, out_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return out_path
+
+    def _on_child_reply(self, msg, recv):
+        """
+        Pass the reply from the next hop back to our own requester. This runs
+        on the broker thread, so it must not block.
+        """
+        reply = recv.get(throw_dead=False)
+        msg.reply(mitogen.core.Message(data=reply.data,
+                                       reply_to=reply.reply_to))
+
+    def _forward(self, digest, context, msg):
+        path = self._path_by_digest[digest]
+        if context.context_id == mitogen.context_id:
+            msg.reply(path)
+            return
+
+        stream = self.router.stream_by_id(context.context_id)
+        if stream is None:
+            msg.reply(mitogen.core.CallError(
+                Error('no route to %r' % (context,))
+            ))
+            return
+
+        child = self.router.context_by_id(stream.protocol.remote_id)
+        LOG.debug('%r: relaying %s to %r via %r', self, digest, context, child)
+        recv = mitogen.core.Receiver(self.router, persist=False,
+                                     respondent=child)
+        recv.notify = lambda recv: self._on_child_reply(msg, recv)
+        child.send(mitogen.core.Message.pickled(
+            (
+                self.name(),
+                u'relay',
+                mitogen.core.Kwargs({
+                    'digest': digest,
+                    'path': path,
+                    'context': context,
+                }),
+            ),
+            handle=mitogen.core.CALL_SERVICE,
+            reply_to=recv.handle,
+        ))
+
+    @mitogen.service.expose(policy=mitogen.service.AllowParents())
+    @mitogen.service.no_reply()
+    @mitogen.service.arg_spec({
+        'digest': mitogen.core.UnicodeType,
+        'path': mitogen.core.FsPathTypes,
+        'context': mitogen.core.Context,
+    })
+    def relay(self, digest, path, context, msg):
+        """
+        Deliver an artifact to `context`, which must be this context or one of
+        its descendants. If the artifact is not yet present, it is streamed
+        from the caller, which holds it as `path`. It is then forwarded to the
+        next context on the route, which repeats the process.
+
+        Replies are sent asynchronously, so pool threads are never blocked
+        waiting on descendants.
+
+        :returns:
+            Location of the artifact in `context`.
+        """
+        self._lock.acquire()
+        try:
+            present = digest in self._path_by_digest
+            if not present:
+                waiters = self._waiters.setdefault(digest, [])
+                first = len(waiters) == 0
+                waiters.append((context, msg))
+        finally:
+            self._lock.release()
+
+        if present:
+            self._forward(digest, context, msg)
+            return
+        if not first:
+            return
+
+        try:
+            local_path = self._pull(digest, path,
+                                    self.router.context_by_id(msg.src_id))
+        except Exception:
+            e = sys.exc_info()[1]
+            LOG.error('%r: while fetching %s: %s', self, digest, e)
+            self._lock.acquire()
+            try:
+                waiters = self._waiters.pop(digest)
+            finally:
+                self._lock.release()
+            for _, waiter_msg in waiters:
+                waiter_msg.reply(mitogen.core.CallError(e))
+            return
+
+        self._lock.acquire()
+        try:
+            self._add(digest, local_path)
+            waiters = self._waiters.pop(digest)
+        finally:
+            self._lock.release()
+
+        for waiter_context, waiter_msg in waiters:
+            self._forward(digest, waiter_context, waiter_msg)
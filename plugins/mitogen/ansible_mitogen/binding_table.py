@@ -0,0 +1,249 @@
+# Copyright 2019, David Wilson
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Shared-memory table of established connections, allowing WorkerProcesses to
+bind to a connection without a round trip to ContextService.
+
+The table is an anonymous shared mapping created by the top-level process
+before the connection multiplexers are forked, so the multiplexers and every
+WorkerProcess forked later see the same memory. It is split into one region
+per multiplexer. Each region is written only by the ContextService of its
+multiplexer, while holding the service lock, and read by any number of
+workers.
+
+Entries are keyed by a digest of :func:`ansible_mitogen.services.key_from_dict`
+for the full connection stack, and record the context IDs and
+:func:`ansible_mitogen.target.init_child` result that
+:meth:`ContextService.get() <ansible_mitogen.services.ContextService.get>`
+would return. Each slot is guarded by a sequence counter that is odd while a
+write is in progress; readers that observe a change in the counter treat the
+slot as a miss and fall back to the RPC.
+
+A worker that binds through the table sends the multiplexer an
+:data:`ACQUIRE_CONTEXT` message carrying the context, without waiting for a
+reply. ContextService handles it on the broker thread as it arrives, so the
+reference is taken before any later ``put()`` from the same worker reaches the
+service pool.
+"""
+
+from __future__ import absolute_import, division, print_function
+from __future__ import unicode_literals
+__metaclass__ = type
+
+import hashlib
+import json
+import logging
+import mmap
+import struct
+
+import mitogen.core
+
+
+LOG = logging.getLogger(__name__)
+
+#: Slot header: sequence counter, key digest, context ID, via context ID,
+#: fork context ID, length of the JSON-encoded remainder.
+HEADER = struct.Struct('=I20siiiH')
+SEQ = struct.Struct('=I')
+
+#: Context ID recorded for an absent context.
+NO_CONTEXT = -1
+
+#: Handle a multiplexer receives references taken through the table on. Below
+#: the range :meth:`mitogen.core.Router.add_handler` allocates from.
+ACQUIRE_CONTEXT = 200
+
+EMPTY_DIGEST = b'\x00' * 20
+
+
+def digest(key):
+    """
+    Return the 20 byte digest of `key`, a :func:`key_from_dict` string.
+    """
+    return hashlib.sha1(mitogen.core.to_text(key).encode('utf-8')).digest()
+
+
+class BindingTable(object):
+    """
+    Fixed-size open-addressing hash table in shared memory.
+
+    :param int regions:
+        Number of regions, one per connection multiplexer.
+    :param int slots:
+        Slots in each region.
+    """
+    #: Bytes per slot. Entries whose names and directories do not fit are not
+    #: published.
+    slot_size = 512
+
+    #: Slots examined before giving up on a lookup, or overwriting the first
+    #: slot on insert.
+    max_probe = 8
+
+    def __init__(self, regions, slots):
+        self.regions = regions
+        self.slots = slots
+        self._mmap = mmap.mmap(-1, regions * slots * self.slot_size)
+        # Writer-side bookkeeping, only ever populated in a multiplexer.
+        #: Mapping of context ID -> set of digests whose entry refers to it.
+        self._digests_by_context_id = {}
+        #: Mapping of digest -> slot offset it was written to.
+        self._offset_by_digest = {}
+
+    def __repr__(self):
+        return 'BindingTable(regions=%d, slots=%d)' % (
+            self.regions,
+            self.slots,
+        )
+
+    def _offsets(self, region, dig):
+        base = region * self.slots
+        start = struct.unpack('=I', dig[:4])[0] % self.slots
+        for i in range(min(self.max_probe, self.slots)):
+            yield (base + (start + i) % self.slots) * self.slot_size
+
+    def _read(self, offset):
+        """
+        Return `(header, blob)` for the slot at `offset`, or :data:`None` if a
+        write is in progress or completed while reading.
+        """
+        header = HEADER.unpack_from(self._mmap, offset)
+        if header[0] & 1:
+            return None
+        blob = self._mmap[offset + HEADER.size:
+                          offset + HEADER.size + header[5]]
+        if SEQ.unpack_from(self._mmap, offset)[0] != header[0]:
+            return None
+        return header, blob
+
+    def _write(self, offset, dig, ids, blob):
+        seq = SEQ.unpack_from(self._mmap, offset)[0]
+        SEQ.pack_into(self._mmap, offset, (seq + 1) & 0xffffffff)
+        HEADER.pack_into(self._mmap, offset, (seq + 1) & 0xffffffff, dig,
+                         ids[0], ids[1], ids[2], len(blob))
+        self._mmap[offset + HEADER.size:offset + HEADER.size + len(blob)] = blob
+        SEQ.pack_into(self._mmap, offset, (seq + 2) & 0xffffffff)
+
+    def lookup(self, region, key, router):
+        """
+        Return a dict shaped like the result of
+        :meth:`ContextService.get() <ansible_mitogen.services.ContextService.get>`
+        for the stack `key` in `region`, with contexts bound to `router`, or
+        :data:`None` if no complete entry exists.
+        """
+        dig = digest(key)
+        for offset in self._offsets(region, dig):
+            tup = self._read(offset)
+            if tup is None:
+                continue
+            # Invalidated slots are emptied rather than marked, so keep probing
+            # past empty slots.
+            header, blob = tup
+            if header[1] != dig:
+                continue
+            try:
+                names = json.loads(blob.decode('utf-8'))
+            except ValueError:
+                return None
+            return self._make_response(router, header[2:5], names)
+        return None
+
+    def _make_response(self, router, ids, names):
+        def get_context(context_id, name):
+            if context_id == NO_CONTEXT:
+                return None
+            return router.context_by_id(context_id, name=name)
+
+        return {
+            'context': get_context(ids[0], names['context']),
+            'via': get_context(ids[1], names['via']),
+            'init_child_result': {
+                'fork_context': get_context(ids[2], names['fork_context']),
+                'home_dir': names['home_dir'],
+                'good_temp_dir': names['good_temp_dir'],
+            },
+            'msg': None,
+            'method_name': None,
+        }
+
+    def publish(self, region, key, response, contexts):
+        """
+        Record a successful :meth:`ContextService.get` `response` for the stack
+        `key` in `region`. The entry is removed by :meth:`invalidate` when any
+        of `contexts`, the contexts of each hop of the stack, is forgotten.
+        Must be called with the ContextService lock held.
+        """
+        init_child_result = response['init_child_result']
+        members = [
+            response['context'],
+            response['via'],
+            init_child_result.get('fork_context'),
+        ]
+        ids = [NO_CONTEXT if c is None else c.context_id for c in members]
+        blob = json.dumps({
+            'context': members[0] and members[0].name,
+            'via': members[1] and members[1].name,
+            'fork_context': members[2] and members[2].name,
+            'home_dir': init_child_result.get('home_dir'),
+            'good_temp_dir': init_child_result.get('good_temp_dir'),
+        }).encode('utf-8')
+        if HEADER.size + len(blob) > self.slot_size:
+            LOG.debug('%r: entry for %r too large to publish', self, members[0])
+            return
+
+        dig = digest(key)
+        chosen = None
+        for offset in self._offsets(region, dig):
+            header = HEADER.unpack_from(self._mmap, offset)
+            if header[1] == dig:
+                chosen = offset
+                break
+            if chosen is None and header[1] == EMPTY_DIGEST:
+                chosen = offset
+        if chosen is None:
+            chosen = next(self._offsets(region, dig))
+
+        self._write(chosen, dig, ids, blob)
+        self._offset_by_digest[dig] = chosen
+        for context in contexts:
+            self._digests_by_context_id.setdefault(
+                context.context_id, set()
+            ).add(dig)
+
+    def invalidate(self, context):
+        """
+        Remove every entry whose stack passes through `context`. Must be
+        called with the ContextService lock held.
+        """
+        for dig in self._digests_by_context_id.pop(context.context_id, ()):
+            offset = self._offset_by_digest.pop(dig, None)
+            if offset is None:
+                continue
+            if HEADER.unpack_from(self._mmap, offset)[1] == dig:
+                self._write(offset, EMPTY_DIGEST, (NO_CONTEXT,) * 3, b'')
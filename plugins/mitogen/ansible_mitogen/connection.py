@@ -44,6 +44,7 @@ import ansible.plugins.connection
 
 import mitogen.core
 
+import ansible_mitogen.binding_table
 import ansible_mitogen.mixins
 import ansible_mitogen.parsing
 import ansible_mitogen.process
@@ -794,18 +795,25 @@ class Connection(ansible.plugins.connection.ConnectionBase):
 
         See :meth:`ansible_mitogen.services.ContextService.get` docstring for
         description of the returned dictionary.
+
+        If the multiplexer already published the connection to the binding
+        table, bind to it directly, informing ContextService of the new
+        reference without waiting for a reply.
         """
-        try:
-            dct = mitogen.service.call(
-                call_context=self.binding.get_service_context(),
-                service_name='ansible_mitogen.services.ContextService',
-                method_name='get',
-                stack=ansible_mitogen.utils.unsafe.cast(list(stack)),
+        stack = ansible_mitogen.utils.unsafe.cast(list(stack))
+        dct = self.binding.lookup_context(
+            ansible_mitogen.services.key_from_dict(stack=stack)
+        )
+        if dct is not None:
+            LOG.debug('found %r in binding table', dct['context'])
+            self.binding.get_service_context().send(
+                mitogen.core.Message.pickled(
+                    dct['context'],
+                    handle=ansible_mitogen.binding_table.ACQUIRE_CONTEXT,
+                )
             )
-        except mitogen.core.CallError:
-            LOG.warning('Connection failed; stack configuration was:\n%s',
-                        pprint.pformat(stack))
-            raise
+        else:
+            dct = self._call_context_service(stack)
 
         if dct['msg']:
             if dct['method_name'] in self.become_methods:
@@ -821,6 +829,19 @@ class Connection(ansible.plugins.connection.ConnectionBase):
 
         self.init_child_result = dct['init_child_result']
 
+    def _call_context_service(self, stack):
+        try:
+            return mitogen.service.call(
+                call_context=self.binding.get_service_context(),
+                service_name='ansible_mitogen.services.ContextService',
+                method_name='get',
+                stack=stack,
+            )
+        except mitogen.core.CallError:
+            LOG.warning('Connection failed; stack configuration was:\n%s',
+                        pprint.pformat(stack))
+            raise
+
     def get_good_temp_dir(self):
         """
         Return the 'good temporary directory' as discovered by
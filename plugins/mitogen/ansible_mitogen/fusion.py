@@ -0,0 +1,412 @@
+# Copyright 2019, David Wilson
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Task fusion for the ``mitogen_fused`` strategy.
+
+Before the play runs, runs of consecutive tasks in the same block that have no
+dependencies on one another are replaced by a single task running the
+``mitogen_fused`` action, which executes them in one worker. Plain module
+calls among them reach the target as a single batch.
+
+The strategy then splits the fused result back into one result per original
+task, and reports each with the same callbacks, in the same order, as the
+linear strategy would have.
+"""
+
+from __future__ import absolute_import, division, print_function
+from __future__ import unicode_literals
+__metaclass__ = type
+
+import collections
+import logging
+
+import ansible.playbook.block
+import ansible.playbook.task
+
+from ansible.executor.task_result import TaskResult
+from ansible.utils.sentinel import Sentinel
+from ansible.utils.vars import get_unique_id
+
+
+LOG = logging.getLogger(__name__)
+
+#: Key of the fused task's result holding the list of per-task results.
+RESULTS_KEY = '_mitogen_fused_results'
+
+#: Actions that may be fused: file-oriented actions whose outcome does not
+#: feed into later tasks other than through the target's filesystem, which
+#: keeps its ordering, as fused tasks still run in order.
+FUSABLE_ACTIONS = frozenset(
+    prefix + name
+    for prefix in ('', 'ansible.builtin.', 'ansible.legacy.')
+    for name in ('blockinfile', 'copy', 'file', 'lineinfile', 'replace',
+                 'template')
+)
+
+#: Task keywords that make a task depend on, or be observed by, other tasks,
+#: or that change how the TaskExecutor treats its result.
+BLOCKING_ATTRS = (
+    'async_val', 'changed_when', 'delegate_to', 'failed_when',
+    'ignore_errors', 'ignore_unreachable', 'loop', 'loop_with', 'register',
+    'run_once', 'until',
+)
+
+#: Task keywords that only block fusion when set on the task itself. Values
+#: inherited from the enclosing block or role are shared by every task of a
+#: run, since runs never span parents, so the fused task evaluates them once
+#: on behalf of all of them.
+OWN_BLOCKING_ATTRS = ('when',)
+
+#: Task keywords that must match across a run, since a single worker, play
+#: context and connection serve every fused task.
+SHARED_ATTRS = (
+    'any_errors_fatal', 'become', 'become_exe', 'become_flags',
+    'become_method', 'become_user', 'check_mode', 'collections', 'connection',
+    'diff', 'environment', 'no_log', 'remote_user', 'throttle', 'timeout',
+    'vars',
+)
+
+#: Shortest run of tasks worth fusing.
+MIN_RUN = 2
+
+#: Mapping of fused task UUID -> list of the original tasks it runs. Module
+#: level so that it is inherited by forked WorkerProcesses, where the fused
+#: task itself may be a copy lacking any extra attributes.
+_tasks_by_uuid = {}
+
+
+def get_fused_tasks(task):
+    """
+    Return the list of original tasks run by the fused task `task`.
+    """
+    return _tasks_by_uuid[task._uuid]
+
+
+def _get_own_attr(task, attr):
+    """
+    Return the value of keyword `attr` set on `task` itself, ignoring any
+    inherited from its parents, or :data:`None` if it is unset.
+    """
+    attributes = getattr(task, '_attributes', None)
+    if isinstance(attributes, dict):
+        value = attributes.get(attr)  # Ansible <2.14
+    else:
+        value = getattr(task, '_' + attr, None)
+    if value is Sentinel:
+        return None
+    return value
+
+
+def is_fusable(task):
+    """
+    Return :data:`True` if `task` may be fused with its neighbours.
+    """
+    if not isinstance(task, ansible.playbook.task.Task):
+        return False
+    if task.action not in FUSABLE_ACTIONS or getattr(task, 'implicit', False):
+        return False
+    if any(_get_own_attr(task, attr) for attr in OWN_BLOCKING_ATTRS):
+        return False
+    return not any(getattr(task, attr, None) for attr in BLOCKING_ATTRS)
+
+
+def _shared_key(task):
+    return [repr(getattr(task, attr, None)) for attr in SHARED_ATTRS]
+
+
+def _make_fused_task(tasks):
+    fused = tasks[0].copy()
+    fused._uuid = get_unique_id()
+    fused.action = 'mitogen_fused'
+    try:
+        fused.resolved_action = 'ansible.legacy.mitogen_fused'
+    except AttributeError:
+        pass  # Ansible <2.12
+    fused.args = {}
+    fused.notify = None
+    fused.name = '%s (+%d fused)' % (tasks[0].name, len(tasks) - 1)
+    _tasks_by_uuid[fused._uuid] = tasks
+    return fused
+
+
+def _fuse_list(tasks, fused_uuids):
+    """
+    Return a copy of the list of tasks and blocks `tasks`, with runs of
+    fusable tasks sharing a parent replaced by a fused task.
+    """
+    out = []
+    run = []
+
+    def flush():
+        if len(run) >= MIN_RUN:
+            fused = _make_fused_task(list(run))
+            fused_uuids.add(fused._uuid)
+            out.append(fused)
+        else:
+            out.extend(run)
+        del run[:]
+
+    for task in tasks:
+        if isinstance(task, ansible.playbook.block.Block):
+            flush()
+            fuse_block(task, fused_uuids)
+            out.append(task)
+        elif not is_fusable(task):
+            flush()
+            out.append(task)
+        else:
+            if run and (task._parent is not run[0]._parent or
+                        _shared_key(task) != _shared_key(run[0])):
+                flush()
+            run.append(task)
+
+    flush()
+    return out
+
+
+def fuse_block(block, fused_uuids):
+    """
+    Replace runs of fusable tasks within `block` and its children in-place,
+    adding the UUID of each fused task to the set `fused_uuids`.
+    """
+    block.block = _fuse_list(block.block, fused_uuids)
+    block.rescue = _fuse_list(block.rescue, fused_uuids)
+    block.always = _fuse_list(block.always, fused_uuids)
+
+
+def _get_started_blocks(iterator):
+    """
+    Return indices of blocks some host has already progressed into, for
+    instance due to ``--start-at-task``. Their task lists must not change, as
+    host states hold positions within them.
+    """
+    started = set()
+    for state in iterator._host_states.values():
+        started.update(range(state.cur_block))
+        if (state.cur_regular_task or state.cur_rescue_task or
+                state.cur_always_task):
+            started.add(state.cur_block)
+    return started
+
+
+class _ResultDeque(collections.deque):
+    """
+    Results queue that diverts fused task results to `hold`, which returns
+    :data:`True` if it took ownership of the result.
+    """
+    def __init__(self, iterable, hold):
+        super(_ResultDeque, self).__init__(iterable)
+        self._hold = hold
+
+    def append(self, result):
+        if not self._hold(result):
+            super(_ResultDeque, self).append(result)
+
+
+class FusionMixin(object):
+    """
+    Strategy mix-in that fuses runs of independent tasks, then reports the
+    result of each original task as though it had run on its own.
+
+    A fused task's results are held until every host it was queued for has
+    reported. They are then released one original task at a time:
+    ``v2_playbook_on_task_start`` and ``v2_runner_on_start`` are sent for the
+    task, followed by each host's result, processed by the base strategy as
+    usual, so handlers, failure handling and stats are unchanged.
+    """
+    def _fuse_play(self, iterator):
+        self._fused_uuids = set()
+        if getattr(self, '_step', False):
+            return
+
+        try:
+            started = _get_started_blocks(iterator)
+            blocks = iterator._blocks
+        except AttributeError:
+            LOG.warning('%r: unsupported PlayIterator, not fusing tasks', self)
+            return
+
+        for i, block in enumerate(blocks):
+            if i not in started:
+                fuse_block(block, self._fused_uuids)
+
+        if self._fused_uuids and hasattr(iterator, 'all_tasks'):
+            # Ansible 2.16+ linear lockstep walks a flat list of the play's
+            # tasks taken when the iterator was built; it must list the fused
+            # tasks the host states now return in place of the originals.
+            iterator.all_tasks = [
+                task
+                for block in blocks
+                for task in block.get_tasks()
+            ]
+        LOG.debug('%r: fused %d runs of tasks', self, len(self._fused_uuids))
+
+    def _is_fused_task(self, task):
+        return getattr(task, '_uuid', task) in self._fused_uuids
+
+    def _send_callback(self, method_name, *args, **kwargs):
+        """
+        Drop callbacks for fused tasks, which are reported per original task
+        by :meth:`_release_fused`.
+        """
+        if method_name == 'v2_playbook_on_task_start' and \
+                self._is_fused_task(args[0]):
+            return
+        if method_name == 'v2_runner_on_start' and \
+                self._is_fused_task(args[1]):
+            return
+        return self._fusion_send_callback(method_name, *args, **kwargs)
+
+    def _hold_fused(self, result):
+        if not isinstance(result, TaskResult):
+            return False
+        uuid = getattr(result._task, '_uuid', result._task)
+        if uuid not in self._fused_uuids:
+            return False
+        host_name = getattr(result._host, 'name', result._host)
+        self._fused_held[uuid][host_name] = result
+        return True
+
+    def _queue_task(self, host, task, task_vars, play_context):
+        if task._uuid in self._fused_uuids:
+            self._fused_queued.setdefault(task._uuid, []).append(host)
+            for subtask in get_fused_tasks(task):
+                self._queued_task_cache[(host.name, subtask._uuid)] = {
+                    'host': host,
+                    'task': subtask,
+                    'task_vars': task_vars,
+                    'play_context': play_context,
+                }
+        return super(FusionMixin, self)._queue_task(
+            host=host,
+            task=task,
+            task_vars=task_vars,
+            play_context=play_context,
+        )
+
+    def _split_result(self, result, count):
+        """
+        Return the list of per-task results in a held fused result of `count`
+        tasks. If the fused task was skipped by a condition inherited from its
+        block or role, every task is reported skipped, as each would have
+        been. If it failed before running any task, for example because the
+        host was unreachable, its result is attributed to the first task.
+        """
+        results = result._result.get(RESULTS_KEY)
+        if results is not None:
+            return results
+        if result.is_skipped():
+            return [dict(result._result) for _ in range(count)]
+        return [result._result]
+
+    def _release_fused(self, iterator, uuid):
+        tasks = _tasks_by_uuid[uuid]
+        hosts = self._fused_queued.pop(uuid)
+        held = self._fused_held.pop(uuid)
+        split = [
+            (host, self._split_result(held[host.name], len(tasks)))
+            for host in hosts
+        ]
+
+        processed = []
+        for i, task in enumerate(tasks):
+            group = [(host, rs[i]) for host, rs in split if len(rs) > i]
+            if not group:
+                break
+
+            self._fusion_send_callback('v2_playbook_on_task_start', task,
+                                       is_conditional=False)
+            task_results = []
+            for host, task_result in group:
+                self._fusion_send_callback('v2_runner_on_start', host, task)
+                tr = TaskResult(host.name, task._uuid, task_result,
+                                task_fields=task.dump_attrs())
+                if hasattr(self, 'normalize_task_result'):
+                    tr = self.normalize_task_result(tr)
+                task_results.append(tr)
+
+            self._results_lock.acquire()
+            try:
+                self._results.extendleft(reversed(task_results))
+            finally:
+                self._results_lock.release()
+            self._pending_results += len(task_results)
+            processed.extend(
+                super(FusionMixin, self)._process_pending_results(
+                    iterator, max_passes=len(task_results),
+                )
+            )
+
+        # Each held fused result accounted for one pending result.
+        self._pending_results -= len(hosts)
+        return processed
+
+    def _process_pending_results(self, iterator, one_pass=False,
+                                 max_passes=None):
+        results = []
+        if self._fused_draining:
+            for uuid, hosts in list(self._fused_queued.items()):
+                if len(self._fused_held[uuid]) == len(hosts):
+                    results.extend(self._release_fused(iterator, uuid))
+
+        results.extend(super(FusionMixin, self)._process_pending_results(
+            iterator, one_pass=one_pass, max_passes=max_passes,
+        ))
+        return results
+
+    def _wait_on_pending_results(self, iterator):
+        """
+        Fused results are only released once every host has reported, which
+        is guaranteed only once the strategy waits for all pending results.
+        """
+        self._fused_draining = True
+        try:
+            return super(FusionMixin, self)._wait_on_pending_results(iterator)
+        finally:
+            self._fused_draining = False
+
+    def run(self, iterator, play_context, result=0):
+        self._fuse_play(iterator)
+        self._fused_queued = {}
+        self._fused_held = collections.defaultdict(dict)
+        self._fused_draining = False
+
+        tqm = self._tqm
+        self._fusion_send_callback = tqm.send_callback
+        tqm.send_callback = self._send_callback
+        self._results_lock.acquire()
+        try:
+            self._results = _ResultDeque(self._results, self._hold_fused)
+        finally:
+            self._results_lock.release()
+
+        try:
+            return super(FusionMixin, self).run(iterator, play_context)
+        finally:
+            tqm.send_callback = self._fusion_send_callback
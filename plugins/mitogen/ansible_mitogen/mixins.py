@@ -46,6 +46,7 @@ from ansible.parsing.utils.jsonify import jsonify
 
 import mitogen.core
 import mitogen.select
+import mitogen.service
 
 import ansible_mitogen.connection
 import ansible_mitogen.planner
@@ -56,6 +57,13 @@ import ansible_mitogen.utils.unsafe
 
 LOG = logging.getLogger(__name__)
 
+#: Names under which the async_status module is invoked by Ansible.
+ASYNC_STATUS_MODULES = frozenset([
+    'async_status',
+    'ansible.builtin.async_status',
+    'ansible.legacy.async_status',
+])
+
 
 class ActionModuleMixin(ansible.plugins.action.ActionBase):
     """
@@ -335,15 +343,49 @@ class ActionModuleMixin(ansible.plugins.action.ActionBase):
                 self._connection.get_good_temp_dir()
             )
 
-    def _execute_module(self, module_name=None, module_args=None, tmp=None,
-                        task_vars=None, persist_files=False,
-                        delete_remote_tmp=True, wrap_async=False,
-                        ignore_unknown_opts=False,
-                        ):
+    def _call_async_service(self, method_name, **kwargs):
+        return mitogen.service.call(
+            call_context=self._connection.get_binding().get_service_context(),
+            service_name=ansible_mitogen.planner.ASYNC_SERVICE_NAME,
+            method_name=method_name,
+            **kwargs
+        )
+
+    def _get_async_status(self, module_args):
         """
-        Collect up a module's execution environment then use it to invoke
-        target.run_module() or helpers.run_module_async() in the target
-        context.
+        Answer an ``async_status`` invocation from the multiplexer's job
+        registry, formatting the result like the module would. Return
+        :data:`None` if the module must run on the target instead, because the
+        job is unknown, or is detached and has not yet finished.
+        """
+        jid = mitogen.core.to_text(module_args.get('jid', ''))
+        self._connection._connect()
+        if module_args.get('mode') == 'cleanup':
+            if not self._call_async_service('forget', job_id=jid):
+                return None
+            return {
+                'ansible_job_id': jid,
+                'erased': os.path.join(module_args.get('_async_dir', ''), jid),
+            }
+
+        status, detached = self._call_async_service('status', job_id=jid)
+        if status is None or (detached and not status.get('finished')):
+            return None
+
+        result = dict(status)
+        if 'started' not in result:
+            result['finished'] = 1
+            result['ansible_job_id'] = jid
+        elif 'finished' not in result:
+            result['finished'] = 0
+        return result
+
+    def _make_invocation(self, module_name=None, module_args=None,
+                         task_vars=None, wrap_async=False,
+                         ignore_unknown_opts=False):
+        """
+        Collect up a module's execution environment, returning the
+        :class:`ansible_mitogen.planner.Invocation` describing it.
         """
         if module_name is None:
             module_name = self._task.action
@@ -371,20 +413,23 @@ class ActionModuleMixin(ansible.plugins.action.ActionBase):
             self._connection.context = None
 
         self._connection._connect()
-        result = ansible_mitogen.planner.invoke(
-            ansible_mitogen.planner.Invocation(
-                action=self,
-                connection=self._connection,
-                module_name=ansible_mitogen.utils.unsafe.cast(mitogen.core.to_text(module_name)),
-                module_args=ansible_mitogen.utils.unsafe.cast(module_args),
-                task_vars=task_vars,
-                templar=self._templar,
-                env=ansible_mitogen.utils.unsafe.cast(env),
-                wrap_async=wrap_async,
-                timeout_secs=self.get_task_timeout_secs(),
-            )
+        return ansible_mitogen.planner.Invocation(
+            action=self,
+            connection=self._connection,
+            module_name=ansible_mitogen.utils.unsafe.cast(mitogen.core.to_text(module_name)),
+            module_args=ansible_mitogen.utils.unsafe.cast(module_args),
+            task_vars=task_vars,
+            templar=self._templar,
+            env=ansible_mitogen.utils.unsafe.cast(env),
+            wrap_async=wrap_async,
+            timeout_secs=self.get_task_timeout_secs(),
         )
 
+    def _finish_module_result(self, result, tmp=None, delete_remote_tmp=True):
+        """
+        Apply the fixups ActionBase._execute_module() makes to a module's
+        return dict.
+        """
         if tmp and delete_remote_tmp and ansible_mitogen.utils.ansible_version[:2] < (2, 5):
             # Built-in actions expected tmpdir to be cleaned up automatically
             # on _execute_module().
@@ -417,6 +462,33 @@ class ActionModuleMixin(ansible.plugins.action.ActionBase):
 
         return ansible.utils.unsafe_proxy.wrap_var(result)
 
+    def _execute_module(self, module_name=None, module_args=None, tmp=None,
+                        task_vars=None, persist_files=False,
+                        delete_remote_tmp=True, wrap_async=False,
+                        ignore_unknown_opts=False,
+                        ):
+        """
+        Collect up a module's execution environment then use it to invoke
+        target.run_module() or helpers.run_module_async() in the target
+        context.
+        """
+        if (module_name in ASYNC_STATUS_MODULES and
+                ansible_mitogen.planner.ASYNC_PUSH):
+            result = self._get_async_status(module_args)
+            if result is not None:
+                return ansible.utils.unsafe_proxy.wrap_var(result)
+
+        result = ansible_mitogen.planner.invoke(
+            self._make_invocation(
+                module_name=module_name,
+                module_args=module_args,
+                task_vars=task_vars,
+                wrap_async=wrap_async,
+                ignore_unknown_opts=ignore_unknown_opts,
+            )
+        )
+        return self._finish_module_result(result, tmp, delete_remote_tmp)
+
     def _postprocess_response(self, result):
         """
         Apply fixups mimicking ActionBase._execute_module(); this is copied
@@ -50,6 +50,7 @@ import ansible.executor.module_common
 
 import mitogen.core
 import mitogen.select
+import mitogen.service
 
 import ansible_mitogen.loaders
 import ansible_mitogen.parsing
@@ -65,6 +66,12 @@ NO_MODULE_MSG = 'The module %s was not found in configured module paths'
 
 _planner_by_path = {}
 
+#: If true, async jobs push their status to
+#: :class:`ansible_mitogen.services.AsyncJobService`, and job files are only
+#: written for detached (``poll: 0``) jobs.
+ASYNC_PUSH = os.getenv('MITOGEN_ASYNC_PUSH', '1') != '0'
+ASYNC_SERVICE_NAME = 'ansible_mitogen.services.AsyncJobService'
+
 
 class Invocation(object):
     """
@@ -537,10 +544,32 @@ def _propagate_deps(invocation, planner, context):
     )
 
 
+def _register_async_job(invocation, job_id, context):
+    """
+    Register the job with the multiplexer's job registry, returning the sender
+    it should push status to and whether it must also write a job file.
+    """
+    detached = not getattr(invocation.action._task, 'poll', 0)
+    if not ASYNC_PUSH:
+        return None, True
+
+    binding = invocation.connection.get_binding()
+    status_sender = mitogen.service.call(
+        call_context=binding.get_service_context(),
+        service_name=ASYNC_SERVICE_NAME,
+        method_name='register',
+        job_id=job_id,
+        context=context,
+        detached=detached,
+    )
+    return status_sender, detached
+
+
 def _invoke_async_task(invocation, planner):
     job_id = '%016x' % random.randint(0, 2**64)
     context = invocation.connection.spawn_isolated_child()
     _propagate_deps(invocation, planner, context)
+    status_sender, detached = _register_async_job(invocation, job_id, context)
 
     with mitogen.core.Receiver(context.router) as started_recv:
         call_recv = context.call_async(
@@ -548,6 +577,8 @@ def _invoke_async_task(invocation, planner):
             job_id=job_id,
             timeout_secs=invocation.timeout_secs,
             started_sender=started_recv.to_sender(),
+            status_sender=status_sender,
+            detached=detached,
             kwargs=planner.get_kwargs(),
         )
 
@@ -625,16 +656,10 @@ def _load_collections(invocation):
         invocation._extra_sys_paths.add(collection_path.decode('utf-8'))
 
 
-def invoke(invocation):
+def _get_planner_for(invocation):
     """
-    Find a Planner subclass corresponding to `invocation` and use it to invoke
-    the module.
-
-    :param Invocation invocation:
-    :returns:
-        Module return dict.
-    :raises ansible.errors.AnsibleError:
-        Unrecognized/unsupported module type.
+    Return the Planner instance for `invocation`, detecting the planner class
+    on first use of the module.
     """
     path = ansible_mitogen.loaders.module_loader.find_plugin(
         invocation.module_name,
@@ -657,7 +682,21 @@ def invoke(invocation):
             module_source
         )
 
-    planner = _planner_by_path[invocation.module_path](invocation)
+    return _planner_by_path[invocation.module_path](invocation)
+
+
+def invoke(invocation):
+    """
+    Find a Planner subclass corresponding to `invocation` and use it to invoke
+    the module.
+
+    :param Invocation invocation:
+    :returns:
+        Module return dict.
+    :raises ansible.errors.AnsibleError:
+        Unrecognized/unsupported module type.
+    """
+    planner = _get_planner_for(invocation)
     if invocation.wrap_async:
         response = _invoke_async_task(invocation, planner)
     elif planner.should_fork():
@@ -670,3 +709,81 @@ def invoke(invocation):
         )
 
     return invocation.action._postprocess_response(response)
+
+
+def _is_failed(result):
+    """
+    Judge a module result as the TaskExecutor does in the absence of
+    ``failed_when``.
+    """
+    if 'failed' in result:
+        return bool(result['failed'])
+    return result.get('rc', 0) not in (0, '0')
+
+
+def _invoke_batch(connection, pairs):
+    """
+    Run the modules of `pairs`, a list of `(invocation, planner)`, with a
+    single call. Dependencies of every module are propagated beforehand.
+    """
+    paths = set()
+    overridden_sources = {}
+    extra_sys_paths = set()
+    for invocation, planner in pairs:
+        paths.update(planner.get_push_files())
+        overridden_sources.update(invocation._overridden_sources)
+        extra_sys_paths.update(invocation._extra_sys_paths)
+
+    mitogen.service.call(
+        call_context=connection.get_binding().get_service_context(),
+        service_name='mitogen.service.PushFileService',
+        method_name='propagate_paths_and_modules',
+        context=connection.context,
+        paths=list(paths),
+        overridden_sources=overridden_sources,
+        extra_sys_paths=list(extra_sys_paths),
+    )
+    responses = connection.get_chain().call(
+        ansible_mitogen.target.run_module_batch,
+        kwargs_list=[planner.get_kwargs() for _, planner in pairs],
+    )
+    return [
+        invocation.action._postprocess_response(response)
+        for (invocation, _), response in zip(pairs, responses)
+    ]
+
+
+def invoke_batch(invocations):
+    """
+    Like :func:`invoke`, for several invocations against the same connection,
+    stopping at the first module that fails. Consecutive modules that can run
+    in the target's main context are shipped with one call to
+    :func:`ansible_mitogen.target.run_module_batch`; asynchronous and forked
+    modules are invoked individually.
+
+    :param list invocations:
+        List of :class:`Invocation`.
+    :returns:
+        List of module return dicts, for the modules that ran.
+    """
+    results = []
+    pending = []
+    for invocation in invocations:
+        planner = _get_planner_for(invocation)
+        if not (invocation.wrap_async or planner.should_fork()):
+            pending.append((invocation, planner))
+            continue
+
+        if pending:
+            batch = _invoke_batch(invocation.connection, pending)
+            results.extend(batch)
+            if len(batch) < len(pending) or _is_failed(batch[-1]):
+                return results
+            pending = []
+        results.append(invoke(invocation))
+        if _is_failed(results[-1]):
+            return results
+
+    if pending:
+        results.extend(_invoke_batch(pending[0][0].connection, pending))
+    return results
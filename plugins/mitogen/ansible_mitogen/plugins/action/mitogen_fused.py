@@ -0,0 +1,152 @@
+"""
+Run a run of consecutive independent tasks fused together by the
+``mitogen_fused`` strategy (see :mod:`ansible_mitogen.fusion`) in a single
+worker.
+
+Tasks whose action is a plain module call are shipped to the target in one
+:func:`ansible_mitogen.target.run_module_batch` call. Tasks with their own
+action plug-in, such as ``template``, run in turn using the same connection.
+Execution stops at the first task that fails, as it would had the tasks been
+run separately. The result of each task is returned in order, for the strategy
+to report individually.
+"""
+
+from __future__ import absolute_import, division, print_function
+from __future__ import unicode_literals
+__metaclass__ = type
+
+import ansible.errors
+import ansible.plugins.action
+
+from ansible.module_utils.common.text.converters import to_text
+from ansible.utils.vars import merge_hash
+
+import ansible_mitogen.fusion
+import ansible_mitogen.mixins
+import ansible_mitogen.planner
+
+
+class ActionModule(ansible.plugins.action.ActionBase):
+    def _get_handler(self, task):
+        """
+        Return the action plug-in instance that would run `task` if it were
+        not fused, and whether it is the generic module-running action.
+        """
+        action_loader = self._shared_loader_obj.action_loader
+        if action_loader.has_plugin(task.action,
+                                    collection_list=task.collections):
+            name = task.action
+        else:
+            name = 'ansible.legacy.normal'
+
+        handler = action_loader.get(
+            name,
+            task=task,
+            connection=self._connection,
+            play_context=self._play_context,
+            loader=self._loader,
+            templar=self._templar,
+            shared_loader_obj=self._shared_loader_obj,
+            collection_list=task.collections,
+        )
+        is_module = (
+            name == 'ansible.legacy.normal' and
+            isinstance(handler, ansible_mitogen.mixins.ActionModuleMixin)
+        )
+        return handler, is_module
+
+    def _finalize(self, result, task):
+        """
+        Apply the defaults TaskExecutor applies to the result of `task`,
+        including its handler notifications, which TaskExecutor only adds for
+        the fused task itself.
+        """
+        result = dict(result)
+        if 'failed' not in result:
+            result['failed'] = result.get('rc', 0) not in (0, '0')
+        result.setdefault('changed', False)
+        result['_ansible_no_log'] = self._play_context.no_log
+        if task.notify is not None:
+            result['_ansible_notify'] = task.notify
+        return result
+
+    def _prepare_module(self, handler, task_vars):
+        """
+        Do the work of the ``normal`` action up to invoking the module,
+        returning its partial result and the module invocation, or
+        :data:`None` if the action decided to skip the task.
+        """
+        handler._connection.on_action_run(
+            task_vars=task_vars,
+            delegate_to_hostname=handler._task.delegate_to,
+            loader_basedir=handler._loader.get_basedir(),
+        )
+        handler._supports_check_mode = True
+        handler._supports_async = True
+        result = ansible.plugins.action.ActionBase.run(handler, None, task_vars)
+        if result.get('skipped'):
+            return result, None
+        return result, handler._make_invocation(task_vars=task_vars)
+
+    def _run_batch(self, batch):
+        """
+        Invoke the modules of `batch`, a list of `(handler, result,
+        invocation)`, returning the final result of each task that ran.
+        """
+        responses = ansible_mitogen.planner.invoke_batch(
+            [invocation for _, _, invocation in batch]
+        )
+        results = []
+        for (handler, result, _), response in zip(batch, responses):
+            result = merge_hash(result, handler._finish_module_result(response))
+            handler._remove_tmp_path(handler._connection._shell.tmpdir)
+            results.append(self._finalize(result, handler._task))
+        return results
+
+    def _run_tasks(self, task_vars, results):
+        batch = []
+        for task in ansible_mitogen.fusion.get_fused_tasks(self._task):
+            task.post_validate(templar=self._templar)
+            handler, is_module = self._get_handler(task)
+            if is_module:
+                result, invocation = self._prepare_module(handler, task_vars)
+                if invocation is not None:
+                    batch.append((handler, result, invocation))
+                    continue
+            else:
+                result = None
+
+            if batch:
+                batch_results = self._run_batch(batch)
+                results.extend(batch_results)
+                if (len(batch_results) < len(batch) or
+                        batch_results[-1]['failed']):
+                    return
+                batch = []
+
+            if result is None:
+                result = handler.run(task_vars=task_vars)
+            results.append(self._finalize(result, task))
+            if results[-1]['failed']:
+                return
+
+        if batch:
+            results.extend(self._run_batch(batch))
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        # Like TaskExecutor, report exceptions as the result of the task that
+        # raised them; tasks that completed before keep their results.
+        results = []
+        try:
+            self._run_tasks(task_vars, results)
+        except ansible.errors.AnsibleConnectionFailure as e:
+            results.append({'unreachable': True, 'msg': to_text(e)})
+        except ansible.errors.AnsibleError as e:
+            results.append({'failed': True, 'msg': to_text(e)})
+
+        result[ansible_mitogen.fusion.RESULTS_KEY] = results
+        result['changed'] = any(r.get('changed') for r in results)
+        return result
@@ -0,0 +1,146 @@
+"""
+Download a URL to the target like :ans:mod:`get_url`, but fetch it only once
+per controller. The connection multiplexer stores the artifact in a
+content-addressed cache (see :mod:`ansible_mitogen.artifacts`), then relays it
+hop-by-hop to each target over the existing Mitogen connection.
+
+Accepts the :ans:mod:`get_url` options ``url``, ``dest``, ``checksum``,
+``timeout``, ``validate_certs``, ``force``, ``mode``, ``owner`` and
+``group``. When the target is not using a Mitogen connection, the task is
+passed through to :ans:mod:`get_url` unchanged.
+"""
+
+from __future__ import absolute_import, division, print_function
+from __future__ import unicode_literals
+__metaclass__ = type
+
+import os.path
+import posixpath
+import sys
+
+# Like the strategy plug-ins, ensure ansible_mitogen is importable when this
+# action is used without a Mitogen strategy configured.
+BASE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../../..')
+)
+
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import mitogen.core
+import mitogen.service
+
+import ansible_mitogen.connection
+import ansible_mitogen.utils.unsafe
+
+from ansible.errors import AnsibleActionFail
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.module_utils.six.moves.urllib.parse import urlsplit
+from ansible.plugins.action import ActionBase
+from ansible.utils.hashing import checksum as sha1_checksum
+
+
+FILE_ARGS = ('mode', 'owner', 'group')
+SERVICE_NAME = 'ansible_mitogen.artifacts.ArtifactService'
+
+
+class ActionModule(ActionBase):
+    def _call_service(self, method_name, **kwargs):
+        return mitogen.service.call(
+            call_context=self._connection.get_binding().get_service_context(),
+            service_name=SERVICE_NAME,
+            method_name=method_name,
+            **ansible_mitogen.utils.unsafe.cast(kwargs)
+        )
+
+    def _get_dest(self, dest, url, task_vars):
+        """
+        Return the final destination path and its remote stat result, resolving
+        a directory `dest` to a file named after the URL like get_url does.
+        """
+        dest = self._remote_expand_user(dest)
+        st = self._execute_remote_stat(dest, all_vars=task_vars, follow=True)
+        if st['exists'] and st['isdir']:
+            name = posixpath.basename(urlsplit(url).path)
+            if not name:
+                raise AnsibleActionFail('cannot derive a filename from %s '
+                                        'for directory dest' % (url,))
+            dest = posixpath.join(dest, name)
+            st = self._execute_remote_stat(dest, all_vars=task_vars,
+                                           follow=True)
+        return dest, st
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        if not isinstance(self._connection,
+                          ansible_mitogen.connection.Connection):
+            result.update(self._execute_module(
+                module_name='ansible.legacy.get_url',
+                module_args=self._task.args,
+                task_vars=task_vars,
+            ))
+            return result
+
+        args = self._task.args
+        url = args.get('url')
+        if not url or not args.get('dest'):
+            raise AnsibleActionFail('url and dest are required')
+
+        self._connection._connect()
+        dest, st = self._get_dest(args['dest'], url, task_vars)
+        file_args = dict((k, args[k]) for k in FILE_ARGS if k in args)
+        result.update(url=url, dest=dest)
+
+        force = boolean(args.get('force', False), strict=False)
+        if st['exists'] and not (force or args.get('checksum')):
+            # Like get_url, an existing file is kept; only its attributes may
+            # need fixing.
+            result.update(self._execute_module(
+                module_name='ansible.legacy.file',
+                module_args=dict(file_args, path=dest, state='file'),
+                task_vars=task_vars,
+            ))
+            return result
+
+        artifact = self._call_service(
+            'download',
+            url=mitogen.core.to_text(url),
+            checksum=args.get('checksum') or None,
+            timeout=int(args.get('timeout', 10)),
+            validate_certs=boolean(args.get('validate_certs', True),
+                                   strict=False),
+        )
+        result.update(
+            checksum_src=sha1_checksum(artifact['path']),
+            artifact_digest=artifact['digest'],
+            artifact_downloaded=artifact['downloaded'],
+            size=artifact['size'],
+        )
+
+        if st.get('checksum') == result['checksum_src']:
+            module_result = self._execute_module(
+                module_name='ansible.legacy.file',
+                module_args=dict(file_args, path=dest, state='file'),
+                task_vars=task_vars,
+            )
+        elif self._play_context.check_mode:
+            module_result = {'changed': True}
+        else:
+            src = self._call_service(
+                'relay',
+                digest=artifact['digest'],
+                path=artifact['path'],
+                context=self._connection.context,
+            )
+            module_result = self._execute_module(
+                module_name='ansible.legacy.copy',
+                module_args=dict(file_args, src=src, dest=dest,
+                                 remote_src=True),
+                task_vars=task_vars,
+            )
+
+        result.update(module_result)
+        result['dest'] = dest
+        return result
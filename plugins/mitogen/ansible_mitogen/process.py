@@ -31,12 +31,15 @@ __metaclass__ = type
 
 import atexit
 import logging
+import mmap
 import multiprocessing
 import os
 import resource
 import socket
 import signal
+import struct
 import sys
+import time
 
 try:
     import faulthandler
@@ -53,7 +56,9 @@ import mitogen.core
 import mitogen.debug
 import mitogen.fork
 import mitogen.master
+import mitogen.minify
 import mitogen.parent
+import mitogen.sampler
 import mitogen.service
 import mitogen.unix
 import mitogen.utils
@@ -62,6 +67,8 @@ import ansible
 import ansible.constants as C
 import ansible.errors
 
+import ansible_mitogen.artifacts
+import ansible_mitogen.binding_table
 import ansible_mitogen.logging
 import ansible_mitogen.services
 import ansible_mitogen.affinity
@@ -76,6 +83,22 @@ ANSIBLE_PKG_OVERRIDE = (
 
 MAX_MESSAGE_SIZE = 4096 * 1048576
 
+#: Modules requested by nearly every target, whose responses, and those of the
+#: modules they import, are built by :func:`warm_module_cache` before the
+#: multiplexers are forked. Overridden by a comma-separated
+#: ``MITOGEN_WARM_MODULES``, where an empty value disables warm-up.
+WARM_MODULES = (
+    'ansible_mitogen.target',
+    'ansible_mitogen.runner',
+    'mitogen.fork',
+    'mitogen.select',
+    'ansible.module_utils.basic',
+    'ansible.module_utils.json_utils',
+    'ansible.module_utils.common.text.converters',
+    'ansible.module_utils.parsing.convert_bool',
+    'ansible.module_utils.six',
+)
+
 worker_model_msg = (
     'Mitogen connection types may only be instantiated when one of the '
     '"mitogen_*" or "operon_*" strategies are active.'
@@ -149,6 +172,16 @@ def getenv_int(key, default=0):
         return default
 
 
+def getenv_float(key, default=0.0):
+    """
+    Like :func:`getenv_int`, for a floating point environment variable.
+    """
+    try:
+        return float(os.environ.get(key, str(default)))
+    except ValueError:
+        return default
+
+
 def save_pid(name):
     """
     When debugging and profiling, it is very annoying to poke through the
@@ -167,15 +200,46 @@ def save_pid(name):
             fp.write(str(os.getpid()))
 
 
-def setup_pool(pool):
+def setup_pool(pool, binding_table=None, binding_region=0):
     """
     Configure a connection multiplexer's :class:`mitogen.service.Pool` with
     services accessed by clients and WorkerProcesses.
+
+    :param ansible_mitogen.binding_table.BindingTable binding_table:
+        If not :data:`None`, table ContextService publishes connections to.
+    :param int binding_region:
+        Region of `binding_table` owned by this multiplexer.
     """
+    push_cache_bytes = getenv_int(
+        'MITOGEN_PUSH_CACHE_BYTES',
+        default=mitogen.service.PushFileService.max_cache_bytes,
+    )
     pool.add(mitogen.service.FileService(router=pool.router))
-    pool.add(mitogen.service.PushFileService(router=pool.router))
-    pool.add(ansible_mitogen.services.ContextService(router=pool.router))
+    pool.add(mitogen.service.PushFileService(
+        router=pool.router,
+        bundle=bool(getenv_int('MITOGEN_PUSH_BUNDLE', default=1)),
+        max_cache_bytes=push_cache_bytes,
+    ))
+    pool.add(ansible_mitogen.services.ContextService(
+        router=pool.router,
+        binding_table=binding_table,
+        binding_region=binding_region,
+        push_cache_bytes=push_cache_bytes,
+    ))
     pool.add(ansible_mitogen.services.ModuleDepService(pool.router))
+    pool.add(ansible_mitogen.services.AsyncJobService(pool.router))
+    pool.add(ansible_mitogen.services.MonitorService(
+        router=pool.router,
+        pool=pool,
+        index=binding_region,
+    ))
+    pool.add(ansible_mitogen.artifacts.ArtifactService(
+        router=pool.router,
+        cache_dir=os.path.expanduser(
+            os.getenv('MITOGEN_ARTIFACT_CACHE', '~/.ansible/mitogen_artifacts')
+        ),
+        ttl=getenv_int('MITOGEN_ARTIFACT_TTL', default=86400),
+    ))
     LOG.debug('Service pool configured: size=%d', pool.size)
 
 
@@ -202,6 +266,43 @@ def _setup_responder(responder):
     )
 
 
+def get_warm_modules():
+    """
+    Return the list of module names :func:`warm_module_cache` should warm,
+    from the ``MITOGEN_WARM_MODULES`` environment variable or
+    :data:`WARM_MODULES`.
+    """
+    value = os.getenv('MITOGEN_WARM_MODULES')
+    if value is None:
+        return list(WARM_MODULES)
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def warm_module_cache(fullnames):
+    """
+    Import each module of `fullnames`, then return a
+    :class:`mitogen.master.ModuleResponder` configured like a multiplexer's,
+    with the responses for those modules and their dependencies already built.
+    Called before the multiplexers are forked, so each inherits the finished
+    source lookup, minification, compression and dependency scan rather than
+    repeating it for its first target.
+    """
+    responder = mitogen.master.ModuleResponder(router=None)
+    _setup_responder(responder)
+
+    t0 = mitogen.core.now()
+    for fullname in fullnames:
+        try:
+            __import__(fullname)
+        except Exception:
+            LOG.debug('cannot import %r for warm-up', fullname, exc_info=True)
+
+    count = responder.warm(fullnames)
+    LOG.info('built %d module responses for warm-up in %d ms', count,
+             1000 * (mitogen.core.now() - t0))
+    return responder
+
+
 def increase_open_file_limit():
     """
     #549: in order to reduce the possibility of hitting an open files limit,
@@ -255,10 +356,42 @@ def common_setup(enable_affinity=True, _init_logging=True):
     if MuxProcess.profiling:
         mitogen.core.enable_profiling()
 
+    MuxProcess.sampling = getenv_float('MITOGEN_SAMPLING')
+    if MuxProcess.sampling:
+        enable_controller_sampling(MuxProcess.sampling)
+
+    mitogen.minify.cache_dir = os.path.expanduser(
+        os.getenv('MITOGEN_MINIFY_CACHE', '~/.ansible/mitogen_minify')
+    ) or None
+
     MuxProcess.cls_original_env = dict(os.environ)
     increase_open_file_limit()
 
 
+def enable_controller_sampling(interval):
+    """
+    Sample the top-level process every `interval` seconds, appending the
+    samples to the file shared with every MuxProcess and their targets when
+    the process exits.
+    """
+    path = mitogen.sampler.get_default_path()
+    os.environ['MITOGEN_SAMPLING_FILE'] = path
+    pid = os.getpid()
+    sampler = mitogen.sampler.Sampler(interval)
+    sampler.start()
+
+    def on_exit():
+        if os.getpid() != pid:
+            return
+        sampler.stop()
+        mitogen.sampler.write_collapsed(path, {
+            u'controller': sampler.get_counts(),
+        })
+        LOG.info('wrote stack samples to %s', path)
+
+    atexit.register(on_exit)
+
+
 def get_cpu_count(default=None):
     """
     Get the multiplexer CPU count from the MITOGEN_CPU_COUNT environment
@@ -287,6 +420,62 @@ class Broker(mitogen.master.Broker):
     poller_class = mitogen.parent.POLLER_LIGHTWEIGHT
 
 
+class MuxBroker(mitogen.master.Broker):
+    """
+    MuxProcess may maintain hundreds of streams, so use the poller that
+    coalesces interest mask updates and harvests events in larger batches,
+    unless `fanout` is :data:`False`. Time spent in stream handlers is
+    accumulated for :class:`MuxStats`.
+    """
+    poller_class = mitogen.parent.POLLER_FANOUT
+
+    #: Seconds spent in stream handlers since the broker started.
+    busy_secs = 0.0
+
+    def __init__(self, fanout=True, **kwargs):
+        if not fanout:
+            self.poller_class = mitogen.parent.PREFERRED_POLLER
+        super(MuxBroker, self).__init__(**kwargs)
+
+    def _call(self, stream, func):
+        t0 = mitogen.core.now()
+        try:
+            super(MuxBroker, self)._call(stream, func)
+        finally:
+            self.busy_secs += mitogen.core.now() - t0
+
+
+class MuxStats(object):
+    """
+    Utilization published by each multiplexer in an anonymous shared mapping,
+    created by the top-level process before any multiplexer is forked, and
+    read by it to decide when to start more. Each record is written by a
+    single multiplexer and read without locking; a torn read only skews one
+    sample.
+
+    :param int count:
+        Number of records, one per multiplexer that may ever exist.
+    """
+    #: Record: cumulative broker busy seconds, :func:`mitogen.core.now` at
+    #: the time of writing, number of established connections.
+    RECORD = struct.Struct('=ddI')
+
+    def __init__(self, count):
+        self.count = count
+        self._mmap = mmap.mmap(-1, count * self.RECORD.size)
+
+    def publish(self, index, busy_secs, connections):
+        self.RECORD.pack_into(self._mmap, index * self.RECORD.size,
+                              busy_secs, mitogen.core.now(), connections)
+
+    def read(self, index):
+        """
+        Return `(busy_secs, written, connections)` for multiplexer `index`.
+        `written` is 0 until it first publishes.
+        """
+        return self.RECORD.unpack_from(self._mmap, index * self.RECORD.size)
+
+
 class Binding(object):
     """
     Represent a bound connection for a particular inventory hostname. When
@@ -317,6 +506,16 @@ class Binding(object):
         """
         raise NotImplementedError()
 
+    def lookup_context(self, key):
+        """
+        Return a dict shaped like the result of :meth:`ContextService.get()
+        <ansible_mitogen.services.ContextService.get>` for the connection stack
+        whose :func:`key_from_dict <ansible_mitogen.services.key_from_dict>`
+        is `key`, if it is already established and known without asking
+        ContextService, otherwise :data:`None`.
+        """
+        return None
+
     def close(self):
         """
         Finalize any associated resources.
@@ -353,6 +552,13 @@ class WorkerModel(object):
         """
         raise NotImplementedError()
 
+    def on_task_queued(self, inventory_name):
+        """
+        Called in the top-level process before a task for `inventory_name` is
+        handed to a new WorkerProcess, allowing placement decisions to be made
+        where every later worker inherits them.
+        """
+
 
 class ClassicBinding(Binding):
     """
@@ -374,6 +580,12 @@ class ClassicBinding(Binding):
         """
         return self.model.parent
 
+    def lookup_context(self, key):
+        """
+        See Binding.lookup_context().
+        """
+        return self.model.lookup_context(key)
+
     def close(self):
         """
         See Binding.close().
@@ -403,11 +615,37 @@ class ClassicWorkerModel(WorkerModel):
     #: Name of multiplexer process socket we are currently connected to.
     listener_path = None
 
+    #: Index of the multiplexer process we are currently connected to.
+    listener_index = None
+
+    #: :class:`ansible_mitogen.binding_table.BindingTable` shared with every
+    #: multiplexer, or :data:`None` if disabled by ``MITOGEN_BINDING_CACHE=0``.
+    binding_table = None
+
     #: mitogen.parent.Context representing the parent Context, which is the
     #: connection multiplexer process when running in classic mode, or the
     #: top-level process when running a new-style mode.
     parent = None
 
+    #: :class:`MuxStats` published by every multiplexer, or :data:`None`
+    #: unless ``MITOGEN_MUX_AUTOSCALE`` is set.
+    mux_stats = None
+
+    #: :class:`mitogen.master.ModuleResponder` returned by
+    #: :func:`warm_module_cache`, whose caches every multiplexer shares, or
+    #: :data:`None` if warm-up is disabled.
+    warm_responder = None
+
+    #: Seconds spent by :func:`warm_module_cache`.
+    warmup_secs = 0.0
+
+    #: Broker busy ratio at or above which a multiplexer receives no new hosts.
+    busy_threshold = 0.5
+
+    #: Hosts placed on, or connections established by, a multiplexer at or
+    #: above which it receives no new hosts.
+    connection_threshold = 32
+
     def __init__(self, _init_logging=True):
         """
         Arrange for classic model multiplexers to be started. The parent choses
@@ -426,13 +664,52 @@ class ClassicWorkerModel(WorkerModel):
 
         common_setup(_init_logging=_init_logging)
 
-        self.parent_sock, self.child_sock = socket.socketpair()
-        mitogen.core.set_cloexec(self.parent_sock.fileno())
-        mitogen.core.set_cloexec(self.child_sock.fileno())
+        self.parent_sock, self.child_sock = self._make_socketpair()
+
+        cpu_count = get_cpu_count(default=1)
+        #: Most multiplexers that may ever run.
+        self.max_muxes = cpu_count
+        initial = cpu_count
+        if getenv_int('MITOGEN_MUX_AUTOSCALE', default=0):
+            initial = max(1, min(cpu_count, getenv_int('MITOGEN_MUX_MIN',
+                                                       default=1)))
+            # Must exist before the fork, so the mapping is shared.
+            self.mux_stats = MuxStats(cpu_count)
+            self.busy_threshold = getenv_float('MITOGEN_MUX_BUSY_RATIO',
+                                               default=self.busy_threshold)
+            self.connection_threshold = getenv_int(
+                'MITOGEN_MUX_CONNECTIONS',
+                default=self.connection_threshold,
+            )
+
+        if getenv_int('MITOGEN_BINDING_CACHE', default=1):
+            # Must exist before the fork, so the mapping is shared.
+            self.binding_table = ansible_mitogen.binding_table.BindingTable(
+                regions=cpu_count,
+                slots=getenv_int('MITOGEN_BINDING_CACHE_SLOTS', default=1024),
+            )
+
+        warm_modules = get_warm_modules()
+        if warm_modules:
+            t0 = mitogen.core.now()
+            self.warm_responder = warm_module_cache(warm_modules)
+            self.warmup_secs = mitogen.core.now() - t0
+
+        #: Number of multiplexers started up front. Hosts never placed by
+        #: :meth:`on_task_queued` are hashed across these, so their
+        #: multiplexer does not change as more are started.
+        self._initial_count = initial
+        #: Mapping of inventory name -> index of the multiplexer it was placed
+        #: on by :meth:`on_task_queued`.
+        self._mux_index_by_name = {}
+        #: Dicts describing each multiplexer started, or each time every
+        #: multiplexer became saturated at :attr:`max_muxes`, oldest first.
+        self.decisions = []
+        self._overcommitted = False
 
         self._muxes = [
             MuxProcess(self, index)
-            for index in range(get_cpu_count(default=1))
+            for index in range(initial)
         ]
         for mux in self._muxes:
             mux.start()
@@ -441,15 +718,44 @@ class ClassicWorkerModel(WorkerModel):
         self.child_sock.close()
         self.child_sock = None
 
-    def _listener_for_name(self, name):
+    def _make_socketpair(self):
+        parent_sock, child_sock = socket.socketpair()
+        mitogen.core.set_cloexec(parent_sock.fileno())
+        mitogen.core.set_cloexec(child_sock.fileno())
+        return parent_sock, child_sock
+
+    def _parent_socks(self):
         """
-        Given an inventory hostname, return the UNIX listener that should
-        communicate with it. This is a simple hash of the inventory name.
+        Return the distinct parent ends of the socketpairs of every
+        multiplexer.
         """
-        mux = self._muxes[abs(hash(name)) % len(self._muxes)]
+        socks = [self.parent_sock]
+        for mux in self._muxes:
+            if mux.parent_sock not in socks:
+                socks.append(mux.parent_sock)
+        return socks
+
+    def _mux_for_name(self, name):
+        """
+        Given an inventory hostname, return the :class:`MuxProcess` that should
+        communicate with it. This is the multiplexer chosen by
+        :meth:`on_task_queued`, otherwise a simple hash of the inventory name
+        across those started up front.
+        """
+        index = self._mux_index_by_name.get(name)
+        if index is None:
+            index = abs(hash(name)) % self._initial_count
+        mux = self._muxes[index]
         LOG.debug('will use multiplexer %d (%s) to connect to "%s"',
                   mux.index, mux.path, name)
-        return mux.path
+        return mux
+
+    def _listener_for_name(self, name):
+        """
+        Given an inventory hostname, return the UNIX listener that should
+        communicate with it.
+        """
+        return self._mux_for_name(name).path
 
     def _reconnect(self, path):
         if self.router is not None:
@@ -489,21 +795,25 @@ class ClassicWorkerModel(WorkerModel):
         if self._pid != os.getpid():
             return
 
+        socks = self._parent_socks()
         try:
-            self.parent_sock.shutdown(socket.SHUT_WR)
+            for sock in socks:
+                sock.shutdown(socket.SHUT_WR)
         except socket.error:
             # Already closed. This is possible when tests are running.
             LOG.debug('_on_process_exit: ignoring duplicate call')
             return
 
-        mitogen.core.io_op(self.parent_sock.recv, 1)
-        self.parent_sock.close()
+        for sock in socks:
+            mitogen.core.io_op(sock.recv, 1)
+            sock.close()
 
         for mux in self._muxes:
             _, status = os.waitpid(mux.pid, 0)
             status = mitogen.fork._convert_exit_status(status)
-            LOG.debug('multiplexer %d PID %d %s', mux.index, mux.pid,
-                      mitogen.parent.returncode_to_str(status))
+            LOG.debug('multiplexer %d PID %d %s, %d hosts placed', mux.index,
+                      mux.pid, mitogen.parent.returncode_to_str(status),
+                      mux.hosts)
 
     def _test_reset(self):
         """
@@ -526,6 +836,131 @@ class ClassicWorkerModel(WorkerModel):
         See WorkerModel.on_strategy_complete().
         """
 
+    def _start_mux(self):
+        """
+        Start a further multiplexer after the initial ones. The shared
+        socketpair's child end was closed once those started, so it receives
+        a socketpair of its own.
+
+        This forks the top-level process while a strategy is running, at the
+        same point Ansible forks its WorkerProcesses.
+        """
+        mux = MuxProcess(self, len(self._muxes))
+        mux.parent_sock, mux.child_sock = self._make_socketpair()
+        mux.start()
+        mux.child_sock.close()
+        mux.child_sock = None
+        self._muxes.append(mux)
+        return mux
+
+    def _sample(self, mux):
+        """
+        Refresh the utilization of `mux` from :attr:`mux_stats`. The busy
+        ratio is measured across the interval since the last refresh, which
+        spans at least one :attr:`MuxProcess.stats_interval`.
+        """
+        busy_secs, written, connections = self.mux_stats.read(mux.index)
+        mux.connections = connections
+        last_busy_secs, last_written = mux.last_sample
+        if written - last_written >= mux.stats_interval:
+            if last_written:
+                mux.busy_ratio = ((busy_secs - last_busy_secs) /
+                                  (written - last_written))
+            mux.last_sample = (busy_secs, written)
+
+    def _saturation(self, mux):
+        """
+        Return a description of why `mux` should receive no new hosts, or
+        :data:`None`.
+        """
+        if mux.busy_ratio >= self.busy_threshold:
+            return 'busy ratio %.2f >= %.2f' % (mux.busy_ratio,
+                                                self.busy_threshold)
+        load = max(mux.hosts, mux.connections)
+        if load >= self.connection_threshold:
+            return '%d hosts/connections >= %d' % (load,
+                                                   self.connection_threshold)
+        return None
+
+    def _decide(self, action, mux, reason):
+        self.decisions.append({
+            'time': time.time(),
+            'action': action,
+            'mux': mux.index,
+            'muxes': len(self._muxes),
+            'reason': reason,
+        })
+        LOG.info('multiplexer autoscaling: %s multiplexer %d of %d (max %d): '
+                 '%s', action, mux.index, len(self._muxes), self.max_muxes,
+                 reason)
+
+    def _place(self):
+        """
+        Choose the multiplexer for a host seen for the first time: the least
+        loaded of those that are not saturated, otherwise a newly started one,
+        otherwise the least busy once :attr:`max_muxes` are running.
+        """
+        reasons = []
+        candidates = []
+        for mux in self._muxes:
+            self._sample(mux)
+            reason = self._saturation(mux)
+            if reason:
+                reasons.append('multiplexer %d %s' % (mux.index, reason))
+            else:
+                candidates.append(mux)
+
+        if candidates:
+            self._overcommitted = False
+            return min(candidates, key=lambda mux: (mux.hosts, mux.busy_ratio))
+
+        if len(self._muxes) < self.max_muxes:
+            mux = self._start_mux()
+            self._decide('started', mux, '; '.join(reasons))
+            return mux
+
+        mux = min(self._muxes, key=lambda mux: (mux.busy_ratio, mux.hosts))
+        if not self._overcommitted:
+            self._overcommitted = True
+            self._decide('overcommitted', mux, '; '.join(reasons))
+        return mux
+
+    def on_task_queued(self, inventory_name):
+        """
+        See WorkerModel.on_task_queued(). When autoscaling, place hosts seen
+        for the first time, starting multiplexers as existing ones saturate.
+        Hosts already placed never move.
+        """
+        if self.mux_stats is None or inventory_name in self._mux_index_by_name:
+            return
+
+        mux = self._place()
+        mux.hosts += 1
+        self._mux_index_by_name[inventory_name] = mux.index
+        LOG.debug('placed "%s" on multiplexer %d (busy ratio %.2f, %d hosts, '
+                  '%d connections)', inventory_name, mux.index,
+                  mux.busy_ratio, mux.hosts, mux.connections)
+
+    def get_mux_stats(self):
+        """
+        Return a list of dicts describing each multiplexer's most recent
+        utilization sample and the hosts placed on it, for tuning the
+        ``MITOGEN_MUX_*`` thresholds alongside :attr:`decisions`.
+        """
+        if self.mux_stats is not None:
+            for mux in self._muxes:
+                self._sample(mux)
+        return [
+            {
+                'index': mux.index,
+                'pid': mux.pid,
+                'hosts': mux.hosts,
+                'connections': mux.connections,
+                'busy_ratio': mux.busy_ratio,
+            }
+            for mux in self._muxes
+        ]
+
     def get_binding(self, inventory_name):
         """
         See WorkerModel.get_binding().
@@ -533,12 +968,25 @@ class ClassicWorkerModel(WorkerModel):
         if self.broker is None:
             self.broker = Broker()
 
-        path = self._listener_for_name(inventory_name)
-        if path != self.listener_path:
-            self._reconnect(path)
+        mux = self._mux_for_name(inventory_name)
+        if mux.path != self.listener_path:
+            self._reconnect(mux.path)
+            self.listener_index = mux.index
+            if os.getpid() != self._pid:
+                # In a WorkerProcess, rather than the top-level.
+                ansible_mitogen.affinity.policy.assign_worker_mux(mux.index)
 
         return ClassicBinding(self)
 
+    def lookup_context(self, key):
+        """
+        Find the connection stack `key` in the table published by the
+        multiplexer we are connected to. See Binding.lookup_context().
+        """
+        if self.binding_table is None or self.router is None:
+            return None
+        return self.binding_table.lookup(self.listener_index, key, self.router)
+
     def on_binding_close(self):
         if not self.broker:
             return
@@ -549,6 +997,7 @@ class ClassicWorkerModel(WorkerModel):
         self.broker = None
         self.parent = None
         self.listener_path = None
+        self.listener_index = None
 
         # #420: Ansible executes "meta" actions in the top-level process,
         # meaning "reset_connection" will cause :class:`mitogen.core.Latch` FDs
@@ -585,6 +1034,22 @@ class MuxProcess(object):
     #: applied to locally executed commands and modules.
     cls_original_env = None
 
+    #: Seconds between stack samples taken by :mod:`mitogen.sampler` in the
+    #: multiplexer and its targets, or 0 if ``MITOGEN_SAMPLING`` is unset.
+    sampling = 0
+
+    #: Seconds between updates of :attr:`ClassicWorkerModel.mux_stats`.
+    stats_interval = 1.0
+
+    #: :class:`mitogen.parent.Timer` for the next :meth:`_publish_stats`.
+    _stats_timer = None
+
+    # Utilization as last sampled by the top-level process.
+    hosts = 0
+    connections = 0
+    busy_ratio = 0.0
+    last_sample = (0.0, 0.0)
+
     def __init__(self, model, index):
         #: :class:`ClassicWorkerModel` instance we were created by.
         self.model = model
@@ -592,12 +1057,16 @@ class MuxProcess(object):
         self.index = index
         #: Individual path of this process.
         self.path = mitogen.unix.make_socket_path()
+        #: Ends of the socketpair used to detect top-level exit. Shared by the
+        #: multiplexers started with the model, private to later ones.
+        self.parent_sock = model.parent_sock
+        self.child_sock = model.child_sock
 
     def start(self):
         self.pid = os.fork()
         if self.pid:
             # Wait for child to boot before continuing.
-            mitogen.core.io_op(self.model.parent_sock.recv, 1)
+            mitogen.core.io_op(self.parent_sock.recv, 1)
             return
 
         ansible_mitogen.logging.set_process_name('mux:' + str(self.index))
@@ -607,8 +1076,12 @@ class MuxProcess(object):
                 os.path.basename(self.path),
             ))
 
-        self.model.parent_sock.close()
+        # Include the ends of multiplexers started earlier, otherwise they
+        # would not see the top-level exit until this process had exited.
+        for sock in set(self.model._parent_socks() + [self.parent_sock]):
+            sock.close()
         self.model.parent_sock = None
+        self.parent_sock = None
         try:
             try:
                 self.worker_main()
@@ -635,12 +1108,14 @@ class MuxProcess(object):
 
         self._setup_master()
         self._setup_services()
+        if self.model.mux_stats is not None:
+            self.broker.defer(self._publish_stats)
 
         try:
             # Let the parent know our listening socket is ready.
-            mitogen.core.io_op(self.model.child_sock.send, b'1')
+            mitogen.core.io_op(self.child_sock.send, b'1')
             # Block until the socket is closed, which happens on parent exit.
-            mitogen.core.io_op(self.model.child_sock.recv, 1)
+            mitogen.core.io_op(self.child_sock.recv, 1)
         finally:
             self.broker.shutdown()
             self.broker.join()
@@ -650,6 +1125,24 @@ class MuxProcess(object):
             # level exit instead.
             os._exit(0)
 
+    def _publish_stats(self):
+        """
+        Runs on the broker thread every :attr:`stats_interval` to update this
+        multiplexer's record in :attr:`ClassicWorkerModel.mux_stats`.
+        """
+        service = self.pool.get_service(
+            'ansible_mitogen.services.ContextService'
+        )
+        self.model.mux_stats.publish(
+            self.index,
+            self.broker.busy_secs,
+            len(service._response_by_key),
+        )
+        self._stats_timer = self.broker.timers.schedule(
+            mitogen.core.now() + self.stats_interval,
+            self._publish_stats,
+        )
+
     def _enable_router_debug(self):
         if 'MITOGEN_ROUTER_DEBUG' in os.environ:
             self.router.enable_debug()
@@ -663,12 +1156,22 @@ class MuxProcess(object):
         """
         Construct a Router, Broker, and mitogen.unix listener
         """
-        self.broker = mitogen.master.Broker(install_watcher=False)
+        self.broker = MuxBroker(
+            fanout=bool(getenv_int('MITOGEN_FANOUT_POLLER', default=1)),
+            install_watcher=False,
+        )
         self.router = mitogen.master.Router(
             broker=self.broker,
             max_message_size=MAX_MESSAGE_SIZE,
         )
         _setup_responder(self.router.responder)
+        if self.model.warm_responder is not None:
+            self.router.responder.share_cache(self.model.warm_responder)
+        if self.sampling:
+            self.router.enable_sampling(
+                interval=self.sampling,
+                label=u'mux:%d' % (self.index,),
+            )
         mitogen.core.listen(self.broker, 'shutdown', self._on_broker_shutdown)
         mitogen.core.listen(self.broker, 'exit', self._on_broker_exit)
         self.listener = mitogen.unix.Listener.build_stream(
@@ -688,7 +1191,11 @@ class MuxProcess(object):
             router=self.router,
             size=getenv_int('MITOGEN_POOL_SIZE', default=32),
         )
-        setup_pool(self.pool)
+        setup_pool(
+            self.pool,
+            binding_table=self.model.binding_table,
+            binding_region=self.index,
+        )
 
     def _on_broker_shutdown(self):
         """
@@ -697,6 +1204,8 @@ class MuxProcess(object):
         up pending handlers and connections, which is required for the threads
         to exit gracefully.
         """
+        if self._stats_timer:
+            self._stats_timer.cancel()
         self.pool.stop(join=False)
 
     def _on_broker_exit(self):
@@ -43,9 +43,14 @@ from __future__ import absolute_import, division, print_function
 from __future__ import unicode_literals
 __metaclass__ = type
 
+import collections
+import hashlib
+import json
 import logging
 import os
+import stat
 import sys
+import tempfile
 import threading
 
 import ansible.constants
@@ -54,6 +59,7 @@ from ansible.module_utils.six import reraise
 
 import mitogen.core
 import mitogen.service
+import ansible_mitogen.binding_table
 import ansible_mitogen.loaders
 import ansible_mitogen.module_finder
 import ansible_mitogen.target
@@ -104,6 +110,32 @@ class Error(Exception):
     pass
 
 
+class CountingLock(object):
+    """
+    :class:`threading.Lock` counting acquisitions, and how many of those had
+    to wait for another thread to release it. Counters are updated while
+    holding the lock.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.contended = 0
+
+    def acquire(self):
+        if not self._lock.acquire(False):
+            self._lock.acquire()
+            self.contended += 1
+        self.acquired += 1
+
+    def release(self):
+        self._lock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, e_type, e_val, tb):
+        self._lock.release()
+
+
 class ContextService(mitogen.service.Service):
     """
     Used by workers to fetch the single Context instance corresponding to a
@@ -117,12 +149,37 @@ class ContextService(mitogen.service.Service):
     bottleneck. The bottleneck can be removed using per-CPU connection
     processes and arranging for the worker to select one according to a hash of
     the connection parameters (sharding).
+
+    State for each connection configuration key, and the reference count of
+    the context created for it, is guarded by one of :attr:`lock_stripes`
+    locks chosen by hashing the key, so requests for different connections
+    rarely contend. The LRU lists and binding table have their own locks,
+    which are only ever acquired last.
     """
     max_interpreters = int(os.getenv('MITOGEN_MAX_INTERPRETERS', '20'))
 
+    #: Number of locks per-key state is striped across.
+    lock_stripes = int(os.getenv('MITOGEN_CONTEXT_LOCK_STRIPES', '16'))
+
     def __init__(self, *args, **kwargs):
+        #: :class:`ansible_mitogen.binding_table.BindingTable` successful
+        #: :meth:`get` results are published to, or :data:`None`.
+        self._binding_table = kwargs.pop('binding_table', None)
+        #: Region of :attr:`_binding_table` owned by this process.
+        self._binding_region = kwargs.pop('binding_region', 0)
+        #: Cache limit passed to each new context's :func:`init_child`, or
+        #: :data:`None` to leave the default.
+        self._push_cache_bytes = kwargs.pop('push_cache_bytes', None)
         super(ContextService, self).__init__(*args, **kwargs)
-        self._lock = threading.Lock()
+        #: Locks guarding per-key state, see :meth:`_stripe`.
+        self._stripes = [
+            CountingLock()
+            for _ in range(max(1, self.lock_stripes))
+        ]
+        #: Guards :attr:`_lru_by_via` and :attr:`_idle_by_via`.
+        self._lru_lock = CountingLock()
+        #: Serializes writes to :attr:`_binding_table`.
+        self._publish_lock = threading.Lock()
         #: Records the :meth:`get` result dict for successful calls, returned
         #: for identical subsequent calls. Keyed by :meth:`key_from_dict`.
         self._response_by_key = {}
@@ -133,14 +190,45 @@ class ContextService(mitogen.service.Service):
         #: call to :meth:`get` increases this by one. Calls to :meth:`put`
         #: decrease it by one.
         self._refs_by_context = {}
-        #: List of contexts in creation order by via= parameter. When
-        #: :attr:`max_interpreters` is reached, the most recently used context
-        #: is destroyed to make room for any additional context.
+        #: Mapping of via context -> OrderedDict of every context created
+        #: through it with LRU enabled. When it grows past
+        #: :attr:`max_interpreters`, the least recently used idle context is
+        #: destroyed.
         self._lru_by_via = {}
+        #: Mapping of via context -> OrderedDict of contexts from
+        #: :attr:`_lru_by_via` whose reference count is zero, in the order
+        #: they became idle.
+        self._idle_by_via = {}
         #: :func:`key_from_dict` result by Context.
         self._key_by_context = {}
         #: Mapping of Context -> parent Context
         self._via_by_context = {}
+        if self._binding_table is not None:
+            self.router.add_handler(
+                fn=self._on_acquire,
+                handle=ansible_mitogen.binding_table.ACQUIRE_CONTEXT,
+                policy=mitogen.core.has_parent_authority,
+            )
+
+    def _stripe(self, key):
+        """
+        Return the lock guarding `key`, its response and waiters, and the
+        reference count of its context.
+        """
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def get_lock_stats(self):
+        """
+        Return a dict of acquisition and contention totals for the stripe
+        locks and the LRU lock.
+        """
+        return {
+            'stripes': len(self._stripes),
+            'acquired': sum(lock.acquired for lock in self._stripes),
+            'contended': sum(lock.contended for lock in self._stripes),
+            'lru_acquired': self._lru_lock.acquired,
+            'lru_contended': self._lru_lock.contended,
+        }
 
     @mitogen.service.expose(mitogen.service.AllowParents())
     @mitogen.service.arg_spec({
@@ -166,17 +254,21 @@ class ContextService(mitogen.service.Service):
 
         l = mitogen.core.Latch()
         context = None
-        with self._lock:
-            for i, spec in enumerate(stack):
-                key = key_from_dict(via=context, **spec)
-                response = self._response_by_key.get(key)
-                if response is None:
-                    LOG.debug('%r: could not find connection to shut down; '
-                              'failed at hop %d', self, i)
-                    return False
-
-                context = response['context']
-
+        for i, spec in enumerate(stack):
+            key = key_from_dict(via=context, **spec)
+            response = self._response_by_key.get(key)
+            if response is None:
+                LOG.debug('%r: could not find connection to shut down; '
+                          'failed at hop %d', self, i)
+                return False
+
+            context = response['context']
+
+        with self._stripe(key):
+            if self._key_by_context.get(context) != key:
+                LOG.debug('%r: connection to shut down was already '
+                          'forgotten', self)
+                return False
             mitogen.core.listen(context, 'disconnect', l.put)
             self._shutdown_unlocked(context)
 
@@ -186,6 +278,30 @@ class ContextService(mitogen.service.Service):
         l.get(timeout=30.0)
         return True
 
+    def _add_ref_unlocked(self, context, delta):
+        """
+        Adjust the reference count of `context` while holding its stripe
+        lock, moving it into or out of its via's idle list as the count
+        reaches or leaves zero.
+        """
+        refs = self._refs_by_context[context] + delta
+        self._refs_by_context[context] = refs
+        if refs and refs != delta:
+            return
+        via = self._via_by_context.get(context)
+        if via is None:
+            return
+
+        with self._lru_lock:
+            if context not in self._lru_by_via.get(via, ()):
+                return
+            idle = self._idle_by_via.setdefault(via,
+                                                collections.OrderedDict())
+            if refs:
+                idle.pop(context, None)
+            else:
+                idle[context] = True
+
     @mitogen.service.expose(mitogen.service.AllowParents())
     @mitogen.service.arg_spec({
         'context': mitogen.core.Context
@@ -196,37 +312,96 @@ class ContextService(mitogen.service.Service):
         count reaches zero.
         """
         LOG.debug('decrementing reference count for %r', context)
-        self._lock.acquire()
-        try:
-            if self._refs_by_context.get(context, 0) == 0:
-                LOG.warning('%r.put(%r): refcount was 0. shutdown_all called?',
-                            self, context)
-                return
-            self._refs_by_context[context] -= 1
-        finally:
-            self._lock.release()
+        key = self._key_by_context.get(context)
+        if key is not None:
+            with self._stripe(key):
+                if self._refs_by_context.get(context, 0) > 0:
+                    self._add_ref_unlocked(context, -1)
+                    return
+
+        LOG.warning('%r.put(%r): refcount was 0. shutdown_all called?',
+                    self, context)
+
+    def describe(self):
+        """
+        Return a list of `(context, via, refs)` tuples for every connection
+        held, where `via` is the parent :class:`mitogen.core.Context` or
+        :data:`None`, and `refs` is its reference count.
+        """
+        return [
+            (context, self._via_by_context.get(context), refs)
+            for context, refs in list(self._refs_by_context.items())
+        ]
+
+    def _on_acquire(self, msg):
+        """
+        Take a reference to a context a worker found in the binding table, as
+        :meth:`get` would have done. The reference is returned using
+        :meth:`put` as usual.
+
+        This runs on the broker thread as each message arrives, so the
+        reference is held before a later :meth:`put` from the same worker is
+        dispatched to the pool. A context forgotten since it was published is
+        not resurrected: the worker's calls to it fail as they would had it
+        disconnected just after :meth:`get` returned.
+        """
+        if msg.is_dead:
+            return
+
+        context = msg.unpickle()
+        key = self._key_by_context.get(context)
+        if key is not None:
+            with self._stripe(key):
+                if (self._key_by_context.get(context) == key and
+                        context in self._refs_by_context):
+                    self._add_ref_unlocked(context, 1)
+                    return
+
+        LOG.debug('%r: %r was forgotten since it was published',
+                  self, context)
+
+    def _publish(self, stack, response, contexts):
+        """
+        Record a successful :meth:`get` response in the binding table, unless
+        one of `contexts` was forgotten while the response was produced.
+        """
+        if self._binding_table is None:
+            return
+
+        with self._publish_lock:
+            if all(c in self._key_by_context for c in contexts):
+                self._binding_table.publish(
+                    region=self._binding_region,
+                    key=key_from_dict(stack=stack),
+                    response=response,
+                    contexts=contexts,
+                )
 
     def _produce_response(self, key, response):
         """
         Reply to every waiting request matching a configuration key with a
-        response dictionary, deleting the list of waiters when done.
+        response dictionary, deleting the list of waiters when done. A
+        successful response is recorded for later requests, with the context
+        referenced once per waiter.
 
         :param str key:
             Result of :meth:`key_from_dict`
-        :param dict response:
-            Response dictionary
+        :param response:
+            Response dictionary, or :func:`sys.exc_info` result.
         :returns:
             Number of waiters that were replied to.
         """
-        self._lock.acquire()
-        try:
+        with self._stripe(key):
             latches = self._latches_by_key.pop(key)
-            count = len(latches)
+            if isinstance(response, dict):
+                context = response['context']
+                self._key_by_context[context] = key
+                self._refs_by_context[context] = 0
+                self._response_by_key[key] = response
+                self._add_ref_unlocked(context, len(latches))
             for latch in latches:
                 latch.put(response)
-        finally:
-            self._lock.release()
-        return count
+        return len(latches)
 
     def _forget_context_unlocked(self, context):
         key = self._key_by_context.get(context)
@@ -234,59 +409,78 @@ class ContextService(mitogen.service.Service):
             LOG.debug('%r: attempt to forget unknown %r', self, context)
             return
 
+        if self._binding_table is not None:
+            with self._publish_lock:
+                self._binding_table.invalidate(context)
+
         self._response_by_key.pop(key, None)
         self._latches_by_key.pop(key, None)
         self._key_by_context.pop(context, None)
         self._refs_by_context.pop(context, None)
-        self._via_by_context.pop(context, None)
-        self._lru_by_via.pop(context, None)
-
-    def _shutdown_unlocked(self, context, lru=None, new_context=None):
+        via = self._via_by_context.pop(context, None)
+        with self._lru_lock:
+            self._lru_by_via.pop(context, None)
+            self._idle_by_via.pop(context, None)
+            if via is not None:
+                self._lru_by_via.get(via, {}).pop(context, None)
+                self._idle_by_via.get(via, {}).pop(context, None)
+
+    def _shutdown_unlocked(self, context):
         """
-        Arrange for `context` to be shut down, and optionally add `new_context`
-        to the LRU list while holding the lock.
+        Arrange for `context` to be shut down while holding the stripe lock
+        of its key.
         """
         LOG.info('%r._shutdown_unlocked(): shutting down %r', self, context)
         context.shutdown()
-        via = self._via_by_context.get(context)
-        if via:
-            lru = self._lru_by_via.get(via)
-            if lru:
-                if context in lru:
-                    lru.remove(context)
-                if new_context:
-                    lru.append(new_context)
         self._forget_context_unlocked(context)
 
-    def _update_lru_unlocked(self, new_context, spec, via):
+    def _shutdown(self, context):
+        key = self._key_by_context.get(context)
+        if key is not None:
+            with self._stripe(key):
+                self._shutdown_unlocked(context)
+
+    def _evict(self, via):
         """
-        Update the LRU ("MRU"?) list associated with the connection described
-        by `kwargs`, destroying the most recently created context if the list
-        is full. Finally add `new_context` to the list.
+        Shut down the least recently used idle context created through `via`.
+        A candidate may be referenced again before its stripe lock is taken,
+        in which case the next is tried.
         """
-        self._via_by_context[new_context] = via
-
-        lru = self._lru_by_via.setdefault(via, [])
-        if len(lru) < self.max_interpreters:
-            lru.append(new_context)
-            return
-
-        for context in reversed(lru):
-            if self._refs_by_context[context] == 0:
-                break
-        else:
-            LOG.warning('via=%r reached maximum number of interpreters, '
-                        'but they are all marked as in-use.', via)
-            return
-
-        self._shutdown_unlocked(context, lru=lru, new_context=new_context)
+        while True:
+            with self._lru_lock:
+                idle = self._idle_by_via.get(via)
+                if not idle:
+                    LOG.warning('via=%r reached maximum number of '
+                                'interpreters, but they are all marked as '
+                                'in-use.', via)
+                    return
+                context = next(iter(idle))
+
+            key = self._key_by_context.get(context)
+            if key is None:
+                with self._lru_lock:
+                    idle.pop(context, None)
+                continue
+
+            with self._stripe(key):
+                if self._refs_by_context.get(context) == 0:
+                    self._shutdown_unlocked(context)
+                    return
 
     def _update_lru(self, new_context, spec, via):
-        self._lock.acquire()
-        try:
-            self._update_lru_unlocked(new_context, spec, via)
-        finally:
-            self._lock.release()
+        """
+        Add `new_context` to the LRU list of `via`, destroying the least
+        recently used idle context if the list grew past
+        :attr:`max_interpreters`.
+        """
+        self._via_by_context[new_context] = via
+        with self._lru_lock:
+            lru = self._lru_by_via.setdefault(via, collections.OrderedDict())
+            lru[new_context] = True
+            full = len(lru) > self.max_interpreters
+
+        if full:
+            self._evict(via)
 
     @mitogen.service.expose(mitogen.service.AllowParents())
     def dump(self):
@@ -310,12 +504,8 @@ class ContextService(mitogen.service.Service):
         """
         For testing use, arrange for all connections to be shut down.
         """
-        self._lock.acquire()
-        try:
-            for context in list(self._key_by_context):
-                self._shutdown_unlocked(context)
-        finally:
-            self._lock.release()
+        for context in list(self._key_by_context):
+            self._shutdown(context)
 
     def _on_context_disconnect(self, context):
         """
@@ -323,12 +513,13 @@ class ContextService(mitogen.service.Service):
         longer reachable context.  This method runs in the Broker thread and
         must not to block.
         """
-        self._lock.acquire()
-        try:
+        key = self._key_by_context.get(context)
+        if key is None:
+            return
+
+        with self._stripe(key):
             LOG.info('%r: Forgetting %r due to stream disconnect', self, context)
             self._forget_context_unlocked(context)
-        finally:
-            self._lock.release()
 
     ALWAYS_PRELOAD = (
         'ansible.module_utils.basic',
@@ -403,14 +594,13 @@ class ContextService(mitogen.service.Service):
             ansible_mitogen.target.init_child,
             log_level=LOG.getEffectiveLevel(),
             candidate_temp_dirs=self._get_candidate_temp_dirs(),
+            push_cache_bytes=self._push_cache_bytes,
         )
 
         if os.environ.get('MITOGEN_DUMP_THREAD_STACKS'):
             from mitogen import debug
             context.call(debug.dump_to_logger)
 
-        self._key_by_context[context] = key
-        self._refs_by_context[context] = 0
         return {
             'context': context,
             'via': via,
@@ -421,31 +611,26 @@ class ContextService(mitogen.service.Service):
     def _wait_or_start(self, spec, via=None):
         latch = mitogen.core.Latch()
         key = key_from_dict(via=via, **spec)
-        self._lock.acquire()
-        try:
+        with self._stripe(key):
             response = self._response_by_key.get(key)
             if response is not None:
-                self._refs_by_context[response['context']] += 1
+                self._add_ref_unlocked(response['context'], 1)
                 latch.put(response)
                 return latch
 
             latches = self._latches_by_key.setdefault(key, [])
             first = len(latches) == 0
             latches.append(latch)
-        finally:
-            self._lock.release()
 
         if first:
             # I'm the first requestee, so I will create the connection.
             try:
                 response = self._connect(key, spec, via=via)
-                count = self._produce_response(key, response)
-                # Only record the response for non-error results.
-                self._response_by_key[key] = response
-                # Set the reference count to the number of waiters.
-                self._refs_by_context[response['context']] += count
             except Exception:
                 self._produce_response(key, sys.exc_info())
+            else:
+                # Records the response and references it once per waiter.
+                self._produce_response(key, response)
 
         return latch
 
@@ -476,12 +661,14 @@ class ContextService(mitogen.service.Service):
             * method_name: string failing method name.
         """
         via = None
+        contexts = []
         for spec in stack:
             try:
                 result = self._wait_or_start(spec, via=via).get()
                 if isinstance(result, tuple):  # exc_info()
                     reraise(*result)
                 via = result['context']
+                contexts.append(via)
             except mitogen.core.ChannelError:
                 return {
                     'context': None,
@@ -497,19 +684,165 @@ class ContextService(mitogen.service.Service):
                     'msg': str(e),
                 }
 
+        self._publish(stack, result, contexts)
         return result
 
 
+def _file_digest(path):
+    """
+    Return the hex SHA-1 digest of the file at `path`.
+    """
+    fp = open(path, 'rb')
+    try:
+        return hashlib.sha1(fp.read()).hexdigest()
+    finally:
+        fp.close()
+
+
+class ModuleDepCache(object):
+    """
+    On-disk store of :func:`ansible_mitogen.module_finder.scan` results,
+    shared by every multiplexer process and by subsequent runs.
+
+    Entries are keyed by the module name, a hash of the module source and the
+    search path. Each entry records a fingerprint of its closure: the module,
+    every resolved module_utils file, the search path directories and the
+    package directories the files live in. A file whose size or mtime changed
+    is rehashed, and any difference in content or directory mtime causes the
+    entry to be discarded and the module rescanned.
+
+    :param str path:
+        Directory entries are stored in. Created on first write.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return 'ModuleDepCache(%r)' % (self.path,)
+
+    def _entry_path(self, module_name, module_path, search_path):
+        h = hashlib.sha1()
+        for s in (module_name, _file_digest(module_path)) + tuple(search_path):
+            h.update(mitogen.core.to_text(s).encode('utf-8'))
+            h.update(b'\0')
+        return os.path.join(self.path, h.hexdigest() + '.json')
+
+    def _fingerprint(self, path, digest=None):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return [path, None, None, None]
+
+        if stat.S_ISDIR(st.st_mode):
+            return [path, None, st.st_mtime, None]
+        return [path, st.st_size, st.st_mtime, digest or _file_digest(path)]
+
+    def _is_fresh(self, fingerprint):
+        path, size, mtime, digest = fingerprint
+        try:
+            st = os.stat(path)
+        except OSError:
+            return mtime is None
+
+        if digest is None:
+            return stat.S_ISDIR(st.st_mode) and st.st_mtime == mtime
+        if st.st_size != size:
+            return False
+        # A touched but otherwise unmodified file remains valid.
+        return st.st_mtime == mtime or _file_digest(path) == digest
+
+    def _get_closure(self, module_path, search_path, resolved):
+        paths = set(search_path)
+        paths.add(module_path)
+        for fullname, path, is_pkg in resolved:
+            paths.add(path)
+            paths.add(os.path.dirname(path))
+        return [self._fingerprint(path) for path in sorted(paths)]
+
+    def get(self, module_name, module_path, search_path):
+        """
+        Return the cached scan result for a module, or :data:`None` if no
+        entry exists or any file in its closure has changed.
+        """
+        try:
+            entry_path = self._entry_path(module_name, module_path,
+                                          search_path)
+            fp = open(entry_path, 'r')
+            try:
+                entry = json.load(fp)
+            finally:
+                fp.close()
+        except (IOError, OSError, ValueError):
+            return None
+
+        if not all(self._is_fresh(f) for f in entry['closure']):
+            LOG.debug('%r: %s closure changed, discarding entry',
+                      self, module_name)
+            return None
+
+        return [
+            (fullname, path, is_pkg)
+            for fullname, path, is_pkg in entry['resolved']
+        ]
+
+    def put(self, module_name, module_path, search_path, resolved):
+        """
+        Record the scan result for a module. Failures are logged and ignored,
+        since the cache is only an optimization.
+        """
+        entry = {
+            'resolved': [list(tup) for tup in resolved],
+            'closure': self._get_closure(module_path, search_path, resolved),
+        }
+        try:
+            entry_path = self._entry_path(module_name, module_path,
+                                          search_path)
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            # Write-then-rename, as sibling multiplexers share the directory.
+            fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.tmp')
+            try:
+                fp = os.fdopen(fd, 'w')
+                try:
+                    json.dump(entry, fp)
+                finally:
+                    fp.close()
+                os.rename(tmp_path, entry_path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+        except (IOError, OSError):
+            LOG.debug('%r: could not store %s', self, module_name,
+                      exc_info=True)
+
+
 class ModuleDepService(mitogen.service.Service):
     """
     Scan a new-style module and produce a cached mapping of module_utils names
     to their resolved filesystem paths.
+
+    Results are kept in memory for the life of the multiplexer, and in a
+    :class:`ModuleDepCache` below :attr:`cache_dir` so sibling multiplexers and
+    later runs can skip the bytecode walk. Requests for distinct modules are
+    scanned concurrently by the pool threads, while concurrent requests for the
+    same module wait for the first to complete.
     """
-    invoker_class = mitogen.service.SerializedInvoker
+    #: Directory of the on-disk dependency cache, or the empty string to
+    #: disable it.
+    cache_dir = os.path.expanduser(
+        os.getenv('MITOGEN_MODULE_DEP_CACHE', '~/.ansible/mitogen_module_deps')
+    )
 
     def __init__(self, *args, **kwargs):
         super(ModuleDepService, self).__init__(*args, **kwargs)
+        self._lock = threading.Lock()
         self._cache = {}
+        #: List of :class:`mitogen.core.Latch` awaiting the result for a
+        #: particular key.
+        self._latches_by_key = {}
+        self._disk_cache = None
+        if self.cache_dir:
+            self._disk_cache = ModuleDepCache(self.cache_dir)
 
     def _get_builtin_names(self, builtin_path, resolved):
         return [
@@ -527,6 +860,44 @@ class ModuleDepService(mitogen.service.Service):
             if not os.path.abspath(path).startswith(builtin_path)
         ]
 
+    def _resolve(self, module_name, module_path, search_path):
+        resolved = None
+        if self._disk_cache:
+            resolved = self._disk_cache.get(module_name, module_path,
+                                            search_path)
+        if resolved is None:
+            resolved = ansible_mitogen.module_finder.scan(
+                module_name=module_name,
+                module_path=module_path,
+                search_path=search_path,
+            )
+            if self._disk_cache:
+                self._disk_cache.put(module_name, module_path, search_path,
+                                     resolved)
+        return resolved
+
+    def _build(self, module_name, module_path, search_path, builtin_path):
+        resolved = self._resolve(
+            module_name=module_name,
+            module_path=module_path,
+            search_path=tuple(search_path) + (builtin_path,),
+        )
+        builtin_path = os.path.abspath(builtin_path)
+        return {
+            'builtin': self._get_builtin_names(builtin_path, resolved),
+            'custom': self._get_custom_tups(builtin_path, resolved),
+        }
+
+    def _produce_response(self, key, response):
+        self._lock.acquire()
+        try:
+            if not isinstance(response, tuple):  # exc_info()
+                self._cache[key] = response
+            for latch in self._latches_by_key.pop(key):
+                latch.put(response)
+        finally:
+            self._lock.release()
+
     @mitogen.service.expose(policy=mitogen.service.AllowParents())
     @mitogen.service.arg_spec({
         'module_name': mitogen.core.UnicodeType,
@@ -537,17 +908,313 @@ class ModuleDepService(mitogen.service.Service):
     })
     def scan(self, module_name, module_path, search_path, builtin_path, context):
         key = (module_name, search_path)
-        if key not in self._cache:
-            resolved = ansible_mitogen.module_finder.scan(
-                module_name=module_name,
-                module_path=module_path,
-                search_path=tuple(search_path) + (builtin_path,),
-            )
-            builtin_path = os.path.abspath(builtin_path)
-            builtin = self._get_builtin_names(builtin_path, resolved)
-            custom = self._get_custom_tups(builtin_path, resolved)
-            self._cache[key] = {
-                'builtin': builtin,
-                'custom': custom,
+        latch = mitogen.core.Latch()
+        self._lock.acquire()
+        try:
+            if key in self._cache:
+                return self._cache[key]
+            latches = self._latches_by_key.setdefault(key, [])
+            first = len(latches) == 0
+            latches.append(latch)
+        finally:
+            self._lock.release()
+
+        if first:
+            # I'm the first requestee, so I will scan the module.
+            try:
+                response = self._build(module_name, module_path,
+                                       search_path, builtin_path)
+            except Exception:
+                response = sys.exc_info()
+            self._produce_response(key, response)
+
+        result = latch.get()
+        if isinstance(result, tuple):  # exc_info()
+            reraise(*result)
+        return result
+
+
+class AsyncJobService(mitogen.service.Service):
+    """
+    Registry of asynchronous job status, pushed by
+    :class:`ansible_mitogen.target.AsyncRunner` over a :class:`mitogen.core.Sender`
+    as a job starts and completes. This allows ``async_status`` polls to be
+    answered within the multiplexer, rather than by running a module on the
+    target that reads back the job file.
+
+    Only jobs registered by :meth:`register` are tracked, and status is only
+    accepted from the context the job was registered to run in.
+    """
+    #: Number of finished jobs retained before the oldest are forgotten. Jobs
+    #: polled to completion are removed by ``async_status mode=cleanup``, so
+    #: this only bounds detached jobs that are never cleaned up.
+    max_finished = int(os.getenv('MITOGEN_ASYNC_MAX_FINISHED', '1000'))
+
+    def __init__(self, router):
+        super(AsyncJobService, self).__init__(router)
+        self._lock = threading.Lock()
+        #: Mapping of job ID -> dict with keys ``context_id``, ``detached``
+        #: and ``status``, the most recent status dict pushed by the job.
+        self._job_by_id = {}
+        #: Job IDs in order of completion, for enforcing :attr:`max_finished`.
+        self._finished = collections.OrderedDict()
+        self._handle = router.add_handler(self._on_status)
+        self._sender = mitogen.core.Sender(router.myself(), self._handle)
+
+    def on_shutdown(self):
+        super(AsyncJobService, self).on_shutdown()
+        if self._handle:
+            self.router.del_handler(self._handle)
+            self._handle = None
+
+    def _on_status(self, msg):
+        """
+        Record a `(job_id, status)` tuple pushed by a job. This runs on the
+        broker thread, so it must not block.
+        """
+        if msg.is_dead:
+            # The router discards every handler as the broker exits.
+            self._handle = None
+            return
+
+        job_id, status = msg.unpickle()
+        self._lock.acquire()
+        try:
+            job = self._job_by_id.get(job_id)
+            if job is None or job['context_id'] != msg.src_id:
+                LOG.error('%r: refusing status for job %r from context %d',
+                          self, job_id, msg.src_id)
+                return
+            job['status'] = status
+            if status.get('finished') or 'started' not in status:
+                self._finished[job_id] = True
+                while len(self._finished) > self.max_finished:
+                    old_id, _ = self._finished.popitem(last=False)
+                    self._job_by_id.pop(old_id, None)
+        finally:
+            self._lock.release()
+
+    @mitogen.service.expose(mitogen.service.AllowParents())
+    @mitogen.service.arg_spec({
+        'job_id': mitogen.core.UnicodeType,
+        'context': mitogen.core.Context,
+        'detached': bool,
+    })
+    def register(self, job_id, context, detached):
+        """
+        Start tracking a job about to run in `context`.
+
+        :param bool detached:
+            :data:`True` if the job may outlive the run that started it (``poll:
+            0``), in which case it must also write a job file.
+        :returns:
+            :class:`mitogen.core.Sender` the job pushes its status to.
+        """
+        self._lock.acquire()
+        try:
+            self._job_by_id[job_id] = {
+                'context_id': context.context_id,
+                'detached': detached,
+                'status': None,
             }
-        return self._cache[key]
+        finally:
+            self._lock.release()
+        mitogen.core.listen(context, 'disconnect',
+                            lambda: self._on_job_disconnect(job_id))
+        return self._sender
+
+    def _on_job_disconnect(self, job_id):
+        """
+        Respond to the job's context disconnecting. A job that has not
+        reported completion was lost; a detached job may still be running if
+        only the connection was lost, so its job file becomes authoritative.
+        """
+        self._lock.acquire()
+        try:
+            job = self._job_by_id.get(job_id)
+            if job is None or job_id in self._finished:
+                return
+            if job['detached']:
+                del self._job_by_id[job_id]
+                return
+            job['status'] = {
+                'ansible_job_id': job_id,
+                'failed': 1,
+                'finished': 1,
+                'msg': 'Job context disconnected before the job completed.',
+            }
+            self._finished[job_id] = True
+        finally:
+            self._lock.release()
+
+    @mitogen.service.expose(mitogen.service.AllowParents())
+    @mitogen.service.arg_spec({
+        'job_id': mitogen.core.UnicodeType,
+    })
+    def status(self, job_id):
+        """
+        Return the most recent status of a job.
+
+        :returns:
+            Tuple of `(status, detached)`, where `status` is :data:`None` if the
+            job is unknown or has not yet reported.
+        """
+        self._lock.acquire()
+        try:
+            job = self._job_by_id.get(job_id)
+            if job is None:
+                return None, False
+            return job['status'], job['detached']
+        finally:
+            self._lock.release()
+
+    @mitogen.service.expose(mitogen.service.AllowParents())
+    @mitogen.service.arg_spec({
+        'job_id': mitogen.core.UnicodeType,
+    })
+    def forget(self, job_id):
+        """
+        Stop tracking a job.
+
+        :returns:
+            :data:`True` if the job was known and wrote no job file, meaning
+            no cleanup is needed on the target.
+        """
+        self._lock.acquire()
+        try:
+            job = self._job_by_id.pop(job_id, None)
+            self._finished.pop(job_id, None)
+        finally:
+            self._lock.release()
+        return job is not None and not job['detached']
+
+
+class MonitorService(mitogen.service.Service):
+    """
+    Describe this connection multiplexer for :file:`scripts/mux_top.py`: its
+    streams and their traffic, the connections held by
+    :class:`ContextService`, the service pool backlog, and optionally the CPU
+    time and RSS of every target.
+
+    Targets run calls one at a time, so a target busy running a module
+    answers late. At most one statistics call is outstanding per target, and
+    until it is answered the previous result is reported with ``stale`` set.
+
+    :param mitogen.service.Pool pool:
+        Pool this service is registered with.
+    :param int index:
+        Index of this multiplexer.
+    """
+    #: Seconds :meth:`snapshot` waits for targets to report.
+    target_timeout = 1.0
+
+    def __init__(self, router, pool, index=0):
+        super(MonitorService, self).__init__(router)
+        self._pool = pool
+        self._index = index
+        #: Serialize :meth:`snapshot` calls.
+        self._lock = threading.Lock()
+        #: Mapping of Context -> Receiver for an unanswered statistics call.
+        self._recv_by_context = {}
+        #: Mapping of Context -> most recent statistics dict.
+        self._stats_by_context = {}
+
+    def _get_streams(self):
+        """
+        Runs on the broker thread, where stream state is consistent.
+        """
+        streams = []
+        for stream in set(self.router._stream_by_id.values()):
+            protocol = stream.protocol
+            if not isinstance(protocol, mitogen.core.MitogenProtocol):
+                continue
+            streams.append({
+                'name': stream.name,
+                'remote_id': protocol.remote_id,
+                'rx_messages': protocol.rx_messages,
+                'rx_bytes': protocol.rx_bytes,
+                'tx_messages': protocol.tx_messages,
+                'tx_bytes': protocol.tx_bytes,
+                'pending': protocol.pending_bytes(),
+            })
+        return streams
+
+    def _poll_targets(self, contexts):
+        """
+        Start a statistics call on each of `contexts` that has none
+        outstanding, then collect replies until :attr:`target_timeout`.
+        """
+        for context in list(self._recv_by_context):
+            if context not in contexts:
+                del self._recv_by_context[context]
+        for context in list(self._stats_by_context):
+            if context not in contexts:
+                del self._stats_by_context[context]
+
+        for context in contexts:
+            if context not in self._recv_by_context:
+                self._recv_by_context[context] = context.call_async(
+                    ansible_mitogen.target.get_process_stats
+                )
+
+        deadline = mitogen.core.now() + self.target_timeout
+        for context, recv in list(self._recv_by_context.items()):
+            try:
+                msg = recv.get(timeout=max(0, deadline - mitogen.core.now()))
+                self._stats_by_context[context] = msg.unpickle()
+            except mitogen.core.TimeoutError:
+                continue
+            except mitogen.core.Error:
+                # Dead or failing target: forget it until it is asked again.
+                self._stats_by_context.pop(context, None)
+            del self._recv_by_context[context]
+
+    @mitogen.service.expose(mitogen.service.AllowParents())
+    @mitogen.service.arg_spec({
+        'targets': bool,
+    })
+    def snapshot(self, targets):
+        """
+        Return a dict describing this multiplexer, its streams, and the
+        connections it holds, including statistics for each target when
+        `targets` is :data:`True`.
+        """
+        context_service = self._pool.get_service(ContextService.name())
+        held = context_service.describe()
+        self._lock.acquire()
+        try:
+            if targets:
+                self._poll_targets(set(context for context, _, _ in held))
+            contexts = []
+            for context, via, refs in held:
+                stats = self._stats_by_context.get(context)
+                if stats is not None:
+                    stats = dict(stats,
+                                 stale=context in self._recv_by_context)
+                contexts.append({
+                    'id': context.context_id,
+                    'name': context.name,
+                    'via': via and via.context_id,
+                    'refs': refs,
+                    'stats': stats,
+                })
+        finally:
+            self._lock.release()
+
+        return {
+            'index': self._index,
+            'ppid': os.getppid(),
+            'time': mitogen.core.now(),
+            'process': ansible_mitogen.target.get_process_stats(),
+            'busy_secs': getattr(self.router.broker, 'busy_secs', None),
+            'pool': {
+                'size': self._pool.size,
+                'queued': self._pool.queue_size(),
+            },
+            'locks': context_service.get_lock_stats(),
+            'push': self._pool.get_service(
+                mitogen.service.PushFileService.name()
+            ).get_stats(),
+            'streams': self.router.broker.defer_sync(self._get_streams),
+            'contexts': contexts,
+        }
@@ -297,7 +297,8 @@ class StrategyMixin(object):
         """
         Many PluginLoader caches are defective as they are only populated in
         the ephemeral WorkerProcess. Touch each plug-in path before forking to
-        ensure all workers receive a hot cache.
+        ensure all workers receive a hot cache. Similarly let the worker model
+        place the host before the fork, so every worker agrees on it.
         """
         ansible_mitogen.loaders.module_loader.find_plugin(
             name=task.action,
@@ -315,6 +316,7 @@ class StrategyMixin(object):
                 class_only=True,
             )
 
+        self._worker_model.on_task_queued(host.name)
         return super(StrategyMixin, self)._queue_task(
             host=host,
             task=task,
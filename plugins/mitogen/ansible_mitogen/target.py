@@ -44,6 +44,7 @@ import operator
 import os
 import pwd
 import re
+import resource
 import signal
 import stat
 import subprocess
@@ -318,7 +319,8 @@ def find_good_temp_dir(candidate_temp_dirs):
 
 
 @mitogen.core.takes_econtext
-def init_child(econtext, log_level, candidate_temp_dirs):
+def init_child(econtext, log_level, candidate_temp_dirs,
+               push_cache_bytes=None):
     """
     Called by ContextService immediately after connection; arranges for the
     (presently) spotless Python interpreter to be forked, where the newly
@@ -334,6 +336,10 @@ def init_child(econtext, log_level, candidate_temp_dirs):
     :param list[str] candidate_temp_dirs:
         List of $variable-expanded and tilde-expanded directory names to add to
         candidate list of temporary directories.
+    :param int push_cache_bytes:
+        If not :data:`None`, the multiplexer's
+        :attr:`mitogen.service.PushFileService.max_cache_bytes`, so this
+        context caches as many files as its parent assumes it does.
 
     :returns:
         Dict like::
@@ -354,6 +360,9 @@ def init_child(econtext, log_level, candidate_temp_dirs):
     LOG.setLevel(log_level)
     logging.getLogger('ansible_mitogen').setLevel(log_level)
 
+    if push_cache_bytes is not None:
+        mitogen.service.PushFileService.max_cache_bytes = push_cache_bytes
+
     global _fork_parent
     if FORK_SUPPORTED:
         mitogen.parent.upgrade_router(econtext)
@@ -389,6 +398,30 @@ def spawn_isolated_child(econtext):
     return context
 
 
+def get_process_stats():
+    """
+    Return a dict describing this process: its PID, CPU seconds used, and
+    resident set size in bytes, taken from /proc where it exists, otherwise
+    the peak reported by :func:`resource.getrusage`.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    rss = usage.ru_maxrss * 1024
+    try:
+        fp = open('/proc/self/statm')
+        try:
+            rss = int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        finally:
+            fp.close()
+    except (IOError, OSError, IndexError, ValueError):
+        pass
+
+    return {
+        'pid': os.getpid(),
+        'cpu': usage.ru_utime + usage.ru_stime,
+        'rss': rss,
+    }
+
+
 def run_module(kwargs):
     """
     Set up the process environment in preparation for running an Ansible
@@ -402,6 +435,45 @@ def run_module(kwargs):
     return impl.run()
 
 
+def _module_failed(result):
+    """
+    Return :data:`True` if a :func:`run_module` result describes a module that
+    failed, as judged by the controller's TaskExecutor.
+    """
+    try:
+        filtered, _ = (
+            ansible.module_utils.json_utils.
+            _filter_non_json_lines(result['stdout'])
+        )
+        data = json.loads(filtered)
+    except ValueError:
+        return True
+
+    if 'failed' in data:
+        return bool(data['failed'])
+    return data.get('rc', 0) not in (0, '0')
+
+
+def run_module_batch(kwargs_list):
+    """
+    Run several modules in order as with :func:`run_module`, stopping after the
+    first that fails, so that the batch behaves like the same modules run by
+    consecutive tasks.
+
+    :param list kwargs_list:
+        List of runner keyword arguments, one per module.
+    :returns:
+        List of :func:`run_module` results, for the modules that ran.
+    """
+    results = []
+    for kwargs in kwargs_list:
+        result = run_module(kwargs)
+        results.append(result)
+        if _module_failed(result):
+            break
+    return results
+
+
 def _get_async_dir():
     return os.path.expanduser(
         os.environ.get('ANSIBLE_ASYNC_DIR', '~/.ansible_async')
@@ -409,14 +481,20 @@ def _get_async_dir():
 
 
 class AsyncRunner(object):
-    def __init__(self, job_id, timeout_secs, started_sender, econtext, kwargs):
+    def __init__(self, job_id, timeout_secs, started_sender, econtext, kwargs,
+                 status_sender=None, detached=True):
         self.job_id = job_id
         self.timeout_secs = timeout_secs
         self.started_sender = started_sender
         self.econtext = econtext
         self.kwargs = kwargs
+        self.status_sender = status_sender
+        self.detached = detached
         self._timed_out = False
-        self._init_path()
+        if self.detached or self.status_sender is None:
+            self._init_path()
+        else:
+            self.path = None
 
     def _init_path(self):
         async_dir = _get_async_dir()
@@ -426,12 +504,18 @@ class AsyncRunner(object):
 
     def _update(self, dct):
         """
-        Update an async job status file.
+        Push the job status to the controller's job registry, and update the
+        async job status file if one is kept.
         """
         LOG.info('%r._update(%r, %r)', self, self.job_id, dct)
         dct.setdefault('ansible_job_id', self.job_id)
         dct.setdefault('data', '')
 
+        if self.status_sender is not None:
+            self.status_sender.send((self.job_id, dct))
+        if self.path is None:
+            return
+
         fp = open(self.path + '.tmp', 'w')
         try:
             fp.write(json.dumps(dct))
@@ -531,7 +615,8 @@ class AsyncRunner(object):
 
 
 @mitogen.core.takes_econtext
-def run_module_async(kwargs, job_id, timeout_secs, started_sender, econtext):
+def run_module_async(kwargs, job_id, timeout_secs, started_sender, econtext,
+                     status_sender=None, detached=True):
     """
     Execute a module with its run status and result written to a file,
     terminating on the process on completion. This function must run in a child
@@ -543,13 +628,22 @@ def run_module_async(kwargs, job_id, timeout_secs, started_sender, econtext):
         avoid a race where an overly eager controller can check for a task
         before it has reached that point in execution, which is possible at
         least on Python 2.4, where forking is not available for async tasks.
+    @param mitogen.core.Sender status_sender:
+        If not :data:`None`, a sender that receives `(job_id, status)` tuples
+        each time the job status changes, connected to
+        :class:`ansible_mitogen.services.AsyncJobService`.
+    @param bool detached:
+        If :data:`False` and `status_sender` is present, no job file is
+        written, as the job status is only ever read from the registry.
     """
     arunner = AsyncRunner(
         job_id,
         timeout_secs,
         started_sender,
         econtext,
-        kwargs
+        kwargs,
+        status_sender=status_sender,
+        detached=detached,
     )
     arunner.run()
 
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Exercise ArtifactService against a local HTTP stand-in for a release server.
+
+A threaded HTTP server on 127.0.0.1 serves a --size byte file and counts the
+requests it receives. A local() context plays the connection multiplexer,
+hosting ArtifactService with a temporary cache, and the master drives it as
+the mitogen_get_url action does, delivering the file to --targets local()
+contexts reached via one intermediate context. Checks that:
+
+* the URL is fetched once, however many targets receive it, and a repeated
+  download is answered from the cache;
+* a download with a checksum is shared by every URL naming that checksum;
+* a checksum mismatch fails without leaving anything in the cache;
+* every target receives an identical copy.
+
+    python bench/artifacts.py --targets 8 --size 4194304
+"""
+
+from __future__ import print_function
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mitogen
+import mitogen.core
+import mitogen.master
+import mitogen.service
+
+import ansible_mitogen.artifacts
+
+SERVICE = u'ansible_mitogen.artifacts.ArtifactService'
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, body):
+        self.body = body
+        self.hits = {}
+        self.hits_lock = threading.Lock()
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StandInHandler)
+
+    def url(self, path):
+        return u'http://127.0.0.1:%d%s' % (self.server_address[1], path)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.hits_lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(server.body)))
+        self.end_headers()
+        self.wfile.write(server.body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+@mitogen.core.takes_router
+def configure(cache_dir, router):
+    pool = mitogen.service.get_or_create_pool(router=router)
+    pool.add(ansible_mitogen.artifacts.ArtifactService(
+        router=router,
+        cache_dir=cache_dir,
+    ))
+
+
+def download(service_context, url, checksum=None):
+    return service_context.call_service(SERVICE, 'download', url=url,
+                                        checksum=checksum,
+                                        validate_certs=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--targets', type=int, default=4)
+    parser.add_argument('--size', type=int, default=1048576)
+    opts = parser.parse_args()
+
+    body = os.urandom(opts.size)
+    sha256 = hashlib.sha256(body).hexdigest()
+    checksum = u'sha256:' + sha256
+
+    server = StandInServer(body)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    cache_dir = tempfile.mkdtemp(prefix='mitogen_artifacts')
+    broker = mitogen.master.Broker()
+    try:
+        router = mitogen.master.Router(broker)
+        mux = router.local(name='mux')
+        mux.call(configure, mitogen.core.to_text(cache_dir))
+
+        url = server.url('/lazygit.tar.gz')
+        first = download(mux, url)
+        again = download(mux, url)
+        assert first['downloaded'] and not again['downloaded'], (first, again)
+        assert first['digest'] == sha256, first
+        assert server.hits == {'/lazygit.tar.gz': 1}, server.hits
+        print('download: fetched once, repeat served from cache')
+
+        pinned = download(mux, server.url('/mirror-a.tar.gz'), checksum)
+        shared = download(mux, server.url('/mirror-b.tar.gz'), checksum)
+        assert pinned['downloaded'] and not shared['downloaded']
+        assert '/mirror-b.tar.gz' not in server.hits, server.hits
+        print('checksum: shared by every URL naming it')
+
+        bad = u'sha256:' + '0' * 64
+        try:
+            download(mux, server.url('/tampered.tar.gz'), bad)
+        except mitogen.core.CallError:
+            e = sys.exc_info()[1]
+            assert 'checksum mismatch' in str(e), e
+        else:
+            raise AssertionError('checksum mismatch was not detected')
+        leftovers = [name for name in os.listdir(os.path.join(cache_dir,
+                                                              'sha256'))
+                     if name != sha256]
+        assert not leftovers, leftovers
+        print('mismatch: rejected, cache left clean')
+
+        hop = router.local(via=mux, name='hop')
+        targets = [router.local(via=hop, name='target%d' % (i,))
+                   for i in range(opts.targets)]
+        t0 = time.time()
+        for target in targets:
+            path = mux.call_service(SERVICE, 'relay',
+                                    digest=first['digest'],
+                                    path=first['path'],
+                                    context=target)
+            digest = target.call(ansible_mitogen.artifacts.file_digest, path)
+            assert digest == sha256, (target, digest)
+        elapsed = time.time() - t0
+        assert sum(server.hits.values()) == 3, server.hits
+        print('relay: %d targets via one hop in %.2fs, %d upstream fetches'
+              % (opts.targets, elapsed, server.hits['/lazygit.tar.gz']))
+    finally:
+        broker.shutdown()
+        broker.join()
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == '__main__':
+    main()
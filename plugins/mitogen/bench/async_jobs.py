@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Measure the wall time of many concurrent async tasks polled by Ansible, with
+job status pushed to the multiplexer (MITOGEN_ASYNC_PUSH=1) and with the
+original job file polling (MITOGEN_ASYNC_PUSH=0).
+
+Each of --jobs local inventory hosts runs one ``async:``/``poll:`` task, so
+every poll is an ``async_status`` call. Requires ansible-playbook on PATH.
+
+    python bench/async_jobs.py --jobs 200 --poll 5 --sleep 12
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ANSIBLE_CFG = """\
+[defaults]
+inventory = hosts
+forks = %(forks)d
+strategy_plugins = %(base_dir)s/ansible_mitogen/plugins/strategy
+strategy = mitogen_linear
+host_key_checking = False
+gathering = explicit
+"""
+
+PLAYBOOK = """\
+- hosts: all
+  gather_facts: false
+  tasks:
+    - name: Sleep asynchronously
+      ansible.builtin.command: sleep %(sleep)d
+      async: %(timeout)d
+      poll: %(poll)d
+"""
+
+
+def write_project(path, opts):
+    params = {
+        'base_dir': BASE_DIR,
+        'forks': opts.forks or opts.jobs,
+        'sleep': opts.sleep,
+        'timeout': opts.sleep * 10,
+        'poll': opts.poll,
+    }
+    with open(os.path.join(path, 'ansible.cfg'), 'w') as fp:
+        fp.write(ANSIBLE_CFG % params)
+    with open(os.path.join(path, 'bench.yml'), 'w') as fp:
+        fp.write(PLAYBOOK % params)
+    with open(os.path.join(path, 'hosts'), 'w') as fp:
+        for i in range(opts.jobs):
+            fp.write('job%03d ansible_connection=local '
+                     'ansible_python_interpreter=%s\n' % (i, sys.executable))
+
+
+def run(path, push):
+    env = dict(os.environ, MITOGEN_ASYNC_PUSH='1' if push else '0')
+    t0 = time.time()
+    subprocess.check_call(
+        ['ansible-playbook', 'bench.yml'],
+        cwd=path,
+        env=env,
+        stdout=open(os.devnull, 'w'),
+    )
+    return time.time() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--poll', type=int, default=5)
+    parser.add_argument('--sleep', type=int, default=12)
+    parser.add_argument('--forks', type=int, default=0,
+                        help='defaults to --jobs, so every job is concurrent')
+    parser.add_argument('--rounds', type=int, default=3)
+    opts = parser.parse_args()
+
+    path = tempfile.mkdtemp(prefix='mitogen_bench_async')
+    try:
+        write_project(path, opts)
+        for push in (True, False):
+            times = [run(path, push) for _ in range(opts.rounds)]
+            print('push=%d jobs=%d poll=%d: best %.2fs, mean %.2fs' % (
+                push, opts.jobs, opts.poll, min(times),
+                sum(times) / len(times),
+            ))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
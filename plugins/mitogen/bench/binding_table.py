@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Measure task throughput with the shared binding table enabled
+(MITOGEN_BINDING_CACHE=1) and disabled (MITOGEN_BINDING_CACHE=0).
+
+Each of --hosts local inventory hosts runs --tasks trivial ``ping`` tasks, so
+nearly all of the time is spent binding workers to connections. Requires
+ansible-playbook on PATH.
+
+    python bench/binding_table.py --hosts 50 --tasks 20
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ANSIBLE_CFG = """\
+[defaults]
+inventory = hosts
+forks = %(forks)d
+strategy_plugins = %(base_dir)s/ansible_mitogen/plugins/strategy
+strategy = mitogen_linear
+host_key_checking = False
+gathering = explicit
+"""
+
+PLAYBOOK_HEAD = """\
+- hosts: all
+  gather_facts: false
+  tasks:
+"""
+
+PLAYBOOK_TASK = """\
+    - ansible.builtin.ping:
+"""
+
+
+def write_project(path, opts):
+    params = {
+        'base_dir': BASE_DIR,
+        'forks': opts.forks or opts.hosts,
+    }
+    with open(os.path.join(path, 'ansible.cfg'), 'w') as fp:
+        fp.write(ANSIBLE_CFG % params)
+    with open(os.path.join(path, 'bench.yml'), 'w') as fp:
+        fp.write(PLAYBOOK_HEAD + PLAYBOOK_TASK * opts.tasks)
+    with open(os.path.join(path, 'hosts'), 'w') as fp:
+        for i in range(opts.hosts):
+            fp.write('host%03d ansible_connection=local '
+                     'ansible_python_interpreter=%s\n' % (i, sys.executable))
+
+
+def run(path, enabled):
+    env = dict(os.environ, MITOGEN_BINDING_CACHE='1' if enabled else '0')
+    t0 = time.time()
+    subprocess.check_call(
+        ['ansible-playbook', 'bench.yml'],
+        cwd=path,
+        env=env,
+        stdout=open(os.devnull, 'w'),
+    )
+    return time.time() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--hosts', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=20)
+    parser.add_argument('--forks', type=int, default=0,
+                        help='defaults to --hosts')
+    parser.add_argument('--rounds', type=int, default=3)
+    opts = parser.parse_args()
+
+    path = tempfile.mkdtemp(prefix='mitogen_bench_binding')
+    try:
+        write_project(path, opts)
+        count = opts.hosts * opts.tasks
+        # Warm the module caches, then alternate so drift affects both alike.
+        run(path, False)
+        times_by_enabled = {True: [], False: []}
+        for _ in range(opts.rounds):
+            for enabled in (True, False):
+                times_by_enabled[enabled].append(run(path, enabled))
+        for enabled in (True, False):
+            times = times_by_enabled[enabled]
+            print('binding_cache=%d hosts=%d tasks=%d: best %.1f tasks/s, '
+                  'mean %.1f tasks/s' % (
+                      enabled, opts.hosts, opts.tasks, count / min(times),
+                      count * len(times) / sum(times),
+                  ))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+Compare pickle and the fast codec for CALL_FUNCTION messages carrying the
+kwargs ansible_mitogen.planner produces for each module type, and for a
+typical run_module() result.
+
+Decoding is timed both as a child decodes a call from its parent, with
+marshal, and as a parent would decode a fast payload from a child, with the
+restricted decoder. Children pickle what they send, so the second only
+matters for payloads from a misbehaving child.
+
+    python bench/codec.py --count 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mitogen
+import mitogen.core
+import mitogen.master
+
+MODULE_ARGS = {
+    '_raw_params': 'echo hi',
+    '_uses_shell': False,
+    '_ansible_check_mode': False,
+    '_ansible_no_log': False,
+    '_ansible_debug': False,
+    '_ansible_diff': False,
+    '_ansible_verbosity': 0,
+    '_ansible_version': '2.16.0',
+    '_ansible_module_name': 'command',
+    '_ansible_syslog_facility': 'LOG_USER',
+    '_ansible_selinux_special_fs': ['fuse', 'nfs', 'vboxsf', 'ramfs', '9p'],
+    '_ansible_string_conversion_action': 'warn',
+    '_ansible_shell_executable': '/bin/sh',
+    '_ansible_keep_remote_files': False,
+    '_ansible_tmpdir': None,
+    '_ansible_remote_tmp': '~/.ansible/tmp',
+}
+
+MODULE_UTILS = [
+    u'ansible.module_utils.basic',
+    u'ansible.module_utils._text',
+    u'ansible.module_utils.common.text.converters',
+    u'ansible.module_utils.common.parameters',
+    u'ansible.module_utils.common.validation',
+    u'ansible.module_utils.parsing.convert_bool',
+    u'ansible.module_utils.six',
+]
+
+
+def get_kwargs(service_context, runner_name, **kwargs):
+    """
+    Return a dict shaped like Planner.get_kwargs() output.
+    """
+    kwargs.update({
+        u'runner_name': runner_name,
+        u'module': u'ansible.modules.command',
+        u'path': u'/usr/lib/python3/dist-packages/ansible/modules/command.py',
+        u'json_args': json.dumps(MODULE_ARGS),
+        u'env': {},
+        u'good_temp_dir': u'/home/user/.ansible/tmp',
+        u'cwd': u'/home/user',
+        u'extra_env': None,
+        u'emulate_tty': True,
+        u'service_context': service_context,
+    })
+    return kwargs
+
+
+def make_payloads(context):
+    new_style = get_kwargs(
+        context, u'NewStyleRunner',
+        interpreter_fragment=None,
+        is_python=None,
+        module_map={u'builtin': MODULE_UTILS, u'custom': []},
+        py_module_name=u'ansible.modules.command',
+        timeout_secs=None,
+    )
+    script = get_kwargs(context, u'JsonArgsRunner',
+                        interpreter_fragment=u'/usr/bin/python3',
+                        is_python=True)
+    binary = get_kwargs(context, u'BinaryRunner')
+
+    def call(kwargs):
+        return (None, u'ansible_mitogen.target', None, u'run_module', (),
+                mitogen.core.Kwargs({'kwargs': kwargs}))
+
+    result = {
+        u'rc': 0,
+        u'stdout': json.dumps({'changed': True, 'stdout': 'hi', 'rc': 0,
+                               'cmd': ['echo', 'hi'], 'stderr': '',
+                               'invocation': {'module_args': MODULE_ARGS}}),
+        u'stderr': u'',
+    }
+    return [
+        ('new_style_call', call(new_style)),
+        ('script_call', call(script)),
+        ('binary_call', call(binary)),
+        ('run_module_reply', result),
+    ]
+
+
+def timed(count, func):
+    t0 = time.time()
+    for _ in range(count):
+        func()
+    return 1e6 * (time.time() - t0) / count
+
+
+def measure(router, obj, fast, count):
+    mitogen.core.Message.fast_codec = fast
+    data = mitogen.core.Message.pickled(obj).data
+
+    def decode(auth_id):
+        msg = mitogen.core.Message(data=data, auth_id=auth_id, router=router)
+        return msg.unpickle()
+
+    encode_us = timed(count, lambda: mitogen.core.Message.pickled(obj))
+    from_parent_us = timed(count, lambda: decode(mitogen.context_id))
+    from_child_us = timed(count, lambda: decode(1234))
+    assert decode(1234) == obj
+    return len(data), encode_us, from_parent_us, from_child_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=20000)
+    opts = parser.parse_args()
+
+    broker = mitogen.master.Broker()
+    try:
+        router = mitogen.master.Router(broker)
+        context = router.context_by_id(1234, name=u'ssh.target')
+        print('%-18s %-6s %6s %10s %12s %12s' % (
+            'payload', 'codec', 'bytes', 'encode', 'from parent',
+            'from child',
+        ))
+        for name, obj in make_payloads(context):
+            for fast in (False, True):
+                size, enc, dec_parent, dec_child = measure(router, obj, fast,
+                                                           opts.count)
+                print('%-18s %-6s %6d %8.2fus %10.2fus %10.2fus' % (
+                    name, 'fast' if fast else 'pickle', size, enc,
+                    dec_parent, dec_child,
+                ))
+    finally:
+        mitogen.core.Message.fast_codec = True
+        broker.shutdown()
+        broker.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Compare EpollPoller and FanoutEpollPoller driving many socketpair streams.
+
+Each round, every one of --streams sockets receives --requests requests, and
+answers each with a --size byte reply written the way
+:class:`mitogen.core.BufferedWriter` does: immediately if possible, otherwise
+buffered with the fd armed for writing until the buffer drains. Replies
+larger than the socket buffer cause the transmit start/stop churn of a busy
+MuxProcess. Reports loop iterations, epoll control calls and wall time.
+
+    python bench/fanout_poller.py --streams 500 --rounds 20
+"""
+
+import argparse
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mitogen.parent
+
+
+class CountingEpoll(object):
+    """
+    Proxy an epoll object, counting register/modify/unregister calls.
+    """
+    def __init__(self, epoll):
+        self._epoll = epoll
+        self.ctl_calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self._epoll, name)
+
+    def register(self, *args):
+        self.ctl_calls += 1
+        return self._epoll.register(*args)
+
+    def modify(self, *args):
+        self.ctl_calls += 1
+        return self._epoll.modify(*args)
+
+    def unregister(self, *args):
+        self.ctl_calls += 1
+        return self._epoll.unregister(*args)
+
+
+class Writer(object):
+    """
+    Reduced :class:`mitogen.core.BufferedWriter`.
+    """
+    def __init__(self, poller, sock):
+        self.poller = poller
+        self.sock = sock
+        self.buf = b''
+
+    def _send(self, s):
+        try:
+            return self.sock.send(s, socket.MSG_DONTWAIT)
+        except (IOError, OSError):
+            return 0
+
+    def write(self, s):
+        if not self.buf:
+            s = s[self._send(s):]
+            if not s:
+                return
+            self.poller.start_transmit(self.sock.fileno(), (self, 'transmit'))
+        self.buf += s
+
+    def on_transmit(self):
+        self.buf = self.buf[self._send(self.buf):]
+        if not self.buf:
+            self.poller.stop_transmit(self.sock.fileno())
+
+
+def run(poller_class, opts):
+    poller = poller_class()
+    poller._epoll = CountingEpoll(poller._epoll)
+    pairs = [socket.socketpair() for _ in range(opts.streams)]
+    writers = [Writer(poller, ours) for ours, _ in pairs]
+    for (ours, theirs), writer in zip(pairs, writers):
+        for sock in ours, theirs:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, opts.size)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, opts.size)
+        poller.start_receive(ours.fileno(), (writer, 'receive'))
+
+    expected = opts.size * opts.requests
+    iterations = 0
+    t0 = time.time()
+    for _ in range(opts.rounds):
+        for _, theirs in pairs:
+            theirs.send(b'q' * opts.requests)
+        received = [0] * len(pairs)
+        while sum(received) < expected * len(pairs):
+            iterations += 1
+            for writer, event in poller.poll(1.0):
+                if event == 'receive':
+                    for _ in writer.sock.recv(4096):
+                        writer.write(b'r' * opts.size)
+                else:
+                    writer.on_transmit()
+            for i, (_, theirs) in enumerate(pairs):
+                if received[i] < expected:
+                    try:
+                        received[i] += len(theirs.recv(1048576,
+                                                       socket.MSG_DONTWAIT))
+                    except (IOError, OSError):
+                        pass
+    elapsed = time.time() - t0
+
+    for ours, theirs in pairs:
+        poller.stop_receive(ours.fileno())
+        poller.stop_transmit(ours.fileno())
+        ours.close()
+        theirs.close()
+    ctl_calls = poller._epoll.ctl_calls
+    poller._epoll = poller._epoll._epoll
+    poller.close()
+    return elapsed, iterations, ctl_calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--streams', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=8)
+    parser.add_argument('--size', type=int, default=16384)
+    opts = parser.parse_args()
+
+    if not mitogen.parent.EpollPoller.SUPPORTED:
+        parser.error('epoll is not available on this platform')
+
+    for cls in (mitogen.parent.EpollPoller, mitogen.parent.FanoutEpollPoller):
+        elapsed, iterations, ctl_calls = run(cls, opts)
+        print('%-18s %.3fs, %d loop iterations, %d epoll_ctl calls' % (
+            cls.__name__, elapsed, iterations, ctl_calls,
+        ))
+
+
+if __name__ == '__main__':
+    main()
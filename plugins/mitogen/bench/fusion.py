@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Compare the wall time of the kde-optimization role under the mitogen_linear
+and mitogen_fused strategies.
+
+The role's GTK and Firefox sections are runs of file/template tasks that the
+fused strategy ships as batches. By default the role runs in check mode
+against the local machine, limited to those tags, so nothing is changed.
+Requires ansible-playbook on PATH.
+
+    python bench/fusion.py --rounds 5
+"""
+
+import argparse
+import getpass
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+REPO_DIR = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+
+ANSIBLE_CFG = """\
+[defaults]
+inventory = hosts
+roles_path = %(repo_dir)s/roles
+action_plugins = %(repo_dir)s/plugins/action
+collections_path = %(repo_dir)s/collections
+strategy_plugins = %(base_dir)s/ansible_mitogen/plugins/strategy
+gathering = explicit
+"""
+
+PLAYBOOK = """\
+- hosts: all
+  gather_facts: false
+  vars:
+    vps_username: %(user)s
+    vps_install_desktop: true
+  roles:
+    - kde-optimization
+"""
+
+
+def write_project(path):
+    params = {
+        'base_dir': BASE_DIR,
+        'repo_dir': REPO_DIR,
+        'user': getpass.getuser(),
+    }
+    with open(os.path.join(path, 'ansible.cfg'), 'w') as fp:
+        fp.write(ANSIBLE_CFG % params)
+    with open(os.path.join(path, 'bench.yml'), 'w') as fp:
+        fp.write(PLAYBOOK % params)
+    with open(os.path.join(path, 'hosts'), 'w') as fp:
+        fp.write('localhost ansible_connection=local '
+                 'ansible_python_interpreter=%s\n' % (sys.executable,))
+
+
+def run(path, strategy, opts):
+    args = ['ansible-playbook', 'bench.yml', '--tags', opts.tags]
+    if opts.check:
+        args.append('--check')
+    env = dict(os.environ, ANSIBLE_STRATEGY=strategy)
+    t0 = time.time()
+    subprocess.check_call(args, cwd=path, env=env,
+                          stdout=open(os.devnull, 'w'))
+    return time.time() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--tags', default='gtk,firefox')
+    parser.add_argument('--no-check', dest='check', action='store_false',
+                        help='apply the role for real')
+    opts = parser.parse_args()
+
+    path = tempfile.mkdtemp(prefix='mitogen_bench_fusion')
+    try:
+        write_project(path)
+        for strategy in ('mitogen_linear', 'mitogen_fused'):
+            times = [run(path, strategy, opts) for _ in range(opts.rounds)]
+            print('%-15s best %.2fs, mean %.2fs' % (
+                strategy, min(times), sum(times) / len(times),
+            ))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main()
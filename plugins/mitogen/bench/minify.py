@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Check the single-pass minifier against the token filter pipeline, and compare
+their throughput with that of a cached minimize_source().
+
+Every file given, by default mitogen/*.py, must minify identically with both
+engines; mismatches are reported and the exit status is 1. Throughput is then
+measured over the whole set, --count times per engine.
+
+    python bench/minify.py
+    python bench/minify.py --count 5 ansible_mitogen/*.py
+"""
+
+from __future__ import print_function
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+
+import mitogen.core
+import mitogen.minify
+
+
+def read_sources(paths):
+    sources = []
+    for path in paths:
+        fp = open(path, 'rb')
+        try:
+            sources.append((path, mitogen.core.to_text(fp.read())))
+        finally:
+            fp.close()
+    return sources
+
+
+def check(sources):
+    failed = 0
+    for path, source in sources:
+        expect = mitogen.minify._minimize_tokens(source)
+        try:
+            actual = mitogen.minify._minimize_fast(source)
+        except mitogen.minify._FallBack:
+            print('%s: falls back to token filters' % (path,))
+            continue
+        if actual != expect:
+            failed += 1
+            exp_lines = expect.splitlines()
+            act_lines = actual.splitlines()
+            for i, (e, a) in enumerate(zip(exp_lines, act_lines)):
+                if e != a:
+                    break
+            else:
+                i = min(len(exp_lines), len(act_lines))
+            print('%s: MISMATCH at line %d' % (path, i + 1))
+        elif len(actual.splitlines()) != len(source.splitlines()):
+            failed += 1
+            print('%s: line count changed' % (path,))
+    return failed
+
+
+def throughput(func, sources, count):
+    size = sum(len(source) for _, source in sources)
+    t0 = time.time()
+    for _ in range(count):
+        for _, source in sources:
+            func(source)
+    elapsed = time.time() - t0
+    return count * size / elapsed / 1048576, 1000 * elapsed / count
+
+
+def cached_from_disk(source):
+    mitogen.minify._cache.clear()
+    return mitogen.minify.minimize_source(source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=10)
+    parser.add_argument('paths', nargs='*')
+    opts = parser.parse_args()
+
+    paths = opts.paths or sorted(glob.glob(os.path.join(ROOT, 'mitogen',
+                                                        '*.py')))
+    sources = read_sources(paths)
+    failed = check(sources)
+    print('%d files checked, %d mismatched' % (len(sources), failed))
+
+    cache_dir = tempfile.mkdtemp(prefix='mitogen_minify_bench')
+    try:
+        mitogen.minify.cache_dir = cache_dir
+        for _, source in sources:
+            mitogen.minify.minimize_source(source)
+        for name, func in (
+            ('token filters', mitogen.minify._minimize_tokens),
+            ('single pass', mitogen.minify._minimize_fast),
+            ('disk cache', cached_from_disk),
+            ('memory cache', mitogen.minify.minimize_source),
+        ):
+            mib_s, ms = throughput(func, sources, opts.count)
+            print('%-14s %8.2f MiB/s %9.2f ms per pass' % (name, mib_s, ms))
+    finally:
+        mitogen.minify.cache_dir = None
+        shutil.rmtree(cache_dir)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
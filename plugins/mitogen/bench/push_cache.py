@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Soak PushFileService with a stream of distinct files, and watch memory.
+
+The master pushes --modules generated files of --size bytes through an
+intermediate local() context to a target, --batch at a time plus a few files
+every batch shares, as successive module invocations would, and the target
+reads each batch back. Every --sample batches it prints the RSS of both
+children with their cache residency, hit rate, evictions and refetches. With
+a --max-bytes limit, RSS should stay flat after the first samples; with
+--max-bytes 0 it climbs with every new file.
+
+    python bench/push_cache.py --modules 400 --max-bytes 4194304
+    python bench/push_cache.py --modules 400 --max-bytes 0
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mitogen
+import mitogen.core
+import mitogen.master
+import mitogen.service
+import mitogen.utils
+
+SERVICE = u'mitogen.service.PushFileService'
+SHARED = 4
+
+
+def make_files(tmpdir, count, size):
+    rng = random.Random(0)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz_ =()\n'
+    paths = []
+    for i in range(count):
+        path = os.path.join(tmpdir, 'module_%04d.py' % (i,))
+        fp = open(path, 'w')
+        try:
+            fp.write(''.join(rng.choice(alphabet) for _ in range(size)))
+        finally:
+            fp.close()
+        paths.append(mitogen.core.to_text(path))
+    return paths
+
+
+@mitogen.core.takes_router
+def configure(max_bytes, router):
+    mitogen.service.PushFileService.max_cache_bytes = max_bytes
+    mitogen.service.get_or_create_pool(router=router)
+
+
+@mitogen.core.takes_router
+def read_files(paths, router):
+    pool = mitogen.service.get_or_create_pool(router=router)
+    service = pool.get_service(SERVICE)
+    return [len(service.get(path)) for path in paths]
+
+
+@mitogen.core.takes_router
+def get_sample(router):
+    pool = mitogen.service.get_or_create_pool(router=router)
+    stats = pool.get_service(SERVICE).get_stats()
+    fp = open('/proc/self/statm')
+    try:
+        stats['rss'] = int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    finally:
+        fp.close()
+    return stats
+
+
+def fmt_sample(label, stats):
+    return '%s rss %6.1fMiB cached %6.1fMiB %4d files hit %5.1f%% ' \
+           'evicted %5d refetched %4d' % (
+               label, stats['rss'] / 1048576.0,
+               stats['resident_bytes'] / 1048576.0, stats['resident_files'],
+               100 * stats['hit_rate'], stats['evictions'], stats['reloads'],
+           )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--modules', type=int, default=400)
+    parser.add_argument('--size', type=int, default=65536)
+    parser.add_argument('--batch', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=2,
+                        help='times to cycle through every module')
+    parser.add_argument('--sample', type=int, default=25)
+    parser.add_argument('--max-bytes', type=int, default=4 * 1048576,
+                        help='cache limit of every context, 0 for none')
+    parser.add_argument('--no-bundle', action='store_true')
+    opts = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='mitogen_push_cache')
+    broker = mitogen.master.Broker()
+    try:
+        paths = make_files(tmpdir, opts.modules, opts.size)
+        shared, paths = paths[:SHARED], paths[SHARED:]
+        router = mitogen.master.Router(broker)
+        mitogen.service.PushFileService.max_cache_bytes = opts.max_bytes
+        pool = mitogen.service.get_or_create_pool(router=router)
+        service = pool.get_service(SERVICE)
+        service.bundle = not opts.no_bundle
+
+        hop = router.local(name='hop')
+        target = router.local(via=hop, name='target')
+        for context in hop, target:
+            context.call(configure, opts.max_bytes)
+
+        batches = [
+            shared + paths[i:i + opts.batch]
+            for i in range(0, len(paths), opts.batch)
+        ] * opts.rounds
+        for i, batch in enumerate(batches):
+            service.propagate_paths_and_modules(context=target, paths=batch,
+                                                extra_sys_paths=[])
+            sizes = target.call(read_files, batch)
+            assert sizes == [opts.size] * len(batch), sizes
+            if i % opts.sample == 0 or i == len(batches) - 1:
+                print('batch %4d  %s' % (i, fmt_sample('hop', hop.call(
+                    get_sample))))
+                print('            %s' % (fmt_sample('target', target.call(
+                    get_sample)),))
+        print('master: %s' % (fmt_sample('master', dict(
+            service.get_stats(), rss=0)),))
+    finally:
+        broker.shutdown()
+        broker.join()
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
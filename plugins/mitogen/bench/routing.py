@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Measure the cost of receiving and routing messages in an intermediate context.
+
+The process plays context 1, with a parent stream for context 0 and a child
+stream for context 2, and feeds --size byte CALL_FUNCTION frames arriving from
+the parent into the Router in reads of CHUNK_SIZE, without a Broker loop or
+sockets. Reports:
+
+* forwarding throughput for frames addressed to the child, as an ssh->sudo
+  intermediate hop sees them;
+* peak memory traced by tracemalloc while forwarding one read of frames;
+* memory traced per message when --retain messages delivered locally are kept
+  alive by a handler.
+
+    python bench/routing.py --size 64 --count 200000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mitogen
+import mitogen.core
+
+LOCAL_ID = 1
+PARENT_ID = 0
+CHILD_ID = 2
+
+
+class NullWriter(object):
+    def __init__(self):
+        self.written = 0
+
+    def write(self, s):
+        self.written += len(s)
+
+
+def make_stream(router, remote_id):
+    stream = mitogen.core.MitogenProtocol.build_stream(router, remote_id)
+    stream.name = 'bench.%d' % (remote_id,)
+    stream.protocol._writer = NullWriter()
+    router._stream_by_id[remote_id] = stream
+    return stream
+
+
+def make_reads(dst_id, handle, size, count):
+    frame = mitogen.core.Message(
+        dst_id=dst_id,
+        src_id=PARENT_ID,
+        auth_id=PARENT_ID,
+        handle=handle,
+        data=b'x' * size,
+    ).pack()
+    per_read = max(1, mitogen.core.CHUNK_SIZE // len(frame))
+    read = frame * per_read
+    return [read] * (count // per_read), per_read
+
+
+def bench_forward(router, parent, opts):
+    reads, per_read = make_reads(CHILD_ID, mitogen.core.CALL_FUNCTION,
+                                 opts.size, opts.count)
+    t0 = time.time()
+    for read in reads:
+        parent.protocol.on_receive(router.broker, read)
+    elapsed = time.time() - t0
+    return len(reads) * per_read / elapsed
+
+
+def bench_forward_peak(router, parent, opts):
+    reads, per_read = make_reads(CHILD_ID, mitogen.core.CALL_FUNCTION,
+                                 opts.size, mitogen.core.CHUNK_SIZE)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    parent.protocol.on_receive(router.broker, reads[0])
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return peak, per_read
+
+
+def bench_retained(router, parent, opts):
+    retained = []
+    handle = router.add_handler(retained.append, policy=lambda msg, s: True)
+    reads, per_read = make_reads(LOCAL_ID, handle, opts.size, opts.retain)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for read in reads:
+        parent.protocol.on_receive(router.broker, read)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return used / float(len(retained))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=64,
+                        help='message data size in bytes')
+    parser.add_argument('--count', type=int, default=200000)
+    parser.add_argument('--retain', type=int, default=20000)
+    opts = parser.parse_args()
+
+    mitogen.context_id = LOCAL_ID
+    mitogen.parent_id = PARENT_ID
+    mitogen.parent_ids = [PARENT_ID]
+
+    broker = mitogen.core.Broker()
+    try:
+        router = mitogen.core.Router(broker)
+        parent = make_stream(router, PARENT_ID)
+        make_stream(router, CHILD_ID)
+
+        rate = bench_forward(router, parent, opts)
+        print('forward:  %.0f msg/s (%d byte messages)' % (rate, opts.size))
+        peak, per_read = bench_forward_peak(router, parent, opts)
+        print('forward:  %d bytes peak traced memory per read of %d frames'
+              % (peak, per_read))
+        per_msg = bench_retained(router, parent, opts)
+        print('retained: %.0f bytes traced per delivered message' % (per_msg,))
+    finally:
+        broker.shutdown()
+        broker.join()
+
+
+if __name__ == '__main__':
+    main()
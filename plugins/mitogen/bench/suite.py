@@ -0,0 +1,417 @@
+#!/usr/bin/env python
+"""
+Micro and macro benchmarks for the vendored Mitogen, run on one machine.
+
+Every benchmark uses router.local() or router.fork() children of a private
+broker, so results depend only on the local CPU and Python. Each is repeated
+--repeat times and the median is reported. Results are written as JSON, and
+can be compared against a stored baseline, failing when any metric regressed
+by more than its threshold:
+
+    python bench/suite.py run -o baseline.json
+    python bench/suite.py run --baseline baseline.json --threshold 0.15
+    python bench/suite.py compare baseline.json results.json \\
+        --threshold file_service_mbps=0.3
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mitogen
+import mitogen.core
+import mitogen.master
+import mitogen.parent
+import mitogen.service
+import mitogen.utils
+
+LOWER = 'lower'
+HIGHER = 'higher'
+
+#: Mapping of benchmark name -> (function, unit, which direction is better).
+BENCHMARKS = {}
+
+
+class Skip(Exception):
+    """
+    Raised by a benchmark that cannot run in this environment.
+    """
+
+
+def benchmark(unit, better):
+    def decorator(func):
+        BENCHMARKS[func.__name__.replace('bench_', '')] = (func, unit, better)
+        return func
+    return decorator
+
+
+class Harness(object):
+    """
+    Broker and Router shared by one benchmark sample.
+    """
+    def __init__(self):
+        self.broker = mitogen.master.Broker(install_watcher=False)
+        self.router = mitogen.master.Router(self.broker)
+
+    def close(self):
+        self.broker.shutdown()
+        self.broker.join()
+
+
+#
+# Functions run in children. They are imported from __main__.
+#
+
+def noop():
+    pass
+
+
+@mitogen.core.takes_router
+def fetch_file(path, router):
+    context = router.context_by_id(mitogen.parent_id)
+    fp = open(os.devnull, 'wb')
+    try:
+        ok, _ = mitogen.service.FileService.get(context, path, fp)
+    finally:
+        fp.close()
+    return ok
+
+
+def emit_logs(count):
+    log = logging.getLogger('mitogen_bench')
+    for i in range(count):
+        log.warning('message %d', i)
+
+
+def load_modules():
+    # None of these are imported by this script, so the child must fetch them
+    # from the master.
+    import mitogen.ssh
+    import mitogen.sudo
+    import mitogen.fork
+    return mitogen.ssh.Connection.child_is_immediate_subprocess
+
+
+#
+# Benchmarks.
+#
+
+@benchmark(unit='us', better=LOWER)
+def bench_call_latency(h, opts):
+    """Round-trip time of a blocking call to a local child."""
+    context = h.router.local()
+    context.call(noop)
+    t0 = mitogen.core.now()
+    for _ in range(opts.calls):
+        context.call(noop)
+    return 1e6 * (mitogen.core.now() - t0) / opts.calls
+
+
+@benchmark(unit='us', better=LOWER)
+def bench_fork_call_latency(h, opts):
+    """Round-trip time of a blocking call to a fork() child."""
+    context = h.router.fork()
+    context.call(noop)
+    t0 = mitogen.core.now()
+    for _ in range(opts.calls):
+        context.call(noop)
+    return 1e6 * (mitogen.core.now() - t0) / opts.calls
+
+
+@benchmark(unit='calls/s', better=HIGHER)
+def bench_callchain_throughput(h, opts):
+    """Pipelined no-reply calls through a CallChain, then one sync call."""
+    context = h.router.local()
+    context.call(noop)
+    chain = mitogen.parent.CallChain(context, pipelined=True)
+    count = opts.calls * 10
+    t0 = mitogen.core.now()
+    for _ in range(count):
+        chain.call_no_reply(noop)
+    chain.call(noop)
+    return count / (mitogen.core.now() - t0)
+
+
+@benchmark(unit='MB/s', better=HIGHER)
+def bench_file_service_mbps(h, opts):
+    """FileService transfer of a file to a local child."""
+    pool = mitogen.service.Pool(router=h.router, size=1, services=[
+        mitogen.service.FileService(router=h.router),
+    ])
+    try:
+        fd, path = tempfile.mkstemp(prefix='mitogen_bench')
+        try:
+            chunk = os.urandom(1048576)
+            for _ in range(opts.file_mb):
+                os.write(fd, chunk)
+            os.close(fd)
+            pool.get_service('mitogen.service.FileService').register(path)
+
+            context = h.router.local()
+            context.call(noop)
+            t0 = mitogen.core.now()
+            assert context.call(fetch_file, path)
+            return opts.file_mb / (mitogen.core.now() - t0)
+        finally:
+            os.unlink(path)
+    finally:
+        pool.stop()
+
+
+@benchmark(unit='ms', better=LOWER)
+def bench_local_cold_start(h, opts):
+    """Start a local child and complete its first call."""
+    t0 = mitogen.core.now()
+    h.router.local().call(noop)
+    return 1e3 * (mitogen.core.now() - t0)
+
+
+@benchmark(unit='ms', better=LOWER)
+def bench_fork_cold_start(h, opts):
+    """Fork a child and complete its first call."""
+    h.router.fork().call(noop)
+    t0 = mitogen.core.now()
+    h.router.fork().call(noop)
+    return 1e3 * (mitogen.core.now() - t0)
+
+
+@benchmark(unit='ms', better=LOWER)
+def bench_module_load_cold(h, opts):
+    """First call importing modules the child must fetch from the master."""
+    context = h.router.local()
+    context.call(noop)
+    t0 = mitogen.core.now()
+    context.call(load_modules)
+    return 1e3 * (mitogen.core.now() - t0)
+
+
+class CountingHandler(logging.Handler):
+    def __init__(self, count):
+        logging.Handler.__init__(self)
+        self.count = count
+        self.seen = 0
+        self.latch = mitogen.core.Latch()
+
+    def emit(self, record):
+        self.seen += 1
+        if self.seen == self.count:
+            self.latch.put(None)
+
+
+@benchmark(unit='records/s', better=HIGHER)
+def bench_log_forwarder_rate(h, opts):
+    """Log records forwarded from a child to the master's LogForwarder."""
+    count = opts.calls * 5
+    handler = CountingHandler(count)
+    logger = logging.getLogger('mitogen_bench')
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        context = h.router.local()
+        context.call(noop)
+        t0 = mitogen.core.now()
+        context.call(emit_logs, count)
+        handler.latch.get(timeout=60)
+        return count / (mitogen.core.now() - t0)
+    finally:
+        logger.removeHandler(handler)
+
+
+@benchmark(unit='ops/s', better=HIGHER)
+def bench_context_service_contention(h, opts):
+    """ContextService.get()/put() of established connections from many
+    threads at once, each thread using one of --stacks local() stacks."""
+    try:
+        import ansible_mitogen.services
+    except ImportError:
+        raise Skip('ansible_mitogen.services requires Ansible')
+
+    service = ansible_mitogen.services.ContextService(router=h.router)
+    stacks = [
+        [{'method': 'local', 'kwargs': {'remote_name': u'bench.%d' % (i,)}}]
+        for i in range(opts.stacks)
+    ]
+    for stack in stacks:
+        service.put(service.get(stack)['context'])
+    per_thread = opts.calls // 4
+
+    def worker(stack):
+        for _ in range(per_thread):
+            service.put(service.get(stack)['context'])
+
+    threads = [
+        threading.Thread(target=worker, args=(stacks[i % len(stacks)],))
+        for i in range(opts.threads)
+    ]
+    t0 = mitogen.core.now()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return opts.threads * per_thread / (mitogen.core.now() - t0)
+
+
+#
+# Runner and comparison.
+#
+
+def median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2.0
+
+
+def run_one(name, opts):
+    func, unit, better = BENCHMARKS[name]
+    samples = []
+    for _ in range(opts.repeat):
+        h = Harness()
+        try:
+            samples.append(func(h, opts))
+        except Skip as e:
+            return {'skipped': str(e), 'unit': unit, 'better': better}
+        finally:
+            h.close()
+    return {
+        'value': median(samples),
+        'samples': samples,
+        'unit': unit,
+        'better': better,
+    }
+
+
+def run(opts):
+    names = opts.only or sorted(BENCHMARKS)
+    results = {}
+    for name in names:
+        results[name] = result = run_one(name, opts)
+        if 'skipped' in result:
+            print('%-28s skipped: %s' % (name, result['skipped']))
+        else:
+            print('%-28s %12.2f %s' % (name, result['value'], result['unit']))
+        sys.stdout.flush()
+
+    return {
+        'version': 1,
+        'time': int(time.time()),
+        'mitogen': '.'.join(map(str, mitogen.__version__)),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': {
+            'repeat': opts.repeat,
+            'calls': opts.calls,
+            'file_mb': opts.file_mb,
+            'threads': opts.threads,
+            'stacks': opts.stacks,
+        },
+        'results': results,
+    }
+
+
+def parse_thresholds(specs):
+    """
+    Parse ``--threshold`` values: a bare fraction sets the default, and
+    ``name=fraction`` overrides it for one metric.
+    """
+    default = 0.1
+    overrides = {}
+    for spec in specs or ():
+        name, sep, value = spec.rpartition('=')
+        if sep:
+            overrides[name] = float(value)
+        else:
+            default = float(value)
+    return default, overrides
+
+
+def compare(baseline, current, thresholds):
+    """
+    Print the change of every metric of `current` relative to `baseline`,
+    returning the names of those that regressed beyond their threshold.
+    """
+    default, overrides = thresholds
+    regressed = []
+    for name in sorted(current['results']):
+        cur = current['results'][name]
+        base = baseline['results'].get(name)
+        if 'skipped' in cur or not base or 'skipped' in base:
+            print('%-28s %s' % (name, 'no comparison'))
+            continue
+
+        change = (cur['value'] - base['value']) / base['value']
+        if cur['better'] == HIGHER:
+            worse = -change
+        else:
+            worse = change
+        threshold = overrides.get(name, default)
+        status = 'ok'
+        if worse > threshold:
+            status = 'REGRESSION (> %d%%)' % (100 * threshold,)
+            regressed.append(name)
+        print('%-28s %12.2f -> %12.2f %-9s %+6.1f%%  %s' % (
+            name, base['value'], cur['value'], cur['unit'],
+            100 * change, status,
+        ))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest='command')
+
+    p_run = sub.add_parser('run', help='run benchmarks')
+    p_run.add_argument('--only', action='append', choices=sorted(BENCHMARKS),
+                       help='run only this benchmark; may be repeated')
+    p_run.add_argument('--repeat', type=int, default=5)
+    p_run.add_argument('--calls', type=int, default=2000)
+    p_run.add_argument('--file-mb', type=int, default=64)
+    p_run.add_argument('--threads', type=int, default=32)
+    p_run.add_argument('--stacks', type=int, default=8,
+                       help='connections used by context_service_contention')
+    p_run.add_argument('-o', '--output', help='write JSON results here')
+    p_run.add_argument('--baseline', help='compare against this JSON file')
+    p_run.add_argument('--threshold', action='append',
+                       help='fraction, or name=fraction; default 0.1')
+
+    p_cmp = sub.add_parser('compare', help='compare two result files')
+    p_cmp.add_argument('baseline')
+    p_cmp.add_argument('current')
+    p_cmp.add_argument('--threshold', action='append',
+                       help='fraction, or name=fraction; default 0.1')
+
+    opts = parser.parse_args()
+    if opts.command == 'run':
+        mitogen.utils.log_to_file(level='WARNING')
+        current = run(opts)
+        if opts.output:
+            with open(opts.output, 'w') as fp:
+                json.dump(current, fp, indent=2, sort_keys=True)
+        if not opts.baseline:
+            return 0
+        with open(opts.baseline) as fp:
+            baseline = json.load(fp)
+    elif opts.command == 'compare':
+        with open(opts.baseline) as fp:
+            baseline = json.load(fp)
+        with open(opts.current) as fp:
+            current = json.load(fp)
+    else:
+        parser.error('a command is required')
+
+    print()
+    regressed = compare(baseline, current, parse_thresholds(opts.threshold))
+    return int(bool(regressed))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -71,6 +71,7 @@ import fcntl
 import itertools
 import linecache
 import logging
+import marshal
 import os
 import pickle as py_pickle
 import pstats
@@ -140,6 +141,7 @@ FORWARD_MODULE = 108
 DETACHING = 109
 CALL_SERVICE = 110
 STUB_CALL_SERVICE = 111
+FORWARD_SAMPLES = 112
 
 #: Special value used to signal disconnection or the inability to route a
 #: message, when it appears in the `reply_to` field. Usually causes
@@ -186,6 +188,21 @@ try:
 except NameError:
     next = lambda it: it.next()
 
+try:
+    Struct = struct.Struct
+except AttributeError:
+    class Struct(object):
+        # Python <2.5.
+        def __init__(self, fmt):
+            self.format = fmt
+            self.size = struct.calcsize(fmt)
+
+        def pack(self, *args):
+            return struct.pack(self.format, *args)
+
+        def unpack_from(self, buf, offset=0):
+            return struct.unpack(self.format, buf[offset:offset+self.size])
+
 # #550: prehistoric WSL did not advertise itself in uname output.
 try:
     fp = open('/proc/sys/kernel/osrelease')
@@ -795,70 +812,395 @@ else:
     _Unpickler = pickle.Unpickler
 
 
+
+#: Prefix of :attr:`Message.data` serialized by the fast codec, rather than
+#: pickle. Pickle protocol 2 data always begins with ``\x80``.
+FAST_TAG = b('M0')
+
+#: Like :data:`FAST_TAG`, but the payload contains references to
+#: :class:`Context` or :class:`Kwargs` objects, encoded as tuples whose first
+#: element is :data:`Ellipsis`.
+FAST_REFS_TAG = b('M1')
+
+_FAST_TAGS = (FAST_TAG, FAST_REFS_TAG)
+
+#: Exact types permitted in fast codec payloads, besides dicts, lists and
+#: tuples. Anything else, including subclasses, is pickled instead.
+_FAST_LEAF_TYPES = frozenset(
+    (type(None), bool, float, BytesType, UnicodeType) + integer_types
+)
+
+#: The earliest marshal format, since contexts may run different Python
+#: versions. Later formats intern strings, which Python 3 reads back as text.
+_FAST_MARSHAL_VERSION = 0
+
+
+class _FastCodecError(Exception):
+    pass
+
+
+def _fast_prepare(obj, paths, path=()):
+    """
+    Return `obj` with any :class:`Context` or :class:`Kwargs` replaced by
+    marker tuples, appending the path of keys and indices leading to each
+    marker to `paths`, innermost first. Raise :class:`_FastCodecError` if
+    `obj` contains a type the fast codec does not support. Containers without
+    markers are returned unmodified.
+    """
+    t = type(obj)
+    if t in _FAST_LEAF_TYPES:
+        return obj
+    if t is dict:
+        if not _FAST_LEAF_TYPES.issuperset(map(type, obj)):
+            raise _FastCodecError()
+        if _FAST_LEAF_TYPES.issuperset(map(type, itervalues(obj))):
+            return obj
+        out = obj
+        for k, v in iteritems(obj):
+            if type(v) not in _FAST_LEAF_TYPES:
+                v2 = _fast_prepare(v, paths, path + (k,))
+                if v2 is not v:
+                    if out is obj:
+                        out = dict(obj)
+                    out[k] = v2
+        return out
+    if t is tuple or t is list:
+        if _FAST_LEAF_TYPES.issuperset(map(type, obj)):
+            return obj
+        out = obj
+        for i, v in enumerate(obj):
+            if type(v) not in _FAST_LEAF_TYPES:
+                v2 = _fast_prepare(v, paths, path + (i,))
+                if v2 is not v:
+                    if out is obj:
+                        out = list(obj)
+                    out[i] = v2
+        if out is obj or t is list:
+            return out
+        return tuple(out)
+    if t is Kwargs:
+        out = (Ellipsis, u'k', _fast_prepare(dict(obj), paths, path + (2,)))
+    elif isinstance(obj, Context):
+        out = (Ellipsis, u'c', obj.context_id, obj.name)
+    else:
+        raise _FastCodecError()
+    paths.append(path)
+    return out
+
+
+def _fast_unmark(obj, router):
+    """
+    Return the object represented by the marker tuple `obj`.
+    """
+    if type(obj) is tuple and obj and obj[0] is Ellipsis:
+        if len(obj) == 4 and obj[1] == u'c':
+            return _unpickle_context(obj[2], obj[3], router=router)
+        if len(obj) == 3 and obj[1] == u'k' and type(obj[2]) is dict:
+            return Kwargs(obj[2])
+    raise TypeError('bad marker')
+
+
+def _fast_patch(obj, path, router):
+    """
+    Replace the marker at `path` within `obj`, returning the new `obj`.
+    """
+    if not path:
+        return _fast_unmark(obj, router)
+    key = path[0]
+    child = _fast_patch(obj[key], path[1:], router)
+    if type(obj) is tuple:
+        return obj[:key] + (child,) + obj[key+1:]
+    obj[key] = child
+    return obj
+
+
+def _fast_restore(obj, router):
+    """
+    Reverse :func:`_fast_prepare` for an untrusted payload, ignoring its
+    recorded paths, raising :class:`TypeError` if `obj` contains any type
+    :func:`_fast_prepare` could not have produced.
+    """
+    t = type(obj)
+    if t in _FAST_LEAF_TYPES:
+        return obj
+    if t is dict:
+        if not _FAST_LEAF_TYPES.issuperset(map(type, obj)):
+            raise TypeError('bad key type')
+        if _FAST_LEAF_TYPES.issuperset(map(type, itervalues(obj))):
+            return obj
+        for k, v in iteritems(obj):
+            obj[k] = _fast_restore(v, router)
+        return obj
+    if t is list:
+        if _FAST_LEAF_TYPES.issuperset(map(type, obj)):
+            return obj
+        return [_fast_restore(v, router) for v in obj]
+    if t is tuple:
+        if obj and obj[0] is Ellipsis:
+            if len(obj) == 3:
+                obj = obj[:2] + (_fast_restore(obj[2], router),)
+            return _fast_unmark(obj, router)
+        if _FAST_LEAF_TYPES.issuperset(map(type, obj)):
+            return obj
+        return tuple([_fast_restore(v, router) for v in obj])
+    raise TypeError('bad type %r' % (t,))
+
+
+_FAST_INT32 = struct.Struct('<i')
+_FAST_DIGIT = struct.Struct('<H')
+
+
+def _fast_decode(data, pos):
+    """
+    Decode the value at offset `pos` of `data`, which must be in the subset
+    of marshal format 0 that :func:`fast_dumps` produces, returning `(value,
+    offset after it)`. Untrusted payloads are read with this rather than
+    :func:`marshal.loads`, which is not safe against malicious data.
+
+    :raises ValueError:
+        `data` was truncated or contained an unsupported type code.
+    """
+    code = data[pos:pos+1]
+    pos += 1
+    if code == b('u') or code == b('s'):
+        n, = _FAST_INT32.unpack_from(data, pos)
+        pos += 4
+        if n < 0 or pos + n > len(data):
+            raise ValueError('truncated string')
+        s = data[pos:pos+n]
+        if code == b('u'):
+            s = s.decode('utf-8')
+        return s, pos + n
+    if code == b('{'):
+        dct = {}
+        while data[pos:pos+1] != b('0'):
+            k, pos = _fast_decode(data, pos)
+            dct[k], pos = _fast_decode(data, pos)
+        return dct, pos + 1
+    if code == b('i'):
+        return _FAST_INT32.unpack_from(data, pos)[0], pos + 4
+    if code == b('N'):
+        return None, pos
+    if code == b('T'):
+        return True, pos
+    if code == b('F'):
+        return False, pos
+    if code == b('(') or code == b('['):
+        n, = _FAST_INT32.unpack_from(data, pos)
+        pos += 4
+        if n < 0 or pos + n > len(data):
+            raise ValueError('truncated sequence')
+        items = []
+        for _ in range(n):
+            item, pos = _fast_decode(data, pos)
+            items.append(item)
+        if code == b('('):
+            return tuple(items), pos
+        return items, pos
+    if code == b('.'):
+        return Ellipsis, pos
+    if code == b('l'):
+        n, = _FAST_INT32.unpack_from(data, pos)
+        pos += 4
+        if pos + 2 * abs(n) > len(data):
+            raise ValueError('truncated integer')
+        value = 0
+        for i in range(abs(n)):
+            value |= _FAST_DIGIT.unpack_from(data, pos + 2 * i)[0] << (15 * i)
+        return (-value if n < 0 else value), pos + 2 * abs(n)
+    if code == b('f'):
+        n = ord(data[pos:pos+1])
+        return float(data[pos+1:pos+1+n]), pos + 1 + n
+    raise ValueError('unsupported type code %r' % (code,))
+
+
+def fast_dumps(obj):
+    """
+    Serialize `obj` using the fast codec, returning :data:`None` if it
+    contains anything besides dicts, lists, tuples, :data:`None`, booleans,
+    numbers, bytes, text, :class:`Context` and :class:`Kwargs`.
+    """
+    paths = []
+    try:
+        obj = _fast_prepare(obj, paths)
+        if paths:
+            return FAST_REFS_TAG + marshal.dumps((paths, obj),
+                                                 _FAST_MARSHAL_VERSION)
+        return FAST_TAG + marshal.dumps(obj, _FAST_MARSHAL_VERSION)
+    except (_FastCodecError, RuntimeError, ValueError):
+        # RuntimeError: too deeply nested, ValueError: unmarshallable.
+        return None
+
+
+def fast_loads(data, router=None, trusted=False):
+    """
+    Deserialize `data` produced by :func:`fast_dumps`. Only `trusted` data,
+    from a parent that could run arbitrary code here anyway, is passed to
+    :func:`marshal.loads`. Anything else is read by :func:`_fast_decode`,
+    which accepts only the types :func:`fast_dumps` emits, and its markers
+    are checked by :func:`_fast_restore`.
+
+    :raises StreamError:
+        `data` was invalid or contained an unexpected type.
+    """
+    try:
+        if trusted:
+            obj = marshal.loads(data[2:])
+        else:
+            obj, end = _fast_decode(data, 2)
+            if end != len(data):
+                raise ValueError('trailing data')
+        if data[:2] == FAST_REFS_TAG:
+            paths, obj = obj
+            if not trusted:
+                return _fast_restore(obj, router)
+            for path in paths:
+                obj = _fast_patch(obj, path, router)
+            return obj
+        if trusted:
+            return obj
+        return _fast_restore(obj, router)
+    except (EOFError, IndexError, KeyError, RuntimeError, TypeError,
+            ValueError, struct.error, UnicodeDecodeError):
+        # RuntimeError: nesting exceeded the recursion limit.
+        raise StreamError('invalid message: %s', sys.exc_info()[1])
+
+
 class Message(object):
     """
     Messages are the fundamental unit of communication, comprising fields from
     the :ref:`stream-protocol` header, an optional reference to the receiving
     :class:`mitogen.core.Router` for ingress messages, and helper methods for
     deserialization and generating replies.
-    """
-    #: Integer target context ID. :class:`Router` delivers messages locally
-    #: when their :attr:`dst_id` matches :data:`mitogen.context_id`, otherwise
-    #: they are routed up or downstream.
-    dst_id = None
 
-    #: Integer source context ID. Used as the target of replies if any are
-    #: generated.
-    src_id = None
+    Messages are allocated for every frame a router handles, so they use
+    ``__slots__`` rather than an instance dictionary, and only support the
+    attributes below.
 
-    #: Context ID under whose authority the message is acting. See
-    #: :ref:`source-verification`.
-    auth_id = None
+    .. attribute:: dst_id
 
-    #: Integer target handle in the destination context. This is one of the
-    #: :ref:`standard-handles`, or a dynamically generated handle used to
-    #: receive a one-time reply, such as the return value of a function call.
-    handle = None
+        Integer target context ID. :class:`Router` delivers messages locally
+        when their :attr:`dst_id` matches :data:`mitogen.context_id`, otherwise
+        they are routed up or downstream.
 
-    #: Integer target handle to direct any reply to this message. Used to
-    #: receive a one-time reply, such as the return value of a function call.
-    #: :data:`IS_DEAD` has a special meaning when it appears in this field.
-    reply_to = None
+    .. attribute:: src_id
 
-    #: Raw message data bytes.
-    data = b('')
+        Integer source context ID. Used as the target of replies if any are
+        generated.
+
+    .. attribute:: auth_id
+
+        Context ID under whose authority the message is acting. See
+        :ref:`source-verification`.
+
+    .. attribute:: handle
+
+        Integer target handle in the destination context. This is one of the
+        :ref:`standard-handles`, or a dynamically generated handle used to
+        receive a one-time reply, such as the return value of a function call.
 
-    _unpickled = object()
+    .. attribute:: reply_to
 
-    #: The :class:`Router` responsible for routing the message. This is
-    #: :data:`None` for locally originated messages.
-    router = None
+        Integer target handle to direct any reply to this message. Used to
+        receive a one-time reply, such as the return value of a function call.
+        :data:`IS_DEAD` has a special meaning when it appears in this field.
 
-    #: The :class:`Receiver` over which the message was last received. Part of
-    #: the :class:`mitogen.select.Select` interface. Defaults to :data:`None`.
-    receiver = None
+    .. attribute:: router
+
+        The :class:`Router` responsible for routing the message. This is
+        :data:`None` for locally originated messages.
+
+    .. attribute:: receiver
+
+        The :class:`Receiver` over which the message was last received. Part of
+        the :class:`mitogen.select.Select` interface. Defaults to :data:`None`.
+    """
+    __slots__ = (
+        'dst_id', 'src_id', 'auth_id', 'handle', 'reply_to', 'router',
+        'receiver', '_data', '_frame', '_unpickled',
+    )
+
+    #: Sentinel for :attr:`_unpickled` before :meth:`unpickle` has succeeded.
+    _not_unpickled = object()
 
     HEADER_FMT = '>hLLLLLL'
-    HEADER_LEN = struct.calcsize(HEADER_FMT)
+    HEADER = Struct(HEADER_FMT)
+    HEADER_LEN = HEADER.size
     HEADER_MAGIC = 0x4d49  # 'MI'
 
-    def __init__(self, **kwargs):
+    #: If :data:`True`, :meth:`pickled` serializes objects :func:`fast_dumps`
+    #: accepts using the fast codec rather than pickle. :meth:`unpickle`
+    #: accepts either regardless. Masters and UNIX clients, whose messages
+    #: are trusted by their receivers, use it; children do not.
+    fast_codec = True
+
+    def __init__(self, dst_id=None, src_id=None, auth_id=None, handle=None,
+                 reply_to=None, data=b(''), router=None, receiver=None):
+        """
+        Construct a message from from the supplied fields. :attr:`src_id` and
+        :attr:`auth_id` default to :data:`mitogen.context_id`.
+        """
+        assert isinstance(data, BytesType), 'Message data is not Bytes'
+        self.dst_id = dst_id
+        if src_id is None:
+            src_id = mitogen.context_id
+        self.src_id = src_id
+        if auth_id is None:
+            auth_id = mitogen.context_id
+        self.auth_id = auth_id
+        self.handle = handle
+        self.reply_to = reply_to
+        self.router = router
+        self.receiver = receiver
+        self._data = data
+        self._frame = None
+        self._unpickled = self._not_unpickled
+
+    @classmethod
+    def _from_frame(cls, header, frame, router):
         """
-        Construct a message from from the supplied `kwargs`. :attr:`src_id` and
-        :attr:`auth_id` are always set to :data:`mitogen.context_id`.
+        Construct a message received from a stream, given its unpacked
+        `header` and the `frame` bytes including the header. :attr:`data` is
+        not copied out of the frame until it is first accessed, and messages
+        that are only forwarded are written using the original frame.
         """
-        self.src_id = mitogen.context_id
-        self.auth_id = mitogen.context_id
-        vars(self).update(kwargs)
-        assert isinstance(self.data, BytesType), 'Message data is not Bytes'
+        self = cls.__new__(cls)
+        (_, self.dst_id, self.src_id, self.auth_id,
+         self.handle, self.reply_to, _) = header
+        self.router = router
+        self.receiver = None
+        self._data = None
+        self._frame = frame
+        self._unpickled = cls._not_unpickled
+        return self
+
+    def _get_data(self):
+        data = self._data
+        if data is None:
+            data = self._data = self._frame[self.HEADER_LEN:]
+            self._frame = None
+        return data
+
+    def _set_data(self, data):
+        self._data = data
+        self._frame = None
+
+    def _drop_frame(self):
+        """
+        Copy :attr:`data` out of the frame the message was received in, after
+        a header field was changed so the frame may no longer be forwarded.
+        """
+        self._get_data()
+
+    #: Raw message data bytes.
+    data = property(_get_data, _set_data)
 
     def pack(self):
-        return (
-            struct.pack(self.HEADER_FMT, self.HEADER_MAGIC, self.dst_id,
-                        self.src_id, self.auth_id, self.handle,
-                        self.reply_to or 0, len(self.data))
-            + self.data
-        )
+        data = self.data
+        return self.HEADER.pack(
+            self.HEADER_MAGIC, self.dst_id, self.src_id, self.auth_id,
+            self.handle, self.reply_to or 0, len(data)
+        ) + data
 
     def _unpickle_context(self, context_id, name):
         return _unpickle_context(context_id, name, router=self.router)
@@ -922,6 +1264,10 @@ class Message(object):
             The new message.
         """
         self = cls(**kwargs)
+        data = cls.fast_codec and fast_dumps(obj)
+        if data:
+            self.data = data
+            return self
         try:
             self.data = pickle__dumps(obj, protocol=2)
         except pickle.PicklingError:
@@ -946,7 +1292,8 @@ class Message(object):
             msg = Message.pickled(msg)
         msg.dst_id = self.src_id
         msg.handle = self.reply_to
-        vars(msg).update(kwargs)
+        for key, value in iteritems(kwargs):
+            setattr(msg, key, value)
         if msg.handle:
             (self.router or router).route(msg)
         else:
@@ -984,7 +1331,16 @@ class Message(object):
             self._throw_dead()
 
         obj = self._unpickled
-        if obj is Message._unpickled:
+        if obj is Message._not_unpickled and self.data[:2] in _FAST_TAGS:
+            # Payloads from a parent need not be checked, as a parent may
+            # already run arbitrary code in this context.
+            obj = self._unpickled = fast_loads(
+                self.data,
+                router=self.router,
+                trusted=(self.auth_id == mitogen.context_id or
+                         self.auth_id in mitogen.parent_ids),
+            )
+        elif obj is Message._not_unpickled:
             fp = BytesIO(self.data)
             unpickler = _Unpickler(fp, **self.UNPICKLER_KWARGS)
             unpickler.find_global = self._find_global
@@ -1297,6 +1653,7 @@ class Importer(object):
         'os_fork',
         'parent',
         'podman',
+        'sampler',
         'select',
         'service',
         'setns',
@@ -2255,6 +2612,13 @@ class MitogenProtocol(Protocol):
     #: peer.
     on_message = None
 
+    #: Messages and bytes received from and queued for the peer, for
+    #: monitoring.
+    rx_messages = 0
+    rx_bytes = 0
+    tx_messages = 0
+    tx_bytes = 0
+
     def __init__(self, router, remote_id, auth_id=None,
                  local_id=None, parent_ids=None):
         self._router = router
@@ -2274,6 +2638,8 @@ class MitogenProtocol(Protocol):
         )
         self.sent_modules = set(['mitogen', 'mitogen.core'])
         self._input_buf = collections.deque()
+        #: Offset of the first unconsumed byte of :attr:`_input_buf` [0].
+        self._input_buf_start = 0
         self._input_buf_len = 0
         self._writer = BufferedWriter(router.broker, self)
 
@@ -2288,11 +2654,14 @@ class MitogenProtocol(Protocol):
         """
         _vv and IOLOG.debug('%r.on_receive()', self)
         if self._input_buf and self._input_buf_len < 128:
-            self._input_buf[0] += buf
+            start = self._input_buf_start
+            self._input_buf[0] = self._input_buf[0][start:] + buf
+            self._input_buf_start = 0
         else:
             self._input_buf.append(buf)
 
         self._input_buf_len += len(buf)
+        self.rx_bytes += len(buf)
         while self._receive_one(broker):
             pass
 
@@ -2307,19 +2676,16 @@ class MitogenProtocol(Protocol):
         if self._input_buf_len < Message.HEADER_LEN:
             return False
 
-        msg = Message()
-        msg.router = self._router
-        (magic, msg.dst_id, msg.src_id, msg.auth_id,
-         msg.handle, msg.reply_to, msg_len) = struct.unpack(
-            Message.HEADER_FMT,
-            self._input_buf[0][:Message.HEADER_LEN],
-        )
-
-        if magic != Message.HEADER_MAGIC:
-            LOG.error(self.corrupt_msg, self.stream.name, self._input_buf[0][:2048])
+        buf = self._input_buf[0]
+        start = self._input_buf_start
+        header = Message.HEADER.unpack_from(buf, start)
+        if header[0] != Message.HEADER_MAGIC:
+            LOG.error(self.corrupt_msg, self.stream.name,
+                      buf[start:start+2048])
             self.stream.on_disconnect(broker)
             return False
 
+        msg_len = header[6]
         if msg_len > self._router.max_message_size:
             LOG.error('%r: Maximum message size exceeded (got %d, max %d)',
                       self, msg_len, self._router.max_message_size)
@@ -2334,21 +2700,37 @@ class MitogenProtocol(Protocol):
             )
             return False
 
-        start = Message.HEADER_LEN
-        prev_start = start
-        remain = total_len
-        bits = []
-        while remain:
-            buf = self._input_buf.popleft()
-            bit = buf[start:remain]
-            bits.append(bit)
-            remain -= len(bit) + start
-            prev_start = start
-            start = 0
-
-        msg.data = b('').join(bits)
-        self._input_buf.appendleft(buf[prev_start+len(bit):])
+        # Rather than slicing off the remainder of a read after each frame,
+        # advance an offset into it.
+        end = start + total_len
+        if end <= len(buf):
+            if start == 0 and end == len(buf):
+                frame = buf
+            else:
+                frame = buf[start:end]
+            if end == len(buf):
+                self._input_buf.popleft()
+                end = 0
+        else:
+            self._input_buf.popleft()
+            remain = end - len(buf)
+            bits = [buf[start:]]
+            while remain:
+                buf = self._input_buf[0]
+                bit = buf[:remain]
+                bits.append(bit)
+                remain -= len(bit)
+                if len(bit) == len(buf):
+                    self._input_buf.popleft()
+                    end = 0
+                else:
+                    end = len(bit)
+            frame = b('').join(bits)
+
+        self._input_buf_start = end
         self._input_buf_len -= total_len
+        self.rx_messages += 1
+        msg = Message._from_frame(header, frame, self._router)
         self._router._async_route(msg, self.stream)
         return True
 
@@ -2372,7 +2754,16 @@ class MitogenProtocol(Protocol):
 
     def _send(self, msg):
         _vv and IOLOG.debug('%r._send(%r)', self, msg)
-        self._writer.write(msg.pack())
+        frame = msg.pack()
+        self.tx_messages += 1
+        self.tx_bytes += len(frame)
+        self._writer.write(frame)
+
+    def _send_frame(self, frame):
+        _vv and IOLOG.debug('%r._send_frame(%d bytes)', self, len(frame))
+        self.tx_messages += 1
+        self.tx_bytes += len(frame)
+        self._writer.write(frame)
 
     def send(self, msg):
         """
@@ -3461,14 +3852,17 @@ class Router(object):
         """
         _vv and IOLOG.debug('%r._async_route(%r, %r)', self, msg, in_stream)
 
-        if len(msg.data) > self.max_message_size:
+        # Messages arriving on a stream had their size checked by
+        # MitogenProtocol before their data was copied out of the frame.
+        if in_stream is None and len(msg.data) > self.max_message_size:
             self._maybe_send_dead(False, msg, self.too_large_msg % (
                 self.max_message_size,
             ))
             return
 
-        parent_stream = self._stream_by_id.get(mitogen.parent_id)
-        src_stream = self._stream_by_id.get(msg.src_id, parent_stream)
+        stream_by_id = self._stream_by_id
+        parent_stream = stream_by_id.get(mitogen.parent_id)
+        src_stream = stream_by_id.get(msg.src_id, parent_stream)
 
         # When the ingress stream is known, verify the message was received on
         # the same as the stream we would expect to receive messages from the
@@ -3476,7 +3870,8 @@ class Router(object):
         # ensures messages from a privileged context cannot be spoofed by a
         # child.
         if in_stream:
-            auth_stream = self._stream_by_id.get(msg.auth_id, parent_stream)
+            protocol = in_stream.protocol
+            auth_stream = stream_by_id.get(msg.auth_id, parent_stream)
             if in_stream != auth_stream:
                 LOG.error('%r: bad auth_id: got %r via %r, not %r: %r',
                           self, msg.auth_id, in_stream, auth_stream, msg)
@@ -3492,18 +3887,20 @@ class Router(object):
             # parent's context ID. It is used by mitogen.unix to mark client
             # streams (like Ansible WorkerProcess) as having the same rights as
             # the parent.
-            if in_stream.protocol.auth_id is not None:
-                msg.auth_id = in_stream.protocol.auth_id
-            if in_stream.protocol.on_message is not None:
-                in_stream.protocol.on_message(in_stream, msg)
+            if protocol.auth_id is not None:
+                msg.auth_id = protocol.auth_id
+                msg._drop_frame()
+            if protocol.on_message is not None:
+                protocol.on_message(in_stream, msg)
+                msg._drop_frame()
 
             # Record the IDs the source ever communicated with.
-            in_stream.protocol.egress_ids.add(msg.dst_id)
+            protocol.egress_ids.add(msg.dst_id)
 
         if msg.dst_id == mitogen.context_id:
             return self._invoke(msg, in_stream)
 
-        out_stream = self._stream_by_id.get(msg.dst_id)
+        out_stream = stream_by_id.get(msg.dst_id)
         if (not out_stream) and (parent_stream != src_stream or not in_stream):
             # No downstream route exists. The message could be from a child or
             # ourselves for a parent, in which case we must forward it
@@ -3526,7 +3923,12 @@ class Router(object):
                                   mitogen.context_id)
             return
 
-        out_stream.protocol._send(msg)
+        if in_stream and msg._frame is not None:
+            # Forwarded unmodified, so the frame it arrived in can be written
+            # as-is without copying out its data or packing a new header.
+            out_stream.protocol._send_frame(msg._frame)
+        else:
+            out_stream.protocol._send(msg)
 
     def route(self, msg):
         """
@@ -4002,6 +4404,7 @@ class ExternalContext(object):
         self.broker = Broker(activate_compat=False)
         self.router = Router(self.broker)
         self.router.debug = self.config.get('debug', False)
+        self.router.sampling = self.config.get('sampling', 0)
         self.router.unidirectional = self.config['unidirectional']
         self.router.add_handler(
             fn=self._on_shutdown_msg,
@@ -4097,6 +4500,10 @@ class ExternalContext(object):
         mitogen.context_id = self.config['context_id']
         mitogen.parent_ids = self.config['parent_ids'][:]
         mitogen.parent_id = mitogen.parent_ids[0]
+        # Most of what a child sends goes up to contexts that do not trust
+        # it, and would have to check a fast codec payload with the slower
+        # _fast_decode(), so pickle it instead.
+        Message.fast_codec = False
 
     def _nullify_stdio(self):
         """
@@ -4181,6 +4588,9 @@ class ExternalContext(object):
                     self.stream.transmit_side.write(b('MITO002\n'))
                 self.broker._py24_25_compat()
                 self.log_handler.uncork()
+                if self.router.sampling:
+                    import_module('mitogen.sampler').start_child(
+                        self.router, self.router.sampling)
                 self.dispatcher.run()
                 _v and LOG.debug('ExternalContext.main() normal exit')
             except KeyboardInterrupt:
@@ -1092,14 +1092,51 @@ class ModuleResponder(object):
         #: Number of negative LOAD_MODULE messages sent.
         self.bad_load_module_count = 0
 
-        router.add_handler(
-            fn=self._on_get_module,
-            handle=mitogen.core.GET_MODULE,
-        )
+        if router is not None:
+            router.add_handler(
+                fn=self._on_get_module,
+                handle=mitogen.core.GET_MODULE,
+            )
 
     def __repr__(self):
         return 'ModuleResponder'
 
+    def warm(self, fullnames):
+        """
+        Build and cache the response for each module in `fullnames`, and
+        every module it would cause to be sent, ahead of any request. Modules
+        must already be imported for their dependencies to be found. A
+        responder constructed with `router` set to :data:`None` may be warmed
+        before :func:`os.fork`, so its children can :meth:`share_cache`.
+
+        :returns:
+            Number of module responses built.
+        """
+        count = len(self._cache)
+        stack = list(fullnames)
+        while stack:
+            fullname = stack.pop()
+            if fullname in self._cache:
+                continue
+            try:
+                tup = self._build_tuple(fullname)
+            except ImportError:
+                self._log.debug('%r: cannot warm %r', self, fullname)
+                continue
+            stack.extend(tup[4])  # related
+        return len(self._cache) - count
+
+    def share_cache(self, other):
+        """
+        Serve modules from the source, dependency and response caches of
+        another responder, such as one warmed by :meth:`warm` in a parent
+        process. The caches are shared rather than copied, so should be
+        shared only with responders configured with the same whitelist,
+        blacklist and source overrides.
+        """
+        self._finder = other._finder
+        self._cache = other._cache
+
     def add_source_override(self, fullname, path, source, is_pkg):
         """
         See :meth:`ModuleFinder.add_source_override`.
@@ -1473,6 +1510,32 @@ class Router(mitogen.parent.Router):
         mitogen.core.enable_debug_logging()
         self.debug = True
 
+    def enable_sampling(self, interval=None, label=u'master', path=None):
+        """
+        Cause this context and any descendant child contexts started afterwards
+        to sample the stacks of their threads every `interval` seconds. When
+        the broker exits, the samples of every context are appended to `path`
+        as collapsed stacks labelled with the context name, suitable for
+        ``flamegraph.pl``.
+
+        :param float interval:
+            Seconds between samples, default
+            :data:`mitogen.sampler.DEFAULT_INTERVAL`.
+        :param str label:
+            Label for samples taken in this context.
+        :param str path:
+            Output file. Defaults to the ``MITOGEN_SAMPLING_FILE`` environment
+            variable, or ``/tmp/mitogen.samples.<pid>.collapsed``.
+        """
+        import mitogen.sampler
+        self.sampling = interval or mitogen.sampler.DEFAULT_INTERVAL
+        self.sample_collector = mitogen.sampler.Collector(
+            router=self,
+            interval=self.sampling,
+            label=label,
+            path=path or mitogen.sampler.get_default_path(),
+        )
+
     def __enter__(self):
         return self
 
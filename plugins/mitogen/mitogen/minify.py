@@ -28,7 +28,10 @@
 
 # !mitogen: minify_safe
 
+import hashlib
+import os
 import sys
+import tempfile
 
 try:
     from io import StringIO
@@ -43,11 +46,70 @@ else:
     import tokenize
 
 
+#: Directory minified sources are stored in, named by a hash of the original
+#: source, so other processes and later runs need not minify it again. Taken
+#: from ``MITOGEN_MINIFY_CACHE``; :data:`None` disables the on-disk cache.
+cache_dir = os.environ.get('MITOGEN_MINIFY_CACHE') or None
+
+#: Minified source by :func:`_digest` of the original, for this process.
+_cache = {}
+
+# f-strings are tokenized piecewise from Python 3.12, and untokenize() escapes
+# their braces in a version-specific way. The classic pipeline handles them.
+_FSTRING_START = getattr(tokenize, 'FSTRING_START', -1)
+
+# Python 3.13 untokenize() adds a space between adjacent strings.
+_SPACE_STRINGS = '  ' in tokenize.untokenize(
+    tokenize.generate_tokens(StringIO(u"x = 'a' 'b'\n").readline)
+)
+
+
+class _FallBack(Exception):
+    pass
+
+
+def _digest(source):
+    h = hashlib.sha1(mitogen.core.b('%d.%d\0' % sys.version_info[:2]))
+    h.update(source.encode('utf-8'))
+    return h.hexdigest()
+
+
+def _read_cache(digest):
+    try:
+        fp = open(os.path.join(cache_dir, digest), 'rb')
+        try:
+            return fp.read().decode('utf-8')
+        finally:
+            fp.close()
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _write_cache(digest, minified):
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        # Write-then-rename, as other processes may share the directory.
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.tmp')
+        try:
+            os.write(fd, minified.encode('utf-8'))
+            os.close(fd)
+            os.rename(tmp_path, os.path.join(cache_dir, digest))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+    except (IOError, OSError):
+        pass
+
+
 def minimize_source(source):
     """
     Remove comments and docstrings from Python `source`, preserving line
     numbers and syntax of empty blocks.
 
+    Results are remembered by a hash of `source`, in this process and, if
+    :data:`cache_dir` is set, on disk.
+
     :param str source:
         The source to minimize.
 
@@ -55,6 +117,28 @@ def minimize_source(source):
         The minimized source.
     """
     source = mitogen.core.to_text(source)
+    digest = _digest(source)
+    minified = _cache.get(digest)
+    if minified is None:
+        if cache_dir:
+            minified = _read_cache(digest)
+        if minified is None:
+            try:
+                minified = _minimize_fast(source)
+            except _FallBack:
+                minified = _minimize_tokens(source)
+            if cache_dir:
+                _write_cache(digest, minified)
+        _cache[digest] = minified
+    return minified
+
+
+def _minimize_tokens(source):
+    """
+    Minimize `source` using the :func:`strip_comments`,
+    :func:`strip_docstrings` and :func:`reindent` token filters and
+    :func:`tokenize.untokenize`.
+    """
     tokens = tokenize.generate_tokens(StringIO(source).readline)
     tokens = strip_comments(tokens)
     tokens = strip_docstrings(tokens)
@@ -62,6 +146,133 @@ def minimize_source(source):
     return tokenize.untokenize(tokens)
 
 
+def _minimize_fast(source):
+    """
+    Produce the same output as :func:`_minimize_tokens` in one pass over the
+    tokens, applying each filter and untokenize() inline rather than through
+    a chain of generators. Raises :class:`_FallBack` on encountering an
+    f-string.
+    """
+    NL = tokenize.NL
+    NEWLINE = tokenize.NEWLINE
+    COMMENT = tokenize.COMMENT
+    INDENT = tokenize.INDENT
+    DEDENT = tokenize.DEDENT
+    STRING = tokenize.STRING
+    ENDMARKER = tokenize.ENDMARKER
+
+    out = []
+    append = out.append
+    # strip_comments()
+    prev_typ = None
+    prev_end_col = 0
+    # strip_docstrings()
+    stack = []
+    wait_string = True
+    # reindent()
+    old_levels = []
+    old_level = 0
+    new_level = 0
+    # untokenize()
+    indents = []
+    startline = False
+    prev_row = 1
+    prev_col = 0
+    prev_out_typ = None
+
+    tokens = tokenize.generate_tokens(StringIO(source).readline)
+    for typ, tok, (srow, scol), (erow, ecol), _ in tokens:
+        if typ == _FSTRING_START:
+            raise _FallBack()
+
+        if typ == NL or typ == NEWLINE:
+            if prev_typ == NL or prev_typ == NEWLINE:
+                scol = 0
+            else:
+                scol = prev_end_col
+            ecol = scol + 1
+        elif typ == COMMENT and srow > 2:
+            continue
+        prev_typ = typ
+        prev_end_col = ecol
+
+        t = (typ, tok, srow, scol, erow, ecol)
+        if not wait_string:
+            wait_string = typ == NEWLINE
+            ready = (t,)
+        elif typ == NL or typ == COMMENT:
+            ready = (t,)
+        elif typ == DEDENT or typ == INDENT or typ == STRING:
+            stack.append(t)
+            continue
+        elif typ == NEWLINE:
+            # A statement consisting only of a string: blank its lines.
+            stack.append(t)
+            last = stack[-1][4] + 1
+            ready = [(NL, '\n', i, 0, i, 1) for i in range(stack[0][2], last)]
+            ready.extend(
+                (s[0], s[1], last, s[3], last, s[5])
+                for s in stack
+                if s[0] == INDENT or s[0] == DEDENT
+            )
+            stack = []
+        else:
+            stack.append(t)
+            ready = stack
+            stack = []
+            wait_string = False
+
+        for typ, tok, srow, scol, erow, ecol in ready:
+            if typ == INDENT:
+                old_levels.append(old_level)
+                old_level = len(tok)
+                new_level += 1
+                tok = ' ' * new_level
+            elif typ == DEDENT:
+                old_level = old_levels.pop()
+                new_level -= 1
+            scol = max(0, scol - old_level + new_level)
+            if srow == erow:
+                ecol = scol + len(tok)
+
+            if typ == ENDMARKER:
+                return ''.join(out)
+            if typ == INDENT:
+                indents.append(tok)
+                continue
+            elif typ == DEDENT:
+                indents.pop()
+                prev_row, prev_col = erow, ecol
+                continue
+            elif typ == NL or typ == NEWLINE:
+                startline = True
+            elif startline and indents:
+                indent = indents[-1]
+                if scol >= len(indent):
+                    append(indent)
+                    prev_col = len(indent)
+                startline = False
+            elif _SPACE_STRINGS and typ == STRING and prev_out_typ == STRING:
+                append(' ')
+
+            if srow < prev_row or srow == prev_row and scol < prev_col:
+                raise ValueError('start (%d,%d) precedes previous end (%d,%d)'
+                                 % (srow, scol, prev_row, prev_col))
+            if srow != prev_row:
+                append('\\\n' * (srow - prev_row))
+                prev_col = 0
+            if scol > prev_col:
+                append(' ' * (scol - prev_col))
+            append(tok)
+            prev_row, prev_col = erow, ecol
+            if typ == NL or typ == NEWLINE:
+                prev_row += 1
+                prev_col = 0
+            prev_out_typ = typ
+
+    return ''.join(out)
+
+
 def strip_comments(tokens):
     """
     Drop comment tokens from a `tokenize` stream.
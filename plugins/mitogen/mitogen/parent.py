@@ -1063,13 +1063,16 @@ class EpollPoller(mitogen.core.Poller):
         self._wfds.pop(fd, None)
         self._control(fd)
 
-    def _poll(self, timeout):
+    def _wait(self, timeout):
         the_timeout = -1
         if timeout is not None:
             the_timeout = timeout
 
         events, _ = mitogen.core.io_op(self._epoll.poll, the_timeout, 32)
-        for fd, event in events:
+        return events
+
+    def _poll(self, timeout):
+        for fd, event in self._wait(timeout):
             if event & self._inmask:
                 data, gen = self._rfds.get(fd, (None, None))
                 if gen and gen < self._generation:
@@ -1083,9 +1086,104 @@ class EpollPoller(mitogen.core.Poller):
                     yield data
 
 
+class FanoutEpollPoller(EpollPoller):
+    """
+    :class:`EpollPoller` for brokers with many streams, such as a connection
+    multiplexer.
+
+    Interest mask changes for already registered file descriptors are recorded
+    and applied once per loop iteration, immediately before waiting, so that
+    the transmit start/stop pairs produced by :class:`mitogen.core.Stream`
+    writes cost no system calls when they cancel out. Registration and
+    unregistration still happen immediately, since the descriptor may be
+    closed as soon as they return.
+
+    The number of events harvested per wait doubles while waits return a full
+    batch, up to :attr:`max_events`, and halves while they return fewer than a
+    quarter of it.
+    """
+    #: Events harvested by the first wait, and lower bound for later waits.
+    min_events = 32
+
+    #: Upper bound on events harvested by one wait.
+    max_events = 4096
+
+    def __init__(self):
+        super(FanoutEpollPoller, self).__init__()
+        self._maxevents = self.min_events
+        #: Mapping of fd -> interest mask last passed to the kernel.
+        self._mask_by_fd = {}
+        #: Registered fds whose interest mask may have changed.
+        self._dirty = set()
+
+    def _mask(self, fd):
+        return (((fd in self._rfds) and select.EPOLLIN) |
+                ((fd in self._wfds) and select.EPOLLOUT))
+
+    def _control(self, fd):
+        mitogen.core._vv and IOLOG.debug('%r._control(%r)', self, fd)
+        mask = self._mask(fd)
+        if fd in self._registered_fds:
+            if mask:
+                self._dirty.add(fd)
+                return
+            self._epoll.unregister(fd)
+            self._registered_fds.remove(fd)
+            self._mask_by_fd.pop(fd, None)
+            self._dirty.discard(fd)
+        elif mask:
+            self._epoll.register(fd, mask)
+            self._registered_fds.add(fd)
+            self._mask_by_fd[fd] = mask
+
+    def _apply_changes(self):
+        for fd in self._dirty:
+            mask = self._mask(fd)
+            if mask == self._mask_by_fd.get(fd):
+                continue
+            try:
+                self._epoll.modify(fd, mask)
+            except (IOError, OSError):
+                e = sys.exc_info()[1]
+                if e.args[0] == errno.ENOENT:
+                    # The fd was closed and its number reused before the
+                    # registration was removed.
+                    self._epoll.register(fd, mask)
+                elif e.args[0] == errno.EBADF:
+                    LOG.debug('%r: forgetting closed fd %r', self, fd)
+                    self._registered_fds.discard(fd)
+                    self._mask_by_fd.pop(fd, None)
+                    continue
+                else:
+                    raise
+            self._mask_by_fd[fd] = mask
+        self._dirty.clear()
+
+    def _wait(self, timeout):
+        if self._dirty:
+            self._apply_changes()
+
+        the_timeout = -1
+        if timeout is not None:
+            the_timeout = timeout
+
+        events, _ = mitogen.core.io_op(self._epoll.poll, the_timeout,
+                                       self._maxevents)
+        if len(events) == self._maxevents:
+            self._maxevents = min(self._maxevents * 2, self.max_events)
+        elif len(events) < self._maxevents // 4:
+            self._maxevents = max(self._maxevents // 2, self.min_events)
+        return events
+
+
 POLLERS = (EpollPoller, KqueuePoller, PollPoller, mitogen.core.Poller)
 PREFERRED_POLLER = next(cls for cls in POLLERS if cls.SUPPORTED)
 
+#: Poller for brokers expected to manage many streams.
+POLLER_FANOUT = (
+    FanoutEpollPoller.SUPPORTED and FanoutEpollPoller or PREFERRED_POLLER
+)
+
 
 # For processes that start many threads or connections, it's possible Latch
 # will also get high-numbered FDs, and so select() becomes useless there too.
@@ -1271,6 +1369,11 @@ class Options(object):
     #: True to cause context to write /tmp/mitogen.stats.<pid>.<thread>.log.
     profiling = False
 
+    #: If not 0, seconds between stack samples taken by
+    #: :class:`mitogen.sampler.Sampler` in the context, which are forwarded to
+    #: the master on shutdown.
+    sampling = 0
+
     #: True if unidirectional routing is enabled in the new child.
     unidirectional = False
 
@@ -1287,7 +1390,8 @@ class Options(object):
 
     def __init__(self, max_message_size, name=None, remote_name=None,
                  python_path=None, debug=False, connect_timeout=None,
-                 profiling=False, unidirectional=False, old_router=None):
+                 profiling=False, unidirectional=False, old_router=None,
+                 sampling=0):
         self.name = name
         self.max_message_size = max_message_size
         if python_path:
@@ -1302,6 +1406,7 @@ class Options(object):
             self.remote_name = mitogen.core.to_text(remote_name)
         self.debug = debug
         self.profiling = profiling
+        self.sampling = sampling
         self.unidirectional = unidirectional
         self.max_message_size = max_message_size
         self.connect_deadline = mitogen.core.now() + self.connect_timeout
@@ -1482,6 +1587,7 @@ class Connection(object):
             'context_id': self.context.context_id,
             'debug': self.options.debug,
             'profiling': self.options.profiling,
+            'sampling': self.options.sampling,
             'unidirectional': self.options.unidirectional,
             'log_level': get_log_level(),
             'whitelist': self._router.get_module_whitelist(),
@@ -2275,6 +2381,7 @@ class Router(mitogen.core.Router):
     context_class = Context
     debug = False
     profiling = False
+    sampling = 0
 
     id_allocator = None
     responder = None
@@ -2424,6 +2531,7 @@ class Router(mitogen.core.Router):
         klass = get_connection_class(method_name)
         kwargs.setdefault(u'debug', self.debug)
         kwargs.setdefault(u'profiling', self.profiling)
+        kwargs.setdefault(u'sampling', self.sampling)
         kwargs.setdefault(u'unidirectional', self.unidirectional)
         kwargs.setdefault(u'name', name)
 
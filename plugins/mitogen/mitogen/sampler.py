@@ -0,0 +1,261 @@
+# Copyright 2019, David Wilson
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+# !mitogen: minify_safe
+
+"""
+Low overhead sampling profiler spanning a tree of contexts.
+
+Every context started with the `sampling` option runs a :class:`Sampler`
+thread, which snapshots the stack of every other thread at a fixed interval
+using :func:`sys._current_frames`, and counts identical stacks. On broker
+shutdown each child sends its counts to the master over the
+:data:`mitogen.core.FORWARD_SAMPLES` handle, where a :class:`Collector` merges
+them with its own, labelled by context name, and appends them to a file in
+the collapsed-stack format understood by ``flamegraph.pl`` and speedscope::
+
+    ssh.web1;mitogen.main;main (core.py:4151);...;recv (core.py:2100) 12
+"""
+
+import fcntl
+import logging
+import os
+import sys
+import threading
+import time
+
+import mitogen
+import mitogen.core
+
+
+LOG = logging.getLogger(__name__)
+
+#: Default seconds between samples.
+DEFAULT_INTERVAL = 0.01
+
+
+def format_frame(frame):
+    code = frame.f_code
+    return '%s (%s:%d)' % (code.co_name,
+                           os.path.basename(code.co_filename),
+                           code.co_firstlineno)
+
+
+class Sampler(object):
+    """
+    Sample the stacks of every thread in this process every `interval`
+    seconds, until :meth:`stop` is called.
+    """
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run,
+                                        name='mitogen.sampler')
+        self._thread.setDaemon(True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop sampling. The sampler thread exits before taking its next sample.
+        """
+        self._stopped = True
+
+    def _sample(self, my_ident):
+        names = {}
+        for thread in threading.enumerate():
+            names[getattr(thread, 'ident', None)] = \
+                mitogen.core.threading__thread_name(thread)
+
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == my_ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(format_frame(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident) or ('thread-%d' % (ident,)))
+            stack.reverse()
+            stacks.append(';'.join(stack))
+
+        self._lock.acquire()
+        try:
+            for stack in stacks:
+                self._counts[stack] = self._counts.get(stack, 0) + 1
+        finally:
+            self._lock.release()
+
+    def _run(self):
+        my_ident = mitogen.core.thread.get_ident()
+        while not self._stopped:
+            time.sleep(self.interval)
+            try:
+                self._sample(my_ident)
+            except Exception:
+                LOG.exception('%r: sampling failed', self)
+                return
+
+    def get_counts(self):
+        """
+        Return a copy of the dict mapping collapsed stacks to sample counts.
+        """
+        self._lock.acquire()
+        try:
+            return dict(self._counts)
+        finally:
+            self._lock.release()
+
+
+def encode_counts(counts):
+    return '\n'.join([
+        '%s %d' % (stack, count)
+        for stack, count in counts.items()
+    ]).encode('utf-8')
+
+
+def decode_counts(data):
+    counts = {}
+    for line in data.decode('utf-8', 'replace').splitlines():
+        stack, _, count = line.rpartition(' ')
+        if stack:
+            counts[stack] = counts.get(stack, 0) + int(count)
+    return counts
+
+
+def write_collapsed(path, counts_by_label):
+    """
+    Append the samples of `counts_by_label`, a dict mapping context labels to
+    stack count dicts, to the collapsed-stack file `path`. The file is locked
+    while writing, so several processes may share it.
+    """
+    lines = []
+    for label, counts in counts_by_label.items():
+        for stack, count in counts.items():
+            lines.append('%s;%s %d\n' % (label, stack, count))
+
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, int('0600', 8))
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        data = ''.join(lines).encode('utf-8')
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+
+def get_default_path():
+    return os.environ.get(
+        'MITOGEN_SAMPLING_FILE',
+        '/tmp/mitogen.samples.%d.collapsed' % (os.getpid(),),
+    )
+
+
+def start_child(router, interval):
+    """
+    Start sampling in a child context, arranging for the samples to be sent to
+    the master when the broker begins shutdown. Called by
+    :class:`mitogen.core.ExternalContext` when the `sampling` option is set.
+    """
+    sampler = Sampler(interval)
+    sampler.start()
+
+    def on_shutdown():
+        sampler.stop()
+        if not mitogen.parent_ids:
+            return  # Detached.
+        router.route(
+            mitogen.core.Message(
+                data=encode_counts(sampler.get_counts()),
+                dst_id=mitogen.parent_ids[-1],
+                handle=mitogen.core.FORWARD_SAMPLES,
+            )
+        )
+
+    mitogen.core.listen(router.broker, 'shutdown', on_shutdown)
+    return sampler
+
+
+class Collector(object):
+    """
+    Sample the master and accept samples forwarded by children, appending
+    them to `path` when the broker exits. Installed by
+    :meth:`mitogen.master.Router.enable_sampling`.
+
+    :param mitogen.master.Router router:
+        Router to install the handler on.
+    :param float interval:
+        Seconds between samples.
+    :param str label:
+        Label for samples of the master itself.
+    :param str path:
+        Collapsed-stack file to append to.
+    """
+    def __init__(self, router, interval, label, path):
+        self._router = router
+        self.label = label
+        self.path = path
+        self._counts_by_label = {}
+        self._sampler = Sampler(interval)
+        self._sampler.start()
+        router.add_handler(
+            fn=self._on_forward_samples,
+            handle=mitogen.core.FORWARD_SAMPLES,
+        )
+        mitogen.core.listen(router.broker, 'exit', self._on_broker_exit)
+
+    def __repr__(self):
+        return 'Collector(%r)' % (self.path,)
+
+    def _on_forward_samples(self, msg):
+        if msg.is_dead:
+            return
+
+        context = self._router.context_by_id(msg.src_id)
+        label = context.name or ('context%d' % (msg.src_id,))
+        counts = self._counts_by_label.setdefault(label, {})
+        for stack, count in decode_counts(msg.data).items():
+            counts[stack] = counts.get(stack, 0) + count
+
+    def _on_broker_exit(self):
+        self._sampler.stop()
+        self._counts_by_label.setdefault(self.label, {})
+        counts = self._counts_by_label[self.label]
+        for stack, count in self._sampler.get_counts().items():
+            counts[stack] = counts.get(stack, 0) + count
+        try:
+            write_collapsed(self.path, self._counts_by_label)
+        except (IOError, OSError):
+            e = sys.exc_info()[1]
+            LOG.error('%r: could not write samples: %s', self, e)
+        else:
+            LOG.debug('%r: wrote samples of %d contexts',
+                      self, len(self._counts_by_label))
@@ -28,6 +28,7 @@
 
 # !mitogen: minify_safe
 
+import collections
 import grp
 import logging
 import os
@@ -36,6 +37,7 @@ import pwd
 import stat
 import sys
 import threading
+import zlib
 
 import mitogen.core
 import mitogen.select
@@ -545,6 +547,13 @@ class Pool(object):
     def size(self):
         return len(self._threads)
 
+    def queue_size(self):
+        """
+        Return the number of service calls received but not yet taken by a
+        pool thread.
+        """
+        return self._receiver.size()
+
     def add(self, service):
         name = service.name()
         if name in self._invoker_by_name:
@@ -671,6 +680,63 @@ class FileStreamState(object):
         self.lock = threading.Lock()
 
 
+class _SentFiles(object):
+    """
+    Record of the files :class:`PushFileService` sent over one stream, oldest
+    first. Once their total size exceeds `max_bytes`, or their number
+    `max_paths`, the oldest are forgotten, as the receiver has likely evicted
+    them, so they are sent again rather than named and refetched.
+    """
+    def __init__(self, max_bytes, max_paths):
+        self.max_bytes = max_bytes
+        self.max_paths = max_paths
+        #: Mapping of path -> (sequence number, size).
+        self._entry_by_path = {}
+        #: (sequence number, path) in the order sent, including entries
+        #: superseded by a later :meth:`add` of the same path.
+        self._order = collections.deque()
+        self._seq = 0
+        self._bytes = 0
+        #: Every path sent or named to the receiver, which it may
+        #: :meth:`PushFileService.refetch` once evicted. Never forgotten.
+        self.ever_sent = set()
+
+    def __contains__(self, path):
+        return path in self._entry_by_path
+
+    def size(self, path):
+        return self._entry_by_path[path][1]
+
+    def add(self, path, size):
+        """
+        Record `path` as sent, or as named to the receiver, most recently.
+        """
+        old = self._entry_by_path.get(path)
+        if old is not None:
+            self._bytes -= old[1]
+        self._seq += 1
+        self._entry_by_path[path] = (self._seq, size)
+        self._order.append((self._seq, path))
+        self._bytes += size
+        self.ever_sent.add(path)
+
+        while self._order and (
+            len(self._entry_by_path) > self.max_paths or
+            (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            seq, path = self._order.popleft()
+            entry = self._entry_by_path.get(path)
+            if entry is not None and entry[0] == seq:
+                del self._entry_by_path[path]
+                self._bytes -= entry[1]
+
+        if len(self._order) > 2 * len(self._entry_by_path) + 64:
+            self._order = collections.deque(sorted(
+                (seq, path)
+                for path, (seq, _) in self._entry_by_path.items()
+            ))
+
+
 class PushFileService(Service):
     """
     Push-based file service. Files are delivered and cached in RAM, sent
@@ -678,14 +744,188 @@ class PushFileService(Service):
     :meth:`get` will block until it has been delivered by a parent.
 
     This service will eventually be merged into FileService.
+
+    When :attr:`bundle` is :data:`True`, the files of one
+    :meth:`propagate_paths_and_modules` call travel to each hop as a single
+    :meth:`store_bundle` message, rather than one message per file.
+
+    The cache holds at most :attr:`max_cache_bytes`, evicting the least
+    recently used files. A context needing a file it evicted reads it again
+    if it loaded it from disk, otherwise asks its parent for it using
+    :meth:`refetch`. Only the names of evicted files are remembered.
+
+    :param bool bundle:
+        Override :attr:`bundle`.
+    :param int max_cache_bytes:
+        Override :attr:`max_cache_bytes`.
     """
-    def __init__(self, **kwargs):
+    #: Send the files of each :meth:`propagate_paths_and_modules` call as one
+    #: message per hop.
+    bundle = True
+
+    #: Bundles whose files total at least this many bytes are compressed, if
+    #: that makes them smaller.
+    bundle_compress_min = 4096
+
+    #: Bytes of file content cached before the least recently used files are
+    #: evicted, or 0 for no limit. The most recently stored file is never
+    #: evicted.
+    max_cache_bytes = 32 * 1048576
+
+    #: Number of paths remembered as already sent to each stream. Beyond
+    #: this, or when the files remembered exceed :attr:`max_cache_bytes`,
+    #: the oldest are sent again when next needed.
+    max_sent_paths = 4096
+
+    #: Seconds :meth:`get` waits for an evicted file to be sent again, as its
+    #: parent usually resends rather than names it, before refetching it.
+    refetch_delay = 1.0
+
+    def __init__(self, bundle=None, max_cache_bytes=None, **kwargs):
         super(PushFileService, self).__init__(**kwargs)
+        if bundle is not None:
+            self.bundle = bundle
+        if max_cache_bytes is not None:
+            self.max_cache_bytes = max_cache_bytes
         self._lock = threading.Lock()
         self._cache = {}
+        #: Mapping of path -> :attr:`_tick` of its last use, for LRU eviction.
+        self._used_by_path = {}
+        self._tick = 0
+        #: Total size of :attr:`_cache` values.
+        self._cache_bytes = 0
+        #: Paths received from a parent and since evicted.
+        self._evicted = set()
+        #: Mapping of path -> overridden source or :data:`None`, for files
+        #: this context loaded itself, so they can be reloaded once evicted.
+        self._loaded = {}
         self._extra_sys_paths = set()
         self._waiters = {}
         self._sent_by_stream = {}
+        #: Number of :meth:`store_bundle` messages sent.
+        self.bundles_sent = 0
+        #: Number of messages sending files one per message would have cost,
+        #: less :attr:`bundles_sent`.
+        self.messages_saved = 0
+        #: Total size of files sent in bundles, and of the bundles as sent.
+        self.bundle_bytes = 0
+        self.bundle_wire_bytes = 0
+        #: Number of file lookups, and how many found the file cached.
+        self.lookups = 0
+        self.hits = 0
+        #: Number of files evicted, and how many were reloaded or refetched.
+        self.evictions = 0
+        self.reloads = 0
+
+    def get_stats(self):
+        """
+        Return a dict of cache and bundling counters.
+        """
+        return {
+            'resident_bytes': self._cache_bytes,
+            'resident_files': len(self._cache),
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': self.hits / float(self.lookups or 1),
+            'evictions': self.evictions,
+            'reloads': self.reloads,
+            'bundles_sent': self.bundles_sent,
+            'messages_saved': self.messages_saved,
+            'bundle_bytes': self.bundle_bytes,
+            'bundle_wire_bytes': self.bundle_wire_bytes,
+        }
+
+    def _touch_unlocked(self, path):
+        self._tick += 1
+        self._used_by_path[path] = self._tick
+
+    def _store_unlocked(self, path, data):
+        """
+        Cache `data` for `path`, evicting least recently used files if
+        :attr:`max_cache_bytes` is exceeded, and return the callbacks
+        awaiting it.
+        """
+        old = self._cache.get(path)
+        if old is not None:
+            self._cache_bytes -= len(old)
+        self._cache[path] = data
+        self._cache_bytes += len(data)
+        self._touch_unlocked(path)
+        self._evicted.discard(path)
+
+        while (self.max_cache_bytes and len(self._cache) > 1 and
+               self._cache_bytes > self.max_cache_bytes):
+            victim = min(self._used_by_path, key=self._used_by_path.get)
+            del self._used_by_path[victim]
+            self._cache_bytes -= len(self._cache.pop(victim))
+            if victim not in self._loaded:
+                self._evicted.add(victim)
+            self.evictions += 1
+
+        return self._waiters.pop(path, [])
+
+    def _store(self, path, data):
+        self._lock.acquire()
+        try:
+            waiters = self._store_unlocked(path, data)
+        finally:
+            self._lock.release()
+        for callback in waiters:
+            callback()
+
+    def _lookup(self, path):
+        """
+        Return the cached contents of `path`, or :data:`None`.
+        """
+        self._lock.acquire()
+        try:
+            self.lookups += 1
+            data = self._cache.get(path)
+            if data is not None:
+                self.hits += 1
+                self._touch_unlocked(path)
+            return data
+        finally:
+            self._lock.release()
+
+    def _is_available_unlocked(self, path):
+        """
+        Return :data:`True` if `path` is cached or can be obtained again,
+        rather than still being in flight from a parent.
+        """
+        return (path in self._cache or
+                path in self._evicted or
+                path in self._loaded)
+
+    def _reload(self, path):
+        """
+        Obtain an evicted file again, by reading it if this context loaded it,
+        otherwise from the parent that sent it, and cache it.
+        """
+        self.reloads += 1
+        if path in self._loaded:
+            data = self._read(path, self._loaded[path])
+        elif mitogen.parent_id is None:
+            raise Error('%r: %r is not cached' % (self, path))
+        else:
+            LOG.debug('%r: refetching evicted file %r', self, path)
+            parent = self.router.context_by_id(mitogen.parent_id)
+            data = parent.call_service(
+                service_name=self.name(),
+                method_name='refetch',
+                path=path,
+            )
+        self._store(path, data)
+        return data
+
+    def _get_data(self, path):
+        """
+        Return the contents of `path`, which must be available.
+        """
+        data = self._lookup(path)
+        if data is None:
+            data = self._reload(path)
+        return data
 
     def get(self, path):
         """
@@ -694,24 +934,76 @@ class PushFileService(Service):
         assert isinstance(path, mitogen.core.UnicodeType)
         self._lock.acquire()
         try:
-            if path in self._cache:
-                return self._cache[path]
+            self.lookups += 1
+            data = self._cache.get(path)
+            if data is not None:
+                self.hits += 1
+                self._touch_unlocked(path)
+                return data
+            timeout = None
+            if path in self._loaded:
+                timeout = 0
+            elif path in self._evicted:
+                timeout = self.refetch_delay
             latch = mitogen.core.Latch()
             waiters = self._waiters.setdefault(path, [])
             waiters.append(lambda: latch.put(None))
         finally:
             self._lock.release()
 
-        LOG.debug('%r.get(%r) waiting for uncached file to arrive', self, path)
-        latch.get()
-        LOG.debug('%r.get(%r) -> %r', self, path, self._cache[path])
-        return self._cache[path]
+        if timeout != 0:
+            LOG.debug('%r.get(%r) waiting for uncached file to arrive',
+                      self, path)
+            try:
+                latch.get(timeout=timeout)
+            except mitogen.core.TimeoutError:
+                pass
+            self._lock.acquire()
+            try:
+                data = self._cache.get(path)
+            finally:
+                self._lock.release()
+            if data is not None:
+                return data
+        return self._reload(path)
+
+    @expose(policy=AllowAny())
+    @arg_spec({
+        'path': mitogen.core.UnicodeType,
+    })
+    def refetch(self, path, msg):
+        """
+        Return a file pushed to the calling child, which since evicted it.
+        Only files sent over the stream connecting the caller are returned.
+        """
+        stream = self.router.stream_by_id(msg.src_id)
+        sent = self._sent_by_stream.get(stream)
+        if (sent is None or stream.protocol.remote_id != msg.src_id or
+                path not in sent.ever_sent):
+            raise Error('%r: %r was never pushed to %r' % (self, path,
+                                                           msg.src_id))
+        return self._get_data(path)
+
+    def _get_sent(self, stream):
+        """
+        Return the :class:`_SentFiles` of `stream`, forgotten when the stream
+        disconnects. The receiver is assumed to cache as much as this context;
+        :mod:`ansible_mitogen` gives each child its multiplexer's limit.
+        """
+        sent = self._sent_by_stream.get(stream)
+        if sent is None:
+            sent = _SentFiles(self.max_cache_bytes, self.max_sent_paths)
+            self._sent_by_stream[stream] = sent
+            mitogen.core.listen(stream, 'disconnect',
+                                lambda: self._sent_by_stream.pop(stream, None))
+        return sent
 
     def _forward(self, context, path):
         stream = self.router.stream_by_id(context.context_id)
         child = self.router.context_by_id(stream.protocol.remote_id)
-        sent = self._sent_by_stream.setdefault(stream, set())
+        sent = self._get_sent(stream)
         if path in sent:
+            sent.add(path, sent.size(path))
             if child.context_id != context.context_id:
                 LOG.debug('requesting %s forward small file to %s: %s',
                           child, context, path)
@@ -724,14 +1016,15 @@ class PushFileService(Service):
         else:
             LOG.debug('requesting %s cache and forward small file to %s: %s',
                       child, context, path)
+            data = self._get_data(path)
             child.call_service_async(
                 service_name=self.name(),
                 method_name='store_and_forward',
                 path=path,
-                data=self._cache[path],
+                data=data,
                 context=context
             ).close()
-            sent.add(path)
+            sent.add(path, len(data))
 
     @expose(policy=AllowParents())
     @arg_spec({
@@ -751,18 +1044,25 @@ class PushFileService(Service):
             in situations like loading Ansible Collections because source code
             dependencies come from different file paths than where the source lives
         """
+        bundled = []
         for path in paths:
             overridden_source = None
             if overridden_sources is not None and path in overridden_sources:
                 overridden_source = overridden_sources[path]
-            self.propagate_to(context, mitogen.core.to_text(path), overridden_source)
+            if self.bundle:
+                bundled.append(mitogen.core.to_text(path))
+                self._load(bundled[-1], overridden_source)
+            else:
+                self.propagate_to(context, mitogen.core.to_text(path), overridden_source)
+        if bundled:
+            self._forward_bundle(context, bundled)
         # self.router.responder.forward_modules(context, modules) TODO
 
         # NOTE: could possibly be handled by the above TODO, but not sure how forward_modules works enough
         #       to know for sure, so for now going to pass the sys paths themselves and have `propagate_to`
         #       load them up in sys.path for later import
         # ensure we don't add to sys.path the same path we've already seen
-        for extra_path in extra_sys_paths:
+        for extra_path in extra_sys_paths or ():
             # store extra paths in cached set for O(1) lookup
             if extra_path not in self._extra_sys_paths:
                 # not sure if it matters but we could prepend to sys.path instead if we need to
@@ -780,18 +1080,151 @@ class PushFileService(Service):
         that instead of the path's code as source code. This works around some bugs
         of source modules such as relative imports on unsupported Python versions
         """
-        if path not in self._cache:
-            LOG.debug('caching small file %s', path)
-            if overridden_source is None:
-                fp = open(path, 'rb')
-                try:
-                    self._cache[path] = mitogen.core.Blob(fp.read())
-                finally:
-                    fp.close()
-            else:
-                self._cache[path] = mitogen.core.Blob(overridden_source)
+        self._load(path, overridden_source)
         self._forward(context, path)
 
+    def _read(self, path, overridden_source):
+        if overridden_source is not None:
+            return mitogen.core.Blob(overridden_source)
+        fp = open(path, 'rb')
+        try:
+            return mitogen.core.Blob(fp.read())
+        finally:
+            fp.close()
+
+    def _load(self, path, overridden_source=None):
+        self._lock.acquire()
+        try:
+            self._loaded[path] = overridden_source
+            cached = path in self._cache
+        finally:
+            self._lock.release()
+        if not cached:
+            LOG.debug('caching small file %s', path)
+            self._store(path, self._read(path, overridden_source))
+
+    def _forward_bundle(self, context, paths):
+        """
+        Send the next hop towards `context` one :meth:`store_bundle` message
+        carrying each of `paths` it has not been sent, and naming the rest,
+        which it forwards from its own cache.
+        """
+        stream = self.router.stream_by_id(context.context_id)
+        child = self.router.context_by_id(stream.protocol.remote_id)
+        sent = self._get_sent(stream)
+        new = [path for path in paths if path not in sent]
+        forward_paths = [path for path in paths if path in sent]
+        if not new and child.context_id == context.context_id:
+            return
+
+        # Sizes are those of the files, whose concatenation is data.
+        datas = [self._get_data(path) for path in new]
+        sizes = [len(s) for s in datas]
+        data = b('').join(datas)
+        compressed = False
+        if len(data) >= self.bundle_compress_min:
+            zdata = zlib.compress(data)
+            if len(zdata) < len(data):
+                data = zdata
+                compressed = True
+
+        LOG.debug('requesting %s store %d and forward %d small files to %s '
+                  'as one bundle of %d bytes', child, len(new),
+                  len(paths) - len(new), context, len(data))
+        child.call_service_async(
+            service_name=self.name(),
+            method_name='store_bundle',
+            paths=new,
+            sizes=sizes,
+            data=mitogen.core.Blob(data),
+            compressed=compressed,
+            forward_paths=forward_paths,
+            context=context,
+        ).close()
+        for path in forward_paths:
+            sent.add(path, sent.size(path))
+        for path, size in zip(new, sizes):
+            sent.add(path, size)
+
+        if child.context_id == context.context_id:
+            messages = len(new)
+        else:
+            messages = len(paths)
+        self.bundles_sent += 1
+        self.messages_saved += messages - 1
+        self.bundle_bytes += sum(sizes)
+        self.bundle_wire_bytes += len(data)
+
+    def _forward_bundle_when_cached(self, context, paths):
+        """
+        Call :meth:`_forward_bundle` once every path has arrived, as files
+        named by a bundle may still be in flight in an earlier message.
+        """
+        self._lock.acquire()
+        try:
+            for path in paths:
+                if not self._is_available_unlocked(path):
+                    LOG.debug('%r: %r not cached yet, queueing bundle',
+                              self, path)
+                    self._waiters.setdefault(path, []).append(
+                        lambda: self._forward_bundle_when_cached(context,
+                                                                 paths)
+                    )
+                    return
+        finally:
+            self._lock.release()
+
+        self._forward_bundle(context, paths)
+
+    @expose(policy=AllowParents())
+    @no_reply()
+    @arg_spec({
+        'paths': list,
+        'sizes': list,
+        'data': mitogen.core.Blob,
+        'compressed': bool,
+        'forward_paths': list,
+        'context': mitogen.core.Context,
+    })
+    def store_bundle(self, paths, sizes, data, compressed, forward_paths,
+                     context):
+        """
+        Cache every file of a bundle sent by :meth:`_forward_bundle`, wake
+        any :meth:`get` callers awaiting them, and forward the bundle towards
+        `context` if it is not this context.
+
+        :param list paths:
+            Paths of the files concatenated in `data`.
+        :param list sizes:
+            Size of each file in `data`.
+        :param bool compressed:
+            :data:`True` if `data` is compressed with :mod:`zlib`.
+        :param list forward_paths:
+            Paths of files of the bundle this context was sent previously.
+        """
+        LOG.debug('%r.store_bundle(%d files, %d bytes, forward %d) for %r',
+                  self, len(paths), len(data), len(forward_paths), context)
+        if compressed:
+            data = zlib.decompress(data)
+
+        waiters = []
+        offset = 0
+        self._lock.acquire()
+        try:
+            for path, size in zip(paths, sizes):
+                waiters.extend(self._store_unlocked(
+                    path,
+                    mitogen.core.Blob(data[offset:offset+size]),
+                ))
+                offset += size
+        finally:
+            self._lock.release()
+
+        if context.context_id != mitogen.context_id:
+            self._forward_bundle_when_cached(context, paths + forward_paths)
+        for callback in waiters:
+            callback()
+
     @expose(policy=AllowParents())
     @no_reply()
     @arg_spec({
@@ -805,8 +1238,7 @@ class PushFileService(Service):
                   get_thread_name())
         self._lock.acquire()
         try:
-            self._cache[path] = data
-            waiters = self._waiters.pop(path, [])
+            waiters = self._store_unlocked(path, data)
         finally:
             self._lock.release()
 
@@ -827,14 +1259,16 @@ class PushFileService(Service):
 
         self._lock.acquire()
         try:
-            if path in self._cache:
-                func()
-            else:
+            available = self._is_available_unlocked(path)
+            if not available:
                 LOG.debug('%r: %r not cached yet, queueing', self, path)
                 self._waiters.setdefault(path, []).append(func)
         finally:
             self._lock.release()
 
+        if available:
+            func()
+
 
 class FileService(Service):
     """
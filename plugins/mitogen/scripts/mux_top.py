@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+"""
+Live view of the connection multiplexers of running Ansible playbooks.
+
+Connects to each multiplexer's UNIX socket, as a WorkerProcess does, and
+repeatedly asks its MonitorService for a snapshot. Shows, per multiplexer, its
+CPU, RSS, broker busy ratio and service pool backlog, then a tree of the
+connections it holds for each host, with message and byte rates, bytes queued
+for transmission, and the CPU and RSS of each target.
+
+    python scripts/mux_top.py
+    python scripts/mux_top.py --socket /tmp/mitogen_unix_abcd.sock --once
+"""
+
+from __future__ import print_function
+
+import argparse
+import curses
+import glob
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mitogen.core
+import mitogen.master
+import mitogen.unix
+import mitogen.utils
+
+SERVICE = 'ansible_mitogen.services.MonitorService'
+
+ROW = '%-34.34s %4s %8s %9s %8s %9s %8s %6s %8s'
+
+
+def find_sockets():
+    return sorted(glob.glob(os.path.join(tempfile.gettempdir(),
+                                         'mitogen_unix_*.sock')))
+
+
+def fetch(broker, path, targets):
+    """
+    Return the MonitorService snapshot of the multiplexer listening on
+    `path`, or :data:`None` if it cannot be reached.
+    """
+    try:
+        router, parent = mitogen.unix.connect(path=path, broker=broker)
+    except (mitogen.unix.ConnectError, socket.error):
+        return None
+
+    try:
+        return parent.call_service(
+            service_name=SERVICE,
+            method_name='snapshot',
+            targets=targets,
+        )
+    except mitogen.core.Error:
+        return None
+    finally:
+        router.disconnect(parent)
+
+
+def rate(cur, prev, key, elapsed):
+    if prev is None or not elapsed:
+        return None
+    return (cur[key] - prev[key]) / elapsed
+
+
+def fmt_rate(value, scale=1.0):
+    if value is None:
+        return '-'
+    return '%.1f' % (value / scale,)
+
+
+def fmt_size(n):
+    if n is None:
+        return '-'
+    for unit in ('B', 'KiB', 'MiB'):
+        if n < 1024:
+            return '%d%s' % (n, unit)
+        n /= 1024.0
+    return '%.1fGiB' % (n,)
+
+
+class View(object):
+    """
+    Turn successive snapshots into lines of text, computing rates from the
+    previous snapshot of each multiplexer.
+    """
+    def __init__(self):
+        #: Mapping of multiplexer PID -> previous snapshot.
+        self._prev_by_pid = {}
+
+    def _mux_lines(self, snap, prev):
+        elapsed = prev and snap['time'] - prev['time']
+        proc = snap['process']
+        cpu = rate(proc, prev and prev['process'], 'cpu', elapsed)
+        busy = None
+        if prev and elapsed and snap['busy_secs'] is not None:
+            busy = (snap['busy_secs'] - prev['busy_secs']) / elapsed
+        workers = sum(1 for stream in snap['streams']
+                      if stream['name'].startswith('unix_client'))
+        locks = snap['locks']
+        yield ('mux:%d pid %d (ansible pid %d)  cpu %s%%  rss %s  busy %s%%  '
+               'pool %d threads, %d queued  workers %d  '
+               'lock waits %d/%d  push %s cached, %s%% hits, '
+               '%d msgs saved' % (
+                   snap['index'], proc['pid'], snap['ppid'],
+                   fmt_rate(cpu and cpu * 100), fmt_size(proc['rss']),
+                   fmt_rate(busy and busy * 100), snap['pool']['size'],
+                   snap['pool']['queued'], workers,
+                   locks['contended'] + locks['lru_contended'],
+                   locks['acquired'] + locks['lru_acquired'],
+                   fmt_size(snap['push']['resident_bytes']),
+                   fmt_rate(snap['push']['hit_rate'] * 100),
+                   snap['push']['messages_saved'],
+               ))
+        yield '  ' + ROW % ('CONTEXT', 'REFS', 'RX msg/s', 'RX KiB/s',
+                            'TX msg/s', 'TX KiB/s', 'PENDING', 'CPU%',
+                            'RSS')
+
+        stream_by_id = dict((s['remote_id'], s) for s in snap['streams'])
+        prev_stream_by_id = dict(
+            (s['remote_id'], s) for s in (prev and prev['streams'] or ())
+        )
+        prev_stats_by_id = dict(
+            (c['id'], c['stats']) for c in (prev and prev['contexts'] or ())
+        )
+        children_by_via = {}
+        ids = set(c['id'] for c in snap['contexts'])
+        for context in snap['contexts']:
+            via = context['via'] if context['via'] in ids else None
+            children_by_via.setdefault(via, []).append(context)
+
+        def walk(via, depth):
+            for context in sorted(children_by_via.get(via, ()),
+                                  key=lambda c: c['name']):
+                stream = stream_by_id.get(context['id'])
+                prev_stream = prev_stream_by_id.get(context['id'])
+                rates = ['-'] * 4
+                pending = '-'
+                if stream:
+                    rates = [
+                        fmt_rate(rate(stream, prev_stream, key, elapsed),
+                                 scale)
+                        for key, scale in (('rx_messages', 1),
+                                           ('rx_bytes', 1024),
+                                           ('tx_messages', 1),
+                                           ('tx_bytes', 1024))
+                    ]
+                    pending = fmt_size(stream['pending'])
+                stats = context['stats']
+                cpu, rss = '-', '-'
+                if stats:
+                    prev_stats = prev_stats_by_id.get(context['id'])
+                    if prev_stats and prev_stats['pid'] == stats['pid']:
+                        pcpu = rate(stats, prev_stats, 'cpu', elapsed)
+                        cpu = fmt_rate(pcpu and pcpu * 100)
+                    rss = fmt_size(stats['rss'])
+                    if stats['stale']:
+                        cpu += '?'
+                name = '  ' * depth + context['name']
+                yield '  ' + ROW % tuple([name, context['refs']] + rates +
+                                         [pending, cpu, rss])
+                for line in walk(context['id'], depth + 1):
+                    yield line
+
+        for line in walk(None, 0):
+            yield line
+
+    def render(self, snapshots, unreachable):
+        lines = ['%s  %d multiplexers, %d unreachable sockets' % (
+            time.ctime(), len(snapshots), unreachable,
+        )]
+        for snap in sorted(snapshots, key=lambda s: (s['ppid'], s['index'])):
+            pid = snap['process']['pid']
+            lines.append('')
+            lines.extend(self._mux_lines(snap, self._prev_by_pid.get(pid)))
+            self._prev_by_pid[pid] = snap
+        return lines
+
+
+def sample(broker, opts):
+    snapshots = []
+    unreachable = 0
+    for path in opts.socket or find_sockets():
+        snap = fetch(broker, path, not opts.no_targets)
+        if snap is None:
+            unreachable += 1
+        else:
+            snapshots.append(snap)
+    return snapshots, unreachable
+
+
+def paint(stdscr, lines):
+    height, width = stdscr.getmaxyx()
+    stdscr.erase()
+    for i, line in enumerate(lines[:height - 1]):
+        stdscr.addstr(i, 0, line[:width - 1])
+    stdscr.refresh()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--socket', action='append',
+                        help='multiplexer socket; may be repeated. Default: '
+                             'every mitogen_unix_*.sock in the temp dir')
+    parser.add_argument('--interval', type=float, default=2.0)
+    parser.add_argument('--no-targets', action='store_true',
+                        help='skip target CPU and RSS, which calls each '
+                             'target')
+    parser.add_argument('--once', action='store_true',
+                        help='print two samples --interval apart and exit')
+    opts = parser.parse_args()
+
+    mitogen.utils.log_to_file(level='ERROR')
+    broker = mitogen.master.Broker(install_watcher=False)
+    view = View()
+    try:
+        if opts.once or not sys.stdout.isatty():
+            view.render(*sample(broker, opts))
+            time.sleep(opts.interval)
+            print('\n'.join(view.render(*sample(broker, opts))))
+            return
+
+        stdscr = curses.initscr()
+        try:
+            curses.noecho()
+            while True:
+                paint(stdscr, view.render(*sample(broker, opts)))
+                time.sleep(opts.interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            curses.endwin()
+    finally:
+        broker.shutdown()
+        broker.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -23,6 +23,7 @@ CI_MODE=false
 CI_MODE=false
 K8S_MODE=false
 STAGING_MODE=false
+RESUME_MODE=false
 ANSIBLE_ARGS=()
 
 # --- Logging & UI ---
@@ -258,6 +259,10 @@ run_playbook() {
 		args+=("-e" "install_cloud_native_tools=true")
 	fi
 
+	if [[ "$RESUME_MODE" == "true" ]]; then
+		args+=("-e" "vps_resume=true")
+	fi
+
 	if [[ "$DRY_RUN" == "true" ]]; then
 		args+=("--check")
 	fi
@@ -287,7 +292,7 @@ main() {
 			break
 			;;
 		--help)
-			echo "Usage: $0 [--dry-run] [--verbose] [--ci] [--k8s] [--full] [--rollback] [--factory-reset] [-- <ansible-args>]"
+			echo "Usage: $0 [--dry-run] [--verbose] [--ci] [--k8s] [--full] [--resume] [--rollback] [--factory-reset] [-- <ansible-args>]"
 			exit 0
 			;;
 		--dry-run)
@@ -314,6 +319,10 @@ main() {
 			LOG_LEVEL="$2"
 			shift 2
 			;;
+		--resume)
+			RESUME_MODE=true
+			shift
+			;;
 		--rollback)
 			ROLLBACK_MODE=true
 			shift
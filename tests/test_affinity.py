@@ -0,0 +1,114 @@
+"""
+CPU placement of ansible_mitogen.affinity.TopologyPolicy against a fake sysfs
+tree: two NUMA nodes of two SMT cores each, and one offline CPU.
+
+    python3 -m pytest tests/test_affinity.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins", "mitogen")
+)
+
+import mitogen.parent  # noqa: E402  pylint: disable=wrong-import-position
+
+from ansible_mitogen import affinity  # noqa: E402  pylint: disable=wrong-import-position
+
+#: cpu -> (package, core, node). CPUs 0-3 are the first hyperthread of each
+#: core and 4-7 their siblings; CPU 8 is offline.
+LAYOUT = {
+    0: (0, 0, 0),
+    1: (0, 1, 0),
+    2: (1, 0, 1),
+    3: (1, 1, 1),
+    4: (0, 0, 0),
+    5: (0, 1, 0),
+    6: (1, 0, 1),
+    7: (1, 1, 1),
+}
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    write(tmp_path / "cpu" / "online", "0-7\n")
+    write(tmp_path / "node" / "node0" / "cpulist", "0-1,4-5\n")
+    # Node lists include offline CPUs, which have no topology directory.
+    write(tmp_path / "node" / "node1" / "cpulist", "2-3,6-8\n")
+    for cpu, (package, core, _) in LAYOUT.items():
+        topology = tmp_path / "cpu" / ("cpu%d" % cpu) / "topology"
+        write(topology / "physical_package_id", "%d\n" % package)
+        write(topology / "core_id", "%d\n" % core)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def masks(monkeypatch):
+    """Record CPU sets instead of changing this process's affinity"""
+    monkeypatch.setattr(mitogen.parent, "_preexec_hook", None)
+    recorded = []
+
+    def set_cpu_mask(_policy, mask):
+        recorded.append(sorted(cpu for cpu in range(64) if mask & (1 << cpu)))
+
+    monkeypatch.setattr(affinity.TopologyPolicy, "_set_cpu_mask", set_cpu_mask)
+    return recorded
+
+
+def test_topology_groups_siblings_and_alternates_nodes(sysfs):
+    topology = affinity.CpuTopology(range(9), root=sysfs)
+
+    assert topology.cpus == list(range(8))
+    assert topology.node_by_cpu == dict((cpu, LAYOUT[cpu][2]) for cpu in range(8))
+    assert topology.cores == [[0, 4], [2, 6], [1, 5], [3, 7]]
+
+
+def test_topology_covers_only_allowed_cpus(sysfs):
+    topology = affinity.CpuTopology([1, 2, 3, 5, 7], root=sysfs)
+
+    assert topology.cores == [[1, 5], [2], [3, 7]]
+
+
+def test_policy_places_mux_controller_and_workers(sysfs, masks):
+    policy = affinity.TopologyPolicy(affinity.CpuTopology(range(9), root=sysfs))
+
+    policy.assign_muxprocess(0)
+    policy.assign_muxprocess(1)
+    policy.assign_controller()
+    for _ in range(5):
+        policy.assign_worker()
+    policy.assign_subprocess()
+
+    assert masks == [
+        [0],  # MuxProcess 0: core 0, node 0
+        [2],  # MuxProcess 1: core 2, node 1
+        [2],  # top-level: second reserved core
+        # Workers: first hyperthreads of unreserved cores, then siblings.
+        [1],
+        [3],
+        [5],
+        [7],
+        [1],
+        # Helper subprocesses: any CPU of an unreserved core.
+        [1, 3, 5, 7],
+    ]
+
+
+def test_worker_moves_to_its_multiplexer_node(sysfs, masks):
+    policy = affinity.TopologyPolicy(affinity.CpuTopology(range(9), root=sysfs))
+
+    policy.assign_worker()
+    policy.assign_worker_mux(0)
+    policy.assign_worker_mux(1)
+
+    # Worker on CPU 1 (node 0) stays for MuxProcess 0, then moves to a node 1
+    # worker CPU for MuxProcess 1.
+    assert masks == [[1], [7]]
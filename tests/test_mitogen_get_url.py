@@ -0,0 +1,118 @@
+"""
+mitogen_get_url falls back to get_url when the target does not use a Mitogen
+connection, as in the molecule scenarios and runs without the Mitogen strategy.
+
+Serves a file from a local HTTP stand-in and downloads it with
+ansible-playbook over the local connection:
+
+    python3 -m pytest tests/test_mitogen_get_url.py
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACTION_PLUGINS = ":".join(
+    (
+        os.path.join(REPO, "plugins", "action"),
+        os.path.join(REPO, "plugins", "mitogen", "ansible_mitogen", "plugins", "action"),
+    )
+)
+
+BODY = b"nerd font stand-in\n" * 512
+
+PLAYBOOK = """\
+- hosts: localhost
+  gather_facts: false
+  tasks:
+    - name: Download artifact
+      mitogen_get_url:
+        url: "{{ url }}"
+        dest: "{{ dest }}"
+        mode: '0600'
+      register: first
+
+    - name: Download artifact again
+      mitogen_get_url:
+        url: "{{ url }}"
+        dest: "{{ dest }}"
+        mode: '0600'
+      register: second
+
+    - ansible.builtin.assert:
+        that:
+          - first is changed
+          - second is not changed
+          # Answered by get_url, not by the multiplexer's artifact cache.
+          - first.artifact_digest is not defined
+          - first.status_code == 200
+"""
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("ansible-playbook") is None, reason="ansible-playbook is not installed"
+)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        type(self).hits += 1
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    StandInHandler.hits = 0
+    yield "http://127.0.0.1:%d/JetBrainsMono.tar.xz" % (httpd.server_address[1],)
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_downloads_through_get_url_without_mitogen(server, tmp_path):
+    playbook = tmp_path / "play.yml"
+    playbook.write_text(PLAYBOOK, encoding="utf-8")
+    dest = tmp_path / "JetBrainsMono.tar.xz"
+    env = dict(
+        os.environ,
+        ANSIBLE_ACTION_PLUGINS=ACTION_PLUGINS,
+        ANSIBLE_LOCAL_TEMP=str(tmp_path / "tmp"),
+        ANSIBLE_NOCOLOR="1",
+    )
+
+    proc = subprocess.run(
+        [
+            "ansible-playbook",
+            "-i", "localhost,",
+            "-c", "local",
+            "-e", "ansible_python_interpreter=auto_silent",
+            "-e", "url=%s dest=%s" % (server, dest),
+            str(playbook),
+        ],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+        check=False,
+    )
+
+    assert proc.returncode == 0, proc.stdout
+    assert hashlib.sha256(dest.read_bytes()).digest() == hashlib.sha256(BODY).digest()
+    assert oct(dest.stat().st_mode & 0o777) == "0o600"
+    assert StandInHandler.hits >= 1
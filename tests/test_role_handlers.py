@@ -0,0 +1,56 @@
+"""
+Every role whose tasks notify handlers ends with ``meta: flush_handlers``.
+
+The vps_progress callback records a role as completed when the play moves
+past it; handlers left to the end of the play would not have run yet, and a
+later failure would keep them from running at all while --resume skips the
+role.
+
+    python3 -m pytest tests/test_role_handlers.py
+"""
+
+import os
+
+import pytest
+import yaml
+
+ROLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "roles")
+
+FLUSH_ACTIONS = ("meta", "ansible.builtin.meta", "ansible.legacy.meta")
+
+
+def notifies(tasks):
+    for task in tasks or ():
+        if not isinstance(task, dict):
+            continue
+        if "notify" in task:
+            return True
+        if any(notifies(task.get(key)) for key in ("block", "rescue", "always")):
+            return True
+    return False
+
+
+def load_tasks(role):
+    path = os.path.join(ROLES, role, "tasks", "main.yml")
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as fp:
+        return yaml.safe_load(fp)
+
+
+NOTIFYING_ROLES = sorted(
+    role for role in os.listdir(ROLES) if notifies(load_tasks(role))
+)
+
+
+def test_notifying_roles_found():
+    assert "security" in NOTIFYING_ROLES
+
+
+@pytest.mark.parametrize("role", NOTIFYING_ROLES)
+def test_role_flushes_handlers_last(role):
+    last = load_tasks(role)[-1]
+    assert any(last.get(action) == "flush_handlers" for action in FLUSH_ACTIONS), (
+        "roles/%s/tasks/main.yml notifies handlers but does not end with "
+        "meta: flush_handlers" % role
+    )
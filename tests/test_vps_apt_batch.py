@@ -0,0 +1,151 @@
+"""
+Offline tests for the vps_apt_batch planner against a fake dpkg status file.
+
+    python3 -m pytest tests/test_vps_apt_batch.py
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins", "action")
+)
+
+import vps_apt_batch  # noqa: E402  pylint: disable=wrong-import-position
+
+FAKE_STATUS = """\
+Package: htop
+Status: install ok installed
+Priority: optional
+Version: 3.2.2-2
+Description: interactive processes viewer
+ htop is an ncurses-based process viewer.
+
+Package: jq
+Status: install ok installed
+Version: 1.6-2.1
+
+Package: ncdu
+Status: deinstall ok config-files
+Version: 1.18-0.2
+
+Package: fonts-noto-core
+Status: install ok installed
+Version: 20201225-1
+
+Package: libc6
+Status: install ok installed
+Architecture: amd64
+Version: 2.36-9
+"""
+
+ROLES = [
+    {"role": "tui-tools", "tags": ["tools", "tui"], "packages": ["htop", "ncdu"]},
+    {"role": "text-processing", "tags": ["tools", "text"], "packages": ["jq"]},
+    {"role": "network-tools", "enabled": False, "packages": ["nmap"]},
+    {
+        "role": "pinned",
+        "packages": ["htop=3.2.2-2", "libc6:amd64", "fonts-noto-*"],
+    },
+]
+
+
+def test_parse_dpkg_status_keeps_installed_packages_only():
+    assert vps_apt_batch.parse_dpkg_status(FAKE_STATUS) == {
+        "htop": "3.2.2-2",
+        "jq": "1.6-2.1",
+        "fonts-noto-core": "20201225-1",
+        "libc6": "2.36-9",
+    }
+
+
+def test_build_plan_lists_missing_packages_per_role():
+    installed = vps_apt_batch.parse_dpkg_status(FAKE_STATUS)
+    plan = vps_apt_batch.build_plan(ROLES, installed)
+
+    assert plan["tui-tools"]["missing"] == ["ncdu"]
+    assert plan["text-processing"]["missing"] == []
+    assert plan["network-tools"]["skipped"]
+    # Qualified names cannot be checked against dpkg and are left to apt.
+    assert plan["pinned"]["missing"] == ["htop=3.2.2-2", "libc6:amd64", "fonts-noto-*"]
+    assert vps_apt_batch.union_missing(plan) == [
+        "ncdu",
+        "htop=3.2.2-2",
+        "libc6:amd64",
+        "fonts-noto-*",
+    ]
+
+
+def test_build_plan_follows_run_tags():
+    installed = vps_apt_batch.parse_dpkg_status(FAKE_STATUS)
+    plan = vps_apt_batch.build_plan(ROLES, installed, ["text"])
+    assert plan["tui-tools"]["skipped"]
+    assert not plan["text-processing"]["skipped"]
+    # Untagged entries are not filtered.
+    assert not plan["pinned"]["skipped"]
+
+    plan = vps_apt_batch.build_plan(ROLES, installed, ["all"], ["tui"])
+    assert plan["tui-tools"]["skipped"]
+    assert vps_apt_batch.union_missing(plan) == [
+        "htop=3.2.2-2",
+        "libc6:amd64",
+        "fonts-noto-*",
+    ]
+
+
+def test_unchanged_dpkg_state_changes_no_role():
+    installed = vps_apt_batch.parse_dpkg_status(FAKE_STATUS)
+    plan = vps_apt_batch.build_plan(ROLES, installed)
+    vps_apt_batch.attribute_changes(
+        plan, vps_apt_batch.changed_packages(installed, dict(installed))
+    )
+    assert not any(p["changed"] for p in plan.values())
+
+
+def test_changes_are_attributed_to_the_roles_that_asked_for_them():
+    before = vps_apt_batch.parse_dpkg_status(FAKE_STATUS)
+    after = dict(before, ncdu="1.18-0.2")
+    plan = vps_apt_batch.build_plan(ROLES, before)
+    vps_apt_batch.attribute_changes(
+        plan, vps_apt_batch.changed_packages(before, after)
+    )
+    assert plan["tui-tools"]["changed"]
+    assert not plan["text-processing"]["changed"]
+    assert not plan["pinned"]["changed"]
+
+    after = dict(before, htop="3.3.0-4")
+    plan = vps_apt_batch.build_plan(ROLES, before)
+    vps_apt_batch.attribute_changes(
+        plan, vps_apt_batch.changed_packages(before, after)
+    )
+    assert plan["pinned"]["changed"]
+    assert not plan["tui-tools"]["changed"]
+
+
+def test_unclaimed_changes_go_to_roles_with_unmatched_names():
+    roles = [
+        {"role": "mail", "packages": ["mail-transport-agent"]},
+        {"role": "tui-tools", "packages": ["ncdu"]},
+    ]
+    before = vps_apt_batch.parse_dpkg_status(FAKE_STATUS)
+    after = dict(before, postfix="3.7.10-0", ncdu="1.18-0.2")
+    plan = vps_apt_batch.build_plan(roles, before)
+    vps_apt_batch.attribute_changes(
+        plan, vps_apt_batch.changed_packages(before, after)
+    )
+    assert plan["mail"]["changed"]
+    assert plan["tui-tools"]["changed"]
+
+
+def test_cli_prints_plan_for_status_file(tmp_path, capsys):
+    status = tmp_path / "status"
+    status.write_text(FAKE_STATUS, encoding="utf-8")
+    roles = tmp_path / "roles.json"
+    roles.write_text(json.dumps(ROLES), encoding="utf-8")
+
+    vps_apt_batch.main(["--status", str(status), "--tags", "tui", str(roles)])
+    report = json.loads(capsys.readouterr().out)
+    assert report["roles"]["tui-tools"]["missing"] == ["ncdu"]
+    assert report["roles"]["text-processing"]["skipped"]
+    assert report["packages"][0] == "ncdu"